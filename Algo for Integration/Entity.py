@@ -1,19 +1,20 @@
 from typing import List
 from consts import HEIGHT, WIDTH, Direction, EXPANDED_CELL, SCREENSHOT_COST
 
-def is_valid(center_x: int, center_y: int):
+def is_valid(center_x: int, center_y: int, size_x: int = WIDTH, size_y: int = HEIGHT):
     """Checks if given position is within bounds
 
     Inputs
     ------
     center_x (int): x-coordinate
     center_y (int): y-coordinate
+    size_x, size_y (int): size of the arena, the competition arena by default
 
     Returns
     -------
     bool: True if valid, False otherwise
     """
-    return center_x > 0 and center_y > 0 and center_x < WIDTH - 1 and center_y < HEIGHT - 1
+    return center_x > 0 and center_y > 0 and center_x < size_x - 1 and center_y < size_y - 1
 
 class CellState:
     """Base class for all objects on the arena, such as cells, obstacles, etc"""
@@ -89,9 +90,14 @@ class Obstacle(CellState):
         """
         return self.x == other.x and self.y == other.y and self.direction == other.direction
 
-    def get_view_state(self, retrying) -> List[CellState]:
+    def get_view_state(self, retrying, size_x: int = WIDTH, size_y: int = HEIGHT) -> List[CellState]:
         """Constructs the list of CellStates from which the robot can view the symbol on the obstacle
 
+        Args:
+            retrying (bool): whether the view states for a retry should be used
+            size_x (int): size of the arena in the x direction
+            size_y (int): size of the arena in the y direction
+
         Returns:
             List[CellState]: Valid cell states where robot can be positioned to view the symbol on the obstacle
         """
@@ -101,38 +107,38 @@ class Obstacle(CellState):
         if self.direction == Direction.NORTH:
             if retrying == False:
                 # Or (x, y + 3)
-                if is_valid(self.x, self.y + 1 + EXPANDED_CELL * 2):
+                if is_valid(self.x, self.y + 1 + EXPANDED_CELL * 2, size_x, size_y):
                     cells.append(CellState(
                         self.x, self.y + 1 + EXPANDED_CELL * 2, Direction.SOUTH, self.obstacle_id, 5))
                 # Or (x, y + 4)
-                if is_valid(self.x, self.y + 2 + EXPANDED_CELL * 2):
+                if is_valid(self.x, self.y + 2 + EXPANDED_CELL * 2, size_x, size_y):
                     cells.append(CellState(
                         self.x, self.y + 2 + EXPANDED_CELL * 2, Direction.SOUTH, self.obstacle_id, 0))
 
                 # Or (x + 1, y + 4)
-                if is_valid(self.x + 1, self.y + 2 + EXPANDED_CELL * 2):
+                if is_valid(self.x + 1, self.y + 2 + EXPANDED_CELL * 2, size_x, size_y):
                     cells.append(CellState(self.x + 1, self.y + 2 + EXPANDED_CELL *
                                  2, Direction.SOUTH, self.obstacle_id, SCREENSHOT_COST))
                 # Or (x - 1, y + 4)
-                if is_valid(self.x - 1, self.y + 2 + EXPANDED_CELL * 2):
+                if is_valid(self.x - 1, self.y + 2 + EXPANDED_CELL * 2, size_x, size_y):
                     cells.append(CellState(self.x - 1, self.y + 2 + EXPANDED_CELL *
                                  2, Direction.SOUTH, self.obstacle_id, SCREENSHOT_COST))
 
             elif retrying == True:
                 # Or (x, y + 4)
-                if is_valid(self.x, self.y + 2 + EXPANDED_CELL * 2):
+                if is_valid(self.x, self.y + 2 + EXPANDED_CELL * 2, size_x, size_y):
                     cells.append(CellState(
                         self.x, self.y + 2 + EXPANDED_CELL * 2, Direction.SOUTH, self.obstacle_id, 0))
                 # Or (x, y + 5)
-                if is_valid(self.x, self.y + 3 + EXPANDED_CELL * 2):
+                if is_valid(self.x, self.y + 3 + EXPANDED_CELL * 2, size_x, size_y):
                     cells.append(CellState(
                         self.x, self.y + 3 + EXPANDED_CELL * 2, Direction.SOUTH, self.obstacle_id, 0))
                 # Or (x + 1, y + 4)
-                if is_valid(self.x + 1, self.y + 2 + EXPANDED_CELL * 2):
+                if is_valid(self.x + 1, self.y + 2 + EXPANDED_CELL * 2, size_x, size_y):
                     cells.append(CellState(self.x + 1, self.y + 2 + EXPANDED_CELL *
                                  2, Direction.SOUTH, self.obstacle_id, SCREENSHOT_COST))
                 # Or (x - 1, y + 4)
-                if is_valid(self.x - 1, self.y + 2 + EXPANDED_CELL * 2):
+                if is_valid(self.x - 1, self.y + 2 + EXPANDED_CELL * 2, size_x, size_y):
                     cells.append(CellState(self.x - 1, self.y + 2 + EXPANDED_CELL *
                                  2, Direction.SOUTH, self.obstacle_id, SCREENSHOT_COST))
 
@@ -141,38 +147,38 @@ class Obstacle(CellState):
 
             if retrying == False:
                 # Or (x, y - 3)
-                if is_valid(self.x, self.y - 1 - EXPANDED_CELL * 2):
+                if is_valid(self.x, self.y - 1 - EXPANDED_CELL * 2, size_x, size_y):
                     cells.append(CellState(
                         self.x, self.y - 1 - EXPANDED_CELL * 2, Direction.NORTH, self.obstacle_id, 5))
                 # Or (x, y - 4)
-                if is_valid(self.x, self.y - 2 - EXPANDED_CELL * 2):
+                if is_valid(self.x, self.y - 2 - EXPANDED_CELL * 2, size_x, size_y):
                     cells.append(CellState(
                         self.x, self.y - 2 - EXPANDED_CELL * 2, Direction.NORTH, self.obstacle_id, 0))
 
                 # Or (x + 1, y - 4)
-                if is_valid(self.x + 1, self.y - 2 - EXPANDED_CELL * 2):
+                if is_valid(self.x + 1, self.y - 2 - EXPANDED_CELL * 2, size_x, size_y):
                     cells.append(CellState(self.x + 1, self.y - 2 - EXPANDED_CELL *
                                  2, Direction.NORTH, self.obstacle_id, SCREENSHOT_COST))
                 # Or (x - 1, y - 4)
-                if is_valid(self.x - 1, self.y - 2 - EXPANDED_CELL * 2):
+                if is_valid(self.x - 1, self.y - 2 - EXPANDED_CELL * 2, size_x, size_y):
                     cells.append(CellState(self.x - 1, self.y - 2 - EXPANDED_CELL *
                                  2, Direction.NORTH, self.obstacle_id, SCREENSHOT_COST))
 
             elif retrying == True:
                 # Or (x, y - 4)
-                if is_valid(self.x, self.y - 2 - EXPANDED_CELL * 2):
+                if is_valid(self.x, self.y - 2 - EXPANDED_CELL * 2, size_x, size_y):
                     cells.append(CellState(
                         self.x, self.y - 2 - EXPANDED_CELL * 2, Direction.NORTH, self.obstacle_id, 0))
                 # Or (x, y - 5)
-                if is_valid(self.x, self.y - 3 - EXPANDED_CELL * 2):
+                if is_valid(self.x, self.y - 3 - EXPANDED_CELL * 2, size_x, size_y):
                     cells.append(CellState(
                         self.x, self.y - 3 - EXPANDED_CELL * 2, Direction.NORTH, self.obstacle_id, 0))
                 # Or (x + 1, y - 4)
-                if is_valid(self.x + 1, self.y - 2 - EXPANDED_CELL * 2):
+                if is_valid(self.x + 1, self.y - 2 - EXPANDED_CELL * 2, size_x, size_y):
                     cells.append(CellState(self.x + 1, self.y - 2 - EXPANDED_CELL *
                                  2, Direction.NORTH, self.obstacle_id, SCREENSHOT_COST))
                 # Or (x - 1, y - 4)
-                if is_valid(self.x - 1, self.y - 2 - EXPANDED_CELL * 2):
+                if is_valid(self.x - 1, self.y - 2 - EXPANDED_CELL * 2, size_x, size_y):
                     cells.append(CellState(self.x - 1, self.y - 2 - EXPANDED_CELL *
                                  2, Direction.NORTH, self.obstacle_id, SCREENSHOT_COST))
 
@@ -181,38 +187,38 @@ class Obstacle(CellState):
 
             if retrying == False:
                 # Or (x + 3,y)
-                if is_valid(self.x + 1 + EXPANDED_CELL * 2, self.y):
+                if is_valid(self.x + 1 + EXPANDED_CELL * 2, self.y, size_x, size_y):
                     cells.append(CellState(self.x + 1 + EXPANDED_CELL * 2,
                                  self.y, Direction.WEST, self.obstacle_id, 5))
                 # Or (x + 4,y)
-                if is_valid(self.x + 2 + EXPANDED_CELL * 2, self.y):
+                if is_valid(self.x + 2 + EXPANDED_CELL * 2, self.y, size_x, size_y):
                     cells.append(CellState(self.x + 2 + EXPANDED_CELL * 2,
                                  self.y, Direction.WEST, self.obstacle_id, 0))
 
                 # Or (x + 4, y + 1)
-                if is_valid(self.x + 2 + EXPANDED_CELL * 2, self.y + 1):
+                if is_valid(self.x + 2 + EXPANDED_CELL * 2, self.y + 1, size_x, size_y):
                     cells.append(CellState(self.x + 2 + EXPANDED_CELL * 2, self.y +
                                  1, Direction.WEST, self.obstacle_id, SCREENSHOT_COST))
                 # Or (x + 4, y - 1)
-                if is_valid(self.x + 2 + EXPANDED_CELL * 2, self.y - 1):
+                if is_valid(self.x + 2 + EXPANDED_CELL * 2, self.y - 1, size_x, size_y):
                     cells.append(CellState(self.x + 2 + EXPANDED_CELL * 2, self.y -
                                  1, Direction.WEST, self.obstacle_id, SCREENSHOT_COST))
 
             elif retrying == True:
                 # Or (x + 4, y)
-                if is_valid(self.x + 2 + EXPANDED_CELL * 2, self.y):
+                if is_valid(self.x + 2 + EXPANDED_CELL * 2, self.y, size_x, size_y):
                     cells.append(CellState(self.x + 2 + EXPANDED_CELL * 2,
                                  self.y, Direction.WEST, self.obstacle_id, 0))
                 # Or (x + 5, y)
-                if is_valid(self.x + 3 + EXPANDED_CELL * 2, self.y):
+                if is_valid(self.x + 3 + EXPANDED_CELL * 2, self.y, size_x, size_y):
                     cells.append(CellState(self.x + 3 + EXPANDED_CELL * 2,
                                  self.y, Direction.WEST, self.obstacle_id, 0))
                 # Or (x + 4,y + 1)
-                if is_valid(self.x + 2 + EXPANDED_CELL * 2, self.y + 1):
+                if is_valid(self.x + 2 + EXPANDED_CELL * 2, self.y + 1, size_x, size_y):
                     cells.append(CellState(self.x + 2 + EXPANDED_CELL * 2, self.y +
                                  1, Direction.WEST, self.obstacle_id, SCREENSHOT_COST))
                 # Or (x + 4,y - 1)
-                if is_valid(self.x + 2 + EXPANDED_CELL * 2, self.y - 1):
+                if is_valid(self.x + 2 + EXPANDED_CELL * 2, self.y - 1, size_x, size_y):
                     cells.append(CellState(self.x + 2 + EXPANDED_CELL * 2, self.y -
                                  1, Direction.WEST, self.obstacle_id, SCREENSHOT_COST))
 
@@ -220,11 +226,11 @@ class Obstacle(CellState):
         elif self.direction == Direction.WEST:
             if retrying == False:
                 # Or (x - 3, y)
-                if is_valid(self.x - 1 - EXPANDED_CELL * 2, self.y):
+                if is_valid(self.x - 1 - EXPANDED_CELL * 2, self.y, size_x, size_y):
                     cells.append(CellState(self.x - 1 - EXPANDED_CELL * 2,
                                  self.y, Direction.EAST, self.obstacle_id, 5))
                 # Or (x - 4, y)
-                if is_valid(self.x - 2 - EXPANDED_CELL * 2, self.y):
+                if is_valid(self.x - 2 - EXPANDED_CELL * 2, self.y, size_x, size_y):
                     cells.append(CellState(self.x - 2 - EXPANDED_CELL * 2,
                                  self.y, Direction.EAST, self.obstacle_id, 0))
 
@@ -236,29 +242,29 @@ class Obstacle(CellState):
                 #     cells.append(CellState(self.x - 1 - EXPANDED_CELL * 2, self.y - 1, Direction.EAST, self.obstacle_id, SCREENSHOT_COST*10))
 
                 # Or (x - 4, y + 1)
-                if is_valid(self.x - 2 - EXPANDED_CELL * 2, self.y + 1):
+                if is_valid(self.x - 2 - EXPANDED_CELL * 2, self.y + 1, size_x, size_y):
                     cells.append(CellState(self.x - 2 - EXPANDED_CELL * 2, self.y +
                                  1, Direction.EAST, self.obstacle_id, SCREENSHOT_COST))
                 # Or (x - 4, y - 1)
-                if is_valid(self.x - 2 - EXPANDED_CELL * 2, self.y - 1):
+                if is_valid(self.x - 2 - EXPANDED_CELL * 2, self.y - 1, size_x, size_y):
                     cells.append(CellState(self.x - 2 - EXPANDED_CELL * 2, self.y -
                                  1, Direction.EAST, self.obstacle_id, SCREENSHOT_COST))
 
             elif retrying == True:
                 # Or (x - 4, y)
-                if is_valid(self.x - 2 - EXPANDED_CELL * 2, self.y):
+                if is_valid(self.x - 2 - EXPANDED_CELL * 2, self.y, size_x, size_y):
                     cells.append(CellState(self.x - 2 - EXPANDED_CELL * 2,
                                  self.y, Direction.EAST, self.obstacle_id, 0))
                 # Or (x - 5, y)
-                if is_valid(self.x - 3 - EXPANDED_CELL * 2, self.y):
+                if is_valid(self.x - 3 - EXPANDED_CELL * 2, self.y, size_x, size_y):
                     cells.append(CellState(self.x - 3 - EXPANDED_CELL * 2,
                                  self.y, Direction.EAST, self.obstacle_id, 0))
                 # Or (x - 4, y + 1)
-                if is_valid(self.x - 2 - EXPANDED_CELL * 2, self.y + 1):
+                if is_valid(self.x - 2 - EXPANDED_CELL * 2, self.y + 1, size_x, size_y):
                     cells.append(CellState(self.x - 2 - EXPANDED_CELL * 2, self.y +
                                  1, Direction.EAST, self.obstacle_id, SCREENSHOT_COST))
                 # Or (x - 4, y - 1)
-                if is_valid(self.x - 2 - EXPANDED_CELL * 2, self.y - 1):
+                if is_valid(self.x - 2 - EXPANDED_CELL * 2, self.y - 1, size_x, size_y):
                     cells.append(CellState(self.x - 2 - EXPANDED_CELL * 2, self.y -
                                  1, Direction.EAST, self.obstacle_id, SCREENSHOT_COST))
 
@@ -372,7 +378,7 @@ class Grid:
                 continue
             else:
                 view_states = [view_state for view_state in obstacle.get_view_state(
-                    retrying) if self.reachable(view_state.x, view_state.y)]
+                    retrying, self.size_x, self.size_y) if self.reachable(view_state.x, view_state.y)]
             optimal_positions.append(view_states)
 
         return optimal_positions
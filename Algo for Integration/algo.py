@@ -1,5 +1,6 @@
 import heapq
 import math
+import time
 from typing import List
 import numpy as np
 from Robot import Robot
@@ -22,6 +23,11 @@ class MazeSolver:
         self.path_table = dict()
         self.cost_table = dict()
 
+        # Best complete tour found so far by the running plan, as (path, distance),
+        # and whether the returned plan is "optimal" or "best-effort"
+        self.incumbent = None
+        self.plan_status = "optimal"
+
     def add_obstacle(self, x: int, y: int, direction: Direction, obstacle_id: int):
         obstacle = Obstacle(x, y, direction, obstacle_id)
         self.grid.add_obstacle(obstacle)
@@ -54,9 +60,17 @@ class MazeSolver:
         s.sort(key=lambda x: x.count('1'), reverse=True)
         return s
 
-    def get_optimal_order_dp(self, retrying) -> List[CellState]:
+    def get_optimal_order_dp(self, retrying, deadline=None) -> List[CellState]:
+        """
+        Find the shortest path visiting the view states of as many obstacles as possible.
+        With a deadline (a time.monotonic() value), the subset and combination loops stop once it has passed
+        and the best complete tour found so far is returned, with plan_status set to "best-effort".
+        The search keeps going past the deadline only until the first complete tour is found.
+        """
         distance = 1e9
         optimal_path = []
+        self.incumbent = None
+        self.plan_status = "optimal"
 
         all_view_positions = self.grid.get_view_obstacle_positions(retrying)
 
@@ -74,6 +88,10 @@ class MazeSolver:
             self.generate_combination(cur_view_positions, 0, [], combination, [ITERATIONS])
 
             for c in combination:
+                if deadline is not None and optimal_path and time.monotonic() >= deadline:
+                    self.plan_status = "best-effort"
+                    break
+
                 visited_candidates = [0]
 
                 cur_index = 1
@@ -112,6 +130,8 @@ class MazeSolver:
 
                     optimal_path[-1].set_screenshot(to_item.screenshot_id)
 
+                self.incumbent = (optimal_path, distance)
+
             if optimal_path:
                 break
 
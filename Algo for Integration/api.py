@@ -3,6 +3,7 @@ import subprocess
 import time
 from flask import Flask, request, jsonify
 from flask_cors import CORS
+from plan_store import PlanStore
 
 app = Flask(__name__)
 CORS(app)
@@ -10,6 +11,9 @@ CORS(app)
 INPUT_FILE = "input.json"
 OUTPUT_FILE = "output.json"
 
+# Plans computed by earlier requests, also across restarts
+plan_store = PlanStore()
+
 @app.route('/status', methods=['GET'])
 def status():
     """Health check endpoint"""
@@ -17,13 +21,23 @@ def status():
 
 @app.route('/path', methods=['POST'])
 def path_finding():
-    """API Endpoint to update input.json, run main.py, and return only commands"""
+    """API Endpoint to update input.json, run main.py, and return only commands.
+    An optional "deadline_ms" field in the request bounds the time spent choosing the tour, optional "size_x"
+    and "size_y" fields set the size of the arena."""
     try:
         # Get JSON request data
         content = request.get_json()
         if not content:
             return jsonify({"error": "Invalid JSON input"}), 400
 
+        # Answer repeated layouts straight from the plan store
+        stored_plan = plan_store.get(content)
+        if stored_plan is not None:
+            response = jsonify(stored_plan['commands'])
+            response.headers["X-Plan-Status"] = "optimal"
+            response.headers["X-Plan-Source"] = "store"
+            return response
+
         # Step 1: Update input.json
         with open(INPUT_FILE, "w") as f:
             json.dump(content, f, indent=2)
@@ -47,7 +61,12 @@ def path_finding():
 
         commands = output_data.get("commands", [])  # Extract only the commands list
 
-        return jsonify(commands)  # Return only commands as a JSON array
+        # Return only commands as a JSON array, whether the plan is "optimal" or "best-effort"
+        # (when deadline_ms was given and ran out) is reported in a header
+        response = jsonify(commands)
+        response.headers["X-Plan-Status"] = output_data.get("status", "optimal")
+        response.headers["X-Plan-Source"] = "planner"
+        return response
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
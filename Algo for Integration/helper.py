@@ -1,4 +1,5 @@
 import json
+import time
 from algo import MazeSolver
 from consts import WIDTH, HEIGHT, Direction
 from processing import convert_hidden_obstacles
@@ -183,16 +184,21 @@ def process_path_finding(input_data):
     robot_x, robot_y = input_data['robot_x'], input_data['robot_y']
     robot_direction = Direction(input_data['robot_dir'])
     retrying = input_data.get('retrying', False)
+    # Optional arena size, the competition arena by default
+    size_x, size_y = input_data.get('size_x', WIDTH), input_data.get('size_y', HEIGHT)
+    # Optional time budget in milliseconds for choosing the tour, the best tour found by then is returned
+    deadline_ms = input_data.get('deadline_ms')
+    deadline = time.monotonic() + deadline_ms / 1000 if deadline_ms is not None else None
 
     # Convert hidden obstacles
-    obstacles = convert_hidden_obstacles(obstacles)
+    obstacles = convert_hidden_obstacles(obstacles, size_x, size_y)
 
-    maze_solver = MazeSolver(WIDTH, HEIGHT, robot_x, robot_y, robot_direction)
+    maze_solver = MazeSolver(size_x, size_y, robot_x, robot_y, robot_direction)
     
     for ob in obstacles:
         maze_solver.add_obstacle(ob['x'], ob['y'], Direction(ob['d']), ob['id'])
 
-    optimal_path, distance = maze_solver.get_optimal_order_dp(retrying=retrying)
+    optimal_path, distance = maze_solver.get_optimal_order_dp(retrying=retrying, deadline=deadline)
     path = [state.get_dict() for state in optimal_path]
     
     # Filter the states before generating commands
@@ -204,7 +210,8 @@ def process_path_finding(input_data):
         "data": {
             'commands': commands,
             'distance': distance,
-            'path': filtered_path
+            'path': filtered_path,
+            'status': maze_solver.plan_status
         },
         "error": None
     }
@@ -1,6 +1,7 @@
 import os
 import json
 from helper import load_input_from_file, process_path_finding, save_output_to_file
+from plan_store import PlanStore
 
 # Set to True if visualization is needed, False otherwise
 ENABLE_VISUALIZATION = True
@@ -94,8 +95,13 @@ def main(input_file, output_file):
     # Merge consecutive SF and SB commands for output file only
     merged_commands = merge_consecutive_moves(result['data']['commands'])
     
-    # Save merged commands for output
-    save_output_to_file(output_file, {'commands': merged_commands})
+    # Save merged commands for output, along with whether the plan is optimal or only the best found in time
+    save_output_to_file(output_file, {'commands': merged_commands, 'status': result['data']['status']})
+
+    # Persist the plan so that repeated requests are answered without planning, unless it is only best-effort
+    if result['data']['status'] == 'optimal':
+        with PlanStore() as store:
+            store.put(input_data, result['data']['distance'], result['data']['path'], merged_commands)
 
 if __name__ == "__main__":
     import sys
@@ -6,7 +6,7 @@ import os.path as path
 # Add the parent directory to the Python path
 sys.path.append(path.dirname(path.dirname(path.abspath(__file__))))
 
-from consts import Direction
+from consts import Direction, WIDTH, HEIGHT
 
 import os
 
@@ -19,47 +19,50 @@ def load_data():
     commands = data['data']['commands']
     return path, commands
 
-def load_obstacles():
+def load_input():
     script_dir = os.path.dirname(os.path.abspath(__file__))
     root_dir = os.path.dirname(script_dir)
     input_path = os.path.join(root_dir, 'input.json')
     with open(input_path) as f:
         data = json.load(f)
-    return [{'x': obs['x'], 'y': obs['y'], 'd': obs['d']} for obs in data['obstacles']]
+    obstacles = [{'x': obs['x'], 'y': obs['y'], 'd': obs['d']} for obs in data['obstacles']]
+    # Size of the arena as given to the planner, the standard arena by default
+    return obstacles, (data.get('size_x', WIDTH), data.get('size_y', HEIGHT))
 
 def clear_screen():
     os.system('cls' if os.name == 'nt' else 'clear')
 
 def display_grid(step_number, commands, grid_size, obstacles, robot_pos, robot_dir, is_snapshot=False):
     grid = [['.' for _ in range(grid_size[0])] for _ in range(grid_size[1])]
+    top = grid_size[1] - 1
     
     # Mark obstacles with inverted y-coordinates
     for obs in obstacles:
         x, y, direction = obs['x'], obs['y'], obs['d']
         if direction == Direction.NORTH:
-            grid[19 - y][x] = 'U'
+            grid[top - y][x] = 'U'
         elif direction == Direction.EAST:
-            grid[19 - y][x] = 'R'
+            grid[top - y][x] = 'R'
         elif direction == Direction.SOUTH:
-            grid[19 - y][x] = 'B'
+            grid[top - y][x] = 'B'
         elif direction == Direction.WEST:
-            grid[19 - y][x] = 'L'
+            grid[top - y][x] = 'L'
         elif direction == Direction.HIDDEN:
-            grid[19 - y][x] = 'H'
+            grid[top - y][x] = 'H'
     
     # Mark robot position with inverted y-coordinate
     x, y = robot_pos
     if is_snapshot:
-        grid[19 - y][x] = 'O'
+        grid[top - y][x] = 'O'
     else:
         if robot_dir == Direction.NORTH:
-            grid[19 - y][x] = 'W'
+            grid[top - y][x] = 'W'
         elif robot_dir == Direction.EAST:
-            grid[19 - y][x] = 'D'
+            grid[top - y][x] = 'D'
         elif robot_dir == Direction.SOUTH:
-            grid[19 - y][x] = 'S'
+            grid[top - y][x] = 'S'
         elif robot_dir == Direction.WEST:
-            grid[19 - y][x] = 'A'
+            grid[top - y][x] = 'A'
     
     # Print current command
     print(f"Next Execution: {commands[step_number]}\n")
@@ -67,13 +70,12 @@ def display_grid(step_number, commands, grid_size, obstacles, robot_pos, robot_d
     # Print grid with coordinates
     print("  " + " ".join(f"{i % 10}" for i in range(grid_size[0])))  # X-axis labels
     for idx, row in enumerate(grid):
-        print(f"{(19 - idx) % 10} " + " ".join(row))  # Y-axis labels + grid row
+        print(f"{(top - idx) % 10} " + " ".join(row))  # Y-axis labels + grid row
     print()
 
 def visualize_path():
     path, commands = load_data()
-    obstacles = load_obstacles()
-    grid_size = (20, 20)  # Assuming standard grid size
+    obstacles, grid_size = load_input()
 
     step_number = 0
     for i, step in enumerate(path):
@@ -0,0 +1,109 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from consts import WIDTH, HEIGHT, TURN_FACTOR, TURN_RADIUS, EXPANDED_CELL, SAFE_COST, SCREENSHOT_COST, ITERATIONS
+
+# Plans are stored next to this file so that the API server and the main.py subprocesses share them
+DEFAULT_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'plans.sqlite3')
+
+
+def request_key(input_data):
+    """Canonical hash of a path request, the same layout gives the same key whatever the obstacle order"""
+    request = {
+        'obstacles': sorted([ob['x'], ob['y'], int(ob['d']), ob['id']] for ob in input_data['obstacles']),
+        'robot': [input_data['robot_x'], input_data['robot_y'], int(input_data['robot_dir'])],
+        'retrying': bool(input_data.get('retrying', False)),
+        'size': [input_data.get('size_x', WIDTH), input_data.get('size_y', HEIGHT)],
+        'constants': [TURN_FACTOR, TURN_RADIUS, EXPANDED_CELL, SAFE_COST, SCREENSHOT_COST, ITERATIONS],
+    }
+    return hashlib.sha256(json.dumps(request, sort_keys=True).encode()).hexdigest()
+
+
+class PlanStore:
+    """SQLite store of finished plans (path, distance and merged commands) keyed by request_key"""
+
+    def __init__(self, path=DEFAULT_DB):
+        # The connection is shared by the threads of the API server, the lock serialises its use
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS plans ("
+            "key TEXT PRIMARY KEY, distance REAL, path TEXT, commands TEXT, created REAL)"
+        )
+        self.connection.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def get(self, input_data):
+        """Returns the stored plan of the request as a dictionary with keys "distance", "path" and "commands",
+        or None if the request was not planned before"""
+        key = request_key(input_data)
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT distance, path, commands FROM plans WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {'distance': row[0], 'path': json.loads(row[1]), 'commands': json.loads(row[2])}
+
+    def put(self, input_data, distance, path, commands):
+        """Stores the plan of the request, replacing any previous one"""
+        row = (request_key(input_data), distance, json.dumps(path), json.dumps(commands), time.time())
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO plans (key, distance, path, commands, created) VALUES (?, ?, ?, ?, ?)", row
+            )
+            self.connection.commit()
+
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM plans").fetchone()[0]
+
+
+def populate(layouts_file, db=DEFAULT_DB):
+    """Plans every request in a JSON file holding a list of path requests and stores the optimal plans"""
+    # Imported here since main.py itself stores the plans it computes
+    from helper import load_input_from_file, process_path_finding
+    from main import merge_consecutive_moves
+
+    layouts = load_input_from_file(layouts_file)
+    with PlanStore(db) as store:
+        for i, input_data in enumerate(layouts):
+            if store.get(input_data) is not None:
+                print(f"Layout {i}: already stored")
+                continue
+
+            start = time.time()
+            result = process_path_finding(input_data)
+            if result['data']['status'] != 'optimal':
+                print(f"Layout {i}: not stored, plan is {result['data']['status']}")
+                continue
+
+            store.put(input_data, result['data']['distance'], result['data']['path'],
+                      merge_consecutive_moves(result['data']['commands']))
+            print(f"Layout {i}: stored in {time.time() - start:.3f}s")
+        print(f"{len(store)} plans in {db}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Persistent store of finished plans")
+    parser.add_argument("--db", default=DEFAULT_DB, help="path of the SQLite database")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    populate_parser = subparsers.add_parser("populate", help="plan and store a JSON list of path requests")
+    populate_parser.add_argument("layouts_file")
+
+    args = parser.parse_args()
+    populate(args.layouts_file, args.db)
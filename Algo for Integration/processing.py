@@ -1,23 +1,23 @@
 from consts import Direction, WIDTH, HEIGHT
 
-def is_valid(x, y, direction):
+def is_valid(x, y, direction, size_x=WIDTH, size_y=HEIGHT):
     if direction == Direction.NORTH and y > 0:
         return True
-    if direction == Direction.EAST and x < WIDTH - 1:
+    if direction == Direction.EAST and x < size_x - 1:
         return True
-    if direction == Direction.SOUTH and y < HEIGHT - 1:
+    if direction == Direction.SOUTH and y < size_y - 1:
         return True
     if direction == Direction.WEST and x > 0:
         return True
     return False
 
-def convert_hidden_obstacles(obstacles):
+def convert_hidden_obstacles(obstacles, size_x=WIDTH, size_y=HEIGHT):
     new_obstacles = []
     for obstacle in obstacles:
         x, y, obstacle_id, direction = obstacle['x'], obstacle['y'], obstacle['id'], obstacle['d']
         if direction == Direction.HIDDEN:
             for dir in [Direction.NORTH, Direction.EAST, Direction.SOUTH, Direction.WEST]:
-                if is_valid(x, y, dir):
+                if is_valid(x, y, dir, size_x, size_y):
                     new_obstacles.append({"x": x, "y": y, "id": obstacle_id, "d": dir})
         else:
             new_obstacles.append(obstacle)
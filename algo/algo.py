@@ -1,11 +1,30 @@
 import heapq
 import math
+import time
+from array import array
 from typing import List
 import numpy as np
 from entities.Robot import Robot
-from entities.Entity import Obstacle, CellState, Grid
-from consts import Direction, MOVE_DIRECTION, TURN_FACTOR, ITERATIONS, TURN_RADIUS, SAFE_COST
-from python_tsp.exact import solve_tsp_dynamic_programming
+from entities.Entity import Obstacle, CellState, Grid, Path
+from consts import Direction, MOVE_DIRECTION, TURN_FACTOR, ITERATIONS, TURN_RADIUS, SAFE_COST, \
+    EXACT_PLANNER_MAX_OBSTACLES
+from algo.cache import PathCache, layout_key, obstacle_key, pack_path
+from algo.field import FIELD_BATCH, cost_fields, trace_path
+from algo.heuristic import load_cost_to_go
+from algo.hierarchical import CLUSTER_SIZE, ClusterGraph
+from algo.parallel import PARALLEL_MIN_COMBINATIONS, SearchPool
+from algo.path_table import PathTable
+from algo.session import PlanningSession
+from algo.stats import SearchStats
+from algo.timing import PhaseTimings
+from algo.tsp import DeadlineExceeded, evaluate_combinations, solve_generalized_tsp, solve_generalized_tsp_heuristic
+
+# Directions in the order of their index in the encoded state lattice (direction // 2)
+LATTICE_DIRECTIONS = (Direction.NORTH, Direction.EAST, Direction.SOUTH, Direction.WEST)
+
+SEARCH_MODES = ("astar", "dijkstra", "bidirectional", "field", "hierarchical")
+PLANNERS = ("gtsp", "enumerate")
+HEURISTICS = ("table", "manhattan")
 
 class MazeSolver:
     def __init__(
@@ -15,19 +34,127 @@ class MazeSolver:
             robot_x: int,
             robot_y: int,
             robot_direction: Direction,
-            big_turn=None
+            big_turn=None,
+            search_mode: str = "astar",
+            planner: str = "gtsp",
+            exact_max_obstacles: int = EXACT_PLANNER_MAX_OBSTACLES,
+            cache: PathCache = None,
+            session: PlanningSession = None,
+            heuristic: str = "table",
+            macro_moves: bool = True,
+            pool: SearchPool = None,
+            cluster_size: int = CLUSTER_SIZE,
+            collect_stats: bool = False
     ):
+        if search_mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode {search_mode!r}, expected one of {SEARCH_MODES}")
+        if planner not in PLANNERS:
+            raise ValueError(f"Unknown planner {planner!r}, expected one of {PLANNERS}")
+        if heuristic not in HEURISTICS:
+            raise ValueError(f"Unknown heuristic {heuristic!r}, expected one of {HEURISTICS}")
+
         self.grid = Grid(size_x, size_y)
         self.robot = Robot(robot_x, robot_y, robot_direction)
-        self.path_table = dict()
+        self.path_table = PathTable(self.expand_path, self.search_path)
         self.cost_table = dict()
+        # "astar" runs one A* per pair of states, "dijkstra" runs one multi-target Dijkstra per source state,
+        # "bidirectional" runs one A* per pair from both ends at once, "field" relaxes the costs from batches of
+        # source states over whole arrays and only traces the paths that are read (see algo/field.py),
+        # "hierarchical" finds approximate costs on a graph of clusters of cells and refines the paths that are
+        # read inside a corridor around their coarse path (see algo/hierarchical.py)
+        self.search_mode = search_mode
+        # A* heuristic, "table" looks up the exact obstacle-free cost-to-go (see algo/heuristic.py), "manhattan"
+        # is the Manhattan distance. Both are consistent, so the costs found are the same.
+        self.heuristic = heuristic
+        # Whether A* and Dijkstra move along whole straight runs in a single step (see get_moves) instead of
+        # one cell at a time
+        self.macro_moves = macro_moves
+        # Number of states expanded by all searches of this solver
+        self.expanded_nodes = 0
+        # Number of searches run by this solver, one per pair of states for A*, one per source state otherwise
+        self.search_runs = 0
+        # Time spent in every phase of the plans of this solver, see PhaseTimings
+        self.timings = PhaseTimings()
+        # Counters of the work done by the searches and planners, only kept with collect_stats, see SearchStats
+        self.stats = None
+        if collect_stats:
+            self.stats = SearchStats()
+            self.stats.instrument(self)
+        # "gtsp" picks view states and visiting order in one dynamic program,
+        # "enumerate" solves a TSP for every combination of view states
+        self.planner = planner
+        self.pruned_combinations = 0
+        # Above this many reachable obstacles, both planners fall back to the heuristic tour construction
+        self.exact_max_obstacles = exact_max_obstacles
+
+        # Best complete tour found so far by the running plan, as (start state followed by the view states in
+        # visiting order, distance), and whether the returned plan is "optimal" or "best-effort"
+        self.incumbent = None
+        self.plan_status = "optimal"
+
+        # Turn lookup tables indexed by [x, y, from_direction // 2, to_direction // 2], built lazily per obstacle set
+        self.turn_table = None
+        self.turn_landing = None
+        # get_safe_cost of every cell, indexed by [x, y], built lazily per obstacle set
+        self.safe_cost_table = None
+        self._safe_costs = None
+        # Macro moves out of every state searched so far, keyed by encoded state, see get_macro_moves
+        self.macro_move_table = dict()
+        # Cluster graph of the "hierarchical" search mode, built lazily per obstacle set
+        self.cluster_size = cluster_size
+        self.cluster_graph = None
+
+        # Optional cache shared across solvers, and the pairs of the layout being planned keyed by coordinates
+        # ((x, y, direction), (x, y, direction)), as (cost, packed path) or None if not connected
+        self.cache = cache
+        self.cached_pairs = None
+        self._new_pairs = 0
+
+        # Optional session keeping the turn tables and resumable search trees of this obstacle layout across
+        # solvers, so that a retry only searches for its new view states. Searches then always use Dijkstra.
+        self.session = session
+
+        # Optional pool of worker processes the searches are handed out to (see algo/parallel.py). Not used
+        # together with a session, whose search trees live in this process.
+        self.pool = pool
+
+        # Search buffers over the encoded state lattice, allocated once and reused by every search.
+        # A g-value / parent entry is only valid if its stamp matches the id of the running search,
+        # so the buffers never need to be cleared between searches.
+        self._search_id = 0
+        self._g_distance = None
+        self._parent = None
+        self._g_stamp = None
+        self._closed_stamp = None
+        # Same for the backward half of a bidirectional search, where the parent is the next state towards the end
+        self._back_g_distance = None
+        self._back_parent = None
+        self._back_g_stamp = None
+        self._back_closed_stamp = None
 
     def add_obstacle(self, x: int, y: int, direction: Direction, obstacle_id: int):
         obstacle = Obstacle(x, y, direction, obstacle_id)
         self.grid.add_obstacle(obstacle)
+        self.turn_table = None
+        self.safe_cost_table = None
+        self.macro_move_table = dict()
+        self.cluster_graph = None
+
+    def remove_obstacle(self, x: int, y: int, direction: Direction) -> bool:
+        removed = self.grid.remove_obstacle(Obstacle(x, y, direction, -1))
+        if removed:
+            self.turn_table = None
+            self.safe_cost_table = None
+            self.macro_move_table = dict()
+            self.cluster_graph = None
+        return removed
 
     def reset_obstacles(self):
         self.grid.reset_obstacles()
+        self.turn_table = None
+        self.safe_cost_table = None
+        self.macro_move_table = dict()
+        self.cluster_graph = None
 
     @staticmethod
     def compute_coord_distance(x1: int, y1: int, x2: int, y2: int, level=1):
@@ -54,11 +181,155 @@ class MazeSolver:
         s.sort(key=lambda x: x.count('1'), reverse=True)
         return s
 
-    def get_optimal_order_dp(self, retrying) -> List[CellState]:
-        distance = 1e9
-        optimal_path = []
+    def get_optimal_order_gtsp(self, retrying, deadline=None, all_view_positions=None) -> List[CellState]:
+        """Finds the optimal open tour over the obstacles' view states with a generalized TSP dynamic program.
+        The view state of every obstacle and the visiting order are chosen jointly, including each view
+        state's penalty. Obstacles that cannot be reached are left out, as with get_optimal_order_dp.
+
+        With more than exact_max_obstacles obstacles, the tour is built heuristically instead. With a deadline,
+        the heuristic tour is built first and returned as a best-effort plan if the exact one is not done in time.
+
+        Args:
+            retrying (bool): whether the view states for a retry should be used
+            deadline (float): time.monotonic() value by which the tour has to be chosen, None for no limit
+            all_view_positions (List[List[CellState]]): view states of every obstacle if already computed by the
+                calling planner, computed here otherwise
+
+        Returns:
+            Tuple[Path, float]: path of the robot and its total cost
+        """
+        self.incumbent = None
+        self.plan_status = "optimal"
+
+        if all_view_positions is None:
+            with self.timings.phase("view_positions"):
+                all_view_positions = self.grid.get_view_obstacle_positions(retrying)
+        all_view_positions = [view_positions for view_positions in all_view_positions if view_positions]
+
+        items = [self.robot.get_start_state()]
+        clusters = []
+        for view_positions in all_view_positions:
+            clusters.append(list(range(len(items), len(items) + len(view_positions))))
+            items = items + view_positions
+
+        with self.timings.phase("path_cost_generator"):
+            self.path_cost_generator(items)
+
+        tsp_start = time.perf_counter()
+        cost_np = np.full((len(items), len(items)), np.inf)
+        for s in range(len(items)):
+            for e in range(len(items)):
+                if (items[s], items[e]) in self.cost_table:
+                    cost_np[s][e] = self.cost_table[(items[s], items[e])]
+        np.fill_diagonal(cost_np, 0)
+        penalties = np.array([item.penalty for item in items], dtype=float)
+
+        if len(clusters) > self.exact_max_obstacles or deadline is not None:
+            order, distance = solve_generalized_tsp_heuristic(cost_np, clusters, penalties)
+            self.incumbent = ([items[i] for i in order], distance)
+            self.plan_status = "best-effort"
+            if self.stats is not None:
+                self.stats.add("tsp_solves")
+
+        if len(clusters) <= self.exact_max_obstacles:
+            if self.stats is not None:
+                self.stats.add("tsp_solves")
+            try:
+                order, distance = solve_generalized_tsp(cost_np, clusters, penalties, deadline=deadline)
+                self.incumbent = ([items[i] for i in order], distance)
+                self.plan_status = "optimal"
+            except DeadlineExceeded:
+                pass
+        self.timings.add("tsp", time.perf_counter() - tsp_start)
+
+        stops, distance = self.incumbent
+        return self.assemble_path(stops), distance
+
+    def assemble_path(self, stops: List[CellState]) -> Path:
+        """Joins the searched paths between consecutive stops into the path of the robot
+
+        Args:
+            stops (List[CellState]): start state followed by the view states in visiting order
+
+        Returns:
+            Path: every state along the path, with the screenshot id set at each view state
+        """
+        rows = [(stops[0].x, stops[0].y, int(stops[0].direction), stops[0].screenshot_id)]
+
+        # Paths of the field and hierarchical searches are only traced here, when they are first read
+        with self.timings.phase("assemble_path"):
+            for from_item, to_item in zip(stops, stops[1:]):
+                cur_path = self.path_table[(from_item, to_item)]
+                rows.extend((x, y, int(direction), -1) for x, y, direction in cur_path[1:])
+                rows[-1] = rows[-1][:3] + (to_item.screenshot_id,)
+
+        return Path(rows)
+
+    def get_optimal_order_dp(self, retrying, deadline=None) -> List[CellState]:
+        """Finds the shortest path visiting the view states of as many obstacles as possible.
+
+        With a deadline, the subset and combination loops stop once it has passed and the best complete tour
+        found so far is returned, with plan_status set to "best-effort". The searches filling the cost table
+        always run to completion, since no tour can be built without them.
+
+        If the solver has a cache, the pairwise costs and paths of the layout are taken from it when the same
+        layout was planned before, and stored into it otherwise. If it has a session, the searches resume the
+        search trees left by earlier plans of the same obstacles.
+
+        Args:
+            retrying (bool): whether the view states for a retry should be used
+            deadline (float): time.monotonic() value by which the tour has to be chosen, None for no limit
+
+        Returns:
+            Tuple[Path, float]: path of the robot and its total cost
+        """
+        if self.session is not None and self.session.key != obstacle_key(
+                self.grid.size_x, self.grid.size_y, self.grid.obstacles):
+            raise ValueError("The session belongs to a different obstacle layout")
+
+        cache_key = None
+        # Coarse costs are not exact, so they are kept out of the cache
+        if self.cache is not None and self.search_mode != "hierarchical":
+            cache_key = layout_key(self.grid.size_x, self.grid.size_y, self.grid.obstacles,
+                                   self.robot.get_start_state(), retrying)
+            cached = self.cache.get(cache_key)
+            self.cached_pairs = dict(cached) if cached is not None else dict()
+            self._new_pairs = 0
+
+        if self.planner == "gtsp":
+            result = self.get_optimal_order_gtsp(retrying, deadline)
+        else:
+            result = self.get_optimal_order_enumerate(retrying, deadline)
+
+        if cache_key is not None and self._new_pairs:
+            self.cache.put(cache_key, self.cached_pairs)
+
+        if self.search_mode == "hierarchical" and self.incumbent is not None:
+            # The tour was chosen on the coarse costs and its legs were refined by assemble_path, so the distance
+            # is that of the refined legs and the tour is not known to be the best one
+            stops, _distance = self.incumbent
+            distance = sum(self.cost_table[(from_item, to_item)] for from_item, to_item in zip(stops, stops[1:]))
+            result = result[0], distance + sum(stop.penalty for stop in stops)
+            self.plan_status = "best-effort"
+        return result
+
+    def get_optimal_order_enumerate(self, retrying, deadline=None) -> List[CellState]:
+        """Enumerates subsets of obstacles and combinations of their view states, solving a TSP for each.
+
+        Falls back to get_optimal_order_gtsp above exact_max_obstacles reachable obstacles.
+        """
+        # Enumerating subsets and combinations is exponential in the number of obstacles
+        with self.timings.phase("view_positions"):
+            all_view_positions = self.grid.get_view_obstacle_positions(retrying)
+        reachable_obstacles = sum(1 for view_positions in all_view_positions if view_positions)
+        if reachable_obstacles > self.exact_max_obstacles:
+            return self.get_optimal_order_gtsp(retrying, deadline, all_view_positions)
 
-        all_view_positions = self.grid.get_view_obstacle_positions(retrying)
+        distance = 1e9
+        self.incumbent = None
+        self.plan_status = "optimal"
+        # Number of view state combinations skipped because their lower bound could not beat the incumbent
+        self.pruned_combinations = 0
 
         for op in self.get_visit_options(len(all_view_positions)):
             items = [self.robot.get_start_state()]
@@ -69,53 +340,60 @@ class MazeSolver:
                     items = items + all_view_positions[idx]
                     cur_view_positions.append(all_view_positions[idx])
 
-            self.path_cost_generator(items)
+            with self.timings.phase("path_cost_generator"):
+                self.path_cost_generator(items)
+
+            combinations_start = time.perf_counter()
             combination = []
             self.generate_combination(cur_view_positions, 0, [], combination, [ITERATIONS])
 
-            for c in combination:
-                visited_candidates = [0]
-
+            # Costs between every pair of items, each combination only picks a submatrix out of it
+            items_cost = np.full((len(items), len(items)), 1e9)
+            np.fill_diagonal(items_cost, 0)
+            for s in range(len(items) - 1):
+                for e in range(s + 1, len(items)):
+                    if (items[s], items[e]) in self.cost_table:
+                        items_cost[s][e] = items_cost[e][s] = self.cost_table[(items[s], items[e])]
+
+            # Items visited by every combination and the penalties of its view states
+            candidates = np.zeros((len(combination), len(cur_view_positions) + 1), dtype=np.intp)
+            fixed_costs = np.zeros(len(combination))
+            for row, c in enumerate(combination):
                 cur_index = 1
-                fixed_cost = 0
                 for index, view_position in enumerate(cur_view_positions):
-                    visited_candidates.append(cur_index + c[index])
-                    fixed_cost += view_position[c[index]].penalty
+                    candidates[row, index + 1] = cur_index + c[index]
+                    fixed_costs[row] += view_position[c[index]].penalty
                     cur_index += len(view_position)
-                
-                cost_np = np.zeros((len(visited_candidates), len(visited_candidates)))
-
-                for s in range(len(visited_candidates) - 1):
-                    for e in range(s + 1, len(visited_candidates)):
-                        u = items[visited_candidates[s]]
-                        v = items[visited_candidates[e]]
-                        if (u, v) in self.cost_table.keys():
-                            cost_np[s][e] = self.cost_table[(u, v)]
-                        else:
-                            cost_np[s][e] = 1e9
-                        cost_np[e][s] = cost_np[s][e]
-                cost_np[:, 0] = 0
-                _permutation, _distance = solve_tsp_dynamic_programming(cost_np)
-                if _distance + fixed_cost >= distance:
-                    continue
-
-                optimal_path = [items[0]]
-                distance = _distance + fixed_cost
-
-                for i in range(len(_permutation) - 1):
-                    from_item = items[visited_candidates[_permutation[i]]]
-                    to_item = items[visited_candidates[_permutation[i + 1]]]
+            self.timings.add("combinations", time.perf_counter() - combinations_start)
 
-                    cur_path = self.path_table[(from_item, to_item)]
-                    for j in range(1, len(cur_path)):
-                        optimal_path.append(CellState(cur_path[j][0], cur_path[j][1], cur_path[j][2]))
-
-                    optimal_path[-1].set_screenshot(to_item.screenshot_id)
-
-            if optimal_path:
+            tsp_start = time.perf_counter()
+            if self.pool is not None and len(combination) >= PARALLEL_MIN_COMBINATIONS:
+                result = self.pool.evaluate_combinations(items_cost, candidates, fixed_costs, distance, deadline)
+            else:
+                result = evaluate_combinations(items_cost, candidates, fixed_costs, 0, len(combination), distance,
+                                               deadline)
+            self.timings.add("tsp", time.perf_counter() - tsp_start)
+
+            best_distance, best_index, permutation, pruned, solved, timed_out = result
+            self.pruned_combinations += pruned
+            if self.stats is not None:
+                self.stats.add("tsp_solves", solved)
+            if timed_out:
+                self.plan_status = "best-effort"
+            if best_index != -1:
+                distance = best_distance
+                visited_candidates = candidates[best_index]
+                self.incumbent = ([items[visited_candidates[i]] for i in permutation], distance)
+
+            if self.incumbent is not None or self.plan_status == "best-effort":
                 break
 
-        return optimal_path, distance
+        if self.incumbent is None:
+            # Out of time before any complete tour was found, fall back to the heuristic tour
+            return self.get_optimal_order_gtsp(retrying, deadline, all_view_positions)
+
+        stops, distance = self.incumbent
+        return self.assemble_path(stops), distance
 
     @staticmethod
     def generate_combination(view_positions, index, current, result, iteration_left):
@@ -132,7 +410,25 @@ class MazeSolver:
             MazeSolver.generate_combination(view_positions, index + 1, current, result, iteration_left)
             current.pop()
 
+    def build_safe_cost_table(self):
+        """Precomputes get_safe_cost for every cell of the grid, as an array indexed by [x, y] and as nested
+        lists for the lookups of the searches"""
+        size_x, size_y = self.grid.size_x, self.grid.size_y
+        self.safe_cost_table = np.zeros((size_x, size_y), dtype=np.int64)
+        for ob in self.grid.obstacles:
+            for dx, dy in ((2, 2), (1, 2), (2, 1)):
+                for x, y in ((ob.x - dx, ob.y - dy), (ob.x - dx, ob.y + dy), (ob.x + dx, ob.y - dy),
+                             (ob.x + dx, ob.y + dy)):
+                    if 0 <= x < size_x and 0 <= y < size_y:
+                        self.safe_cost_table[x, y] = SAFE_COST
+        self._safe_costs = self.safe_cost_table.tolist()
+
     def get_safe_cost(self, x, y):
+        if 0 <= x < self.grid.size_x and 0 <= y < self.grid.size_y:
+            if self.safe_cost_table is None:
+                self.build_safe_cost_table()
+            return self._safe_costs[x][y]
+
         for ob in self.grid.obstacles:
             if abs(ob.x-x) == 2 and abs(ob.y-y) == 2:
                 return SAFE_COST
@@ -277,8 +573,71 @@ class MazeSolver:
         
         return True
 
+    @staticmethod
+    def get_turn_offset(from_direction: Direction, to_direction: Direction):
+        """Returns the (dx, dy) displacement of a forward turn from from_direction to to_direction,
+        or None if the two directions do not form a 90 degree turn"""
+        if (from_direction, to_direction) in ((Direction.NORTH, Direction.EAST), (Direction.EAST, Direction.NORTH)):
+            return TURN_RADIUS, TURN_RADIUS
+        if (from_direction, to_direction) in ((Direction.NORTH, Direction.WEST), (Direction.WEST, Direction.NORTH)):
+            return -TURN_RADIUS, TURN_RADIUS
+        if (from_direction, to_direction) in ((Direction.SOUTH, Direction.EAST), (Direction.EAST, Direction.SOUTH)):
+            return TURN_RADIUS, -TURN_RADIUS
+        if (from_direction, to_direction) in ((Direction.SOUTH, Direction.WEST), (Direction.WEST, Direction.SOUTH)):
+            return -TURN_RADIUS, -TURN_RADIUS
+        return None
+
+    def build_turn_table(self):
+        """Precomputes, for every cell and every pair of directions, whether the turn is valid for the
+        current obstacle set and where it lands. This folds get_turn_area, is_in_green_area, is_turn_valid
+        and the turn reachability check of get_neighbors into a single array lookup.
+        """
+        size_x, size_y = self.grid.size_x, self.grid.size_y
+        xs, ys = np.indices((size_x, size_y))
+
+        self.turn_table = np.zeros((size_x, size_y, 4, 4), dtype=bool)
+        self.turn_landing = np.zeros((size_x, size_y, 4, 4, 2), dtype=np.int32)
+
+        # Landing cells must be reachable with the clearance required after a turn
+        turn_reachable = self.grid.reachable_mask(turn=True)
+
+        for from_direction in (Direction.NORTH, Direction.EAST, Direction.SOUTH, Direction.WEST):
+            for to_direction in (Direction.NORTH, Direction.EAST, Direction.SOUTH, Direction.WEST):
+                offset = self.get_turn_offset(from_direction, to_direction)
+                if offset is None:
+                    continue
+
+                dx, dy = offset
+                land_x, land_y = xs + dx, ys + dy
+                in_bounds = (land_x >= 0) & (land_x < size_x) & (land_y >= 0) & (land_y < size_y)
+                valid = in_bounds.copy()
+                valid[in_bounds] = turn_reachable[land_x[in_bounds], land_y[in_bounds]]
+                if self.stats is not None:
+                    self.stats.add("reachable_checks", int(np.count_nonzero(in_bounds)))
+
+                # Area swept by the turn, see get_turn_area
+                smallest_x, biggest_x = xs + min(0, dx) - 1, xs + max(0, dx) + 1
+                smallest_y, biggest_y = ys + min(0, dy) - 1, ys + max(0, dy) + 1
+
+                # Centre of the green area relative to the robot, see is_in_green_area
+                quadrant = self.get_turn_quadrant(from_direction, to_direction)
+                green_dx = max(0, dx) if quadrant in (1, 4) else min(0, dx)
+                green_dy = min(0, dy) if quadrant in (1, 2) else max(0, dy)
+
+                for obstacle in self.grid.obstacles:
+                    blocking = (smallest_x <= obstacle.x) & (obstacle.x <= biggest_x) & \
+                               (smallest_y <= obstacle.y) & (obstacle.y <= biggest_y)
+                    if TURN_RADIUS >= 4:
+                        blocking &= (np.abs(xs + green_dx - obstacle.x) > 1) | (np.abs(ys + green_dy - obstacle.y) > 1)
+                    valid &= ~blocking
+
+                self.turn_table[:, :, from_direction // 2, to_direction // 2] = valid
+                self.turn_landing[:, :, from_direction // 2, to_direction // 2, 0] = land_x
+                self.turn_landing[:, :, from_direction // 2, to_direction // 2, 1] = land_y
+
     def get_neighbors(self, x, y, direction):
         neighbors = []
+        turn_checks = 0
         for dx, dy, md in MOVE_DIRECTION:
             if md == direction:
                 if self.grid.reachable(x + dx, y + dy):
@@ -288,113 +647,723 @@ class MazeSolver:
                     safe_cost = self.get_safe_cost(x - dx, y - dy)
                     neighbors.append((x - dx, y - dy, md, safe_cost))
 
+            elif 0 <= x < self.grid.size_x and 0 <= y < self.grid.size_y:
+                if self.turn_table is None:
+                    self.build_turn_table()
+
+                turn_checks += 1
+                if self.turn_table[x, y, direction // 2, md // 2]:
+                    turn_x, turn_y = self.turn_landing[x, y, direction // 2, md // 2]
+                    turn_x, turn_y = int(turn_x), int(turn_y)
+                    safe_cost = self.get_safe_cost(turn_x, turn_y)
+                    neighbors.append((turn_x, turn_y, md, safe_cost + 10))
+
             else:
-                quadrant = self.get_turn_quadrant(direction, md)
-                if quadrant == 0:
+                # Cells outside the arena (e.g. a robot starting off the grid) are not covered by the turn table
+                offset = self.get_turn_offset(direction, md)
+                if offset is None:
                     continue
 
-                turn_x = x
-                turn_y = y
-                
-                if quadrant == 1:
-                    if direction == Direction.NORTH:
-                        turn_x = x + TURN_RADIUS
-                        turn_y = y + TURN_RADIUS
-                    elif direction == Direction.WEST:
-                        turn_x = x - TURN_RADIUS
-                        turn_y = y - TURN_RADIUS
-
-                elif quadrant == 2:
-                    if direction == Direction.NORTH:
-                        turn_x = x - TURN_RADIUS
-                        turn_y = y + TURN_RADIUS
-                    elif direction == Direction.EAST:
-                        turn_x = x + TURN_RADIUS
-                        turn_y = y - TURN_RADIUS
-
-                elif quadrant == 3:
-                    if direction == Direction.SOUTH:
-                        turn_x = x - TURN_RADIUS
-                        turn_y = y - TURN_RADIUS
-                    elif direction == Direction.EAST:
-                        turn_x = x + TURN_RADIUS
-                        turn_y = y + TURN_RADIUS
-
-                elif quadrant == 4:
-                    if direction == Direction.SOUTH:
-                        turn_x = x + TURN_RADIUS
-                        turn_y = y - TURN_RADIUS
-                    elif direction == Direction.WEST:
-                        turn_x = x - TURN_RADIUS
-                        turn_y = y + TURN_RADIUS
-
+                turn_x, turn_y = x + offset[0], y + offset[1]
                 reachable = self.grid.reachable(turn_x, turn_y, turn=True)
                 valid_turn = self.is_turn_valid(x, y, direction, md, self.grid.obstacles)
-                
+                turn_checks += 1
+
                 if reachable and valid_turn:
                     safe_cost = self.get_safe_cost(turn_x, turn_y)
                     neighbors.append((turn_x, turn_y, md, safe_cost + 10))
 
+        if self.stats is not None:
+            self.stats.add("neighbor_expansions")
+            self.stats.add("turn_checks", turn_checks)
         return neighbors
 
-    def path_cost_generator(self, states: List[CellState]):
-        def record_path(start, end, parent: dict, cost: int):
+    def get_macro_moves(self, x: int, y: int, direction: Direction):
+        """Moves of get_moves that do not depend on the goals, cached per state until the obstacles change.
+
+        Returns:
+            Tuple[list, dict]: the moves as (x, y, direction, cost), and every cell passed through by the
+            straight runs out of the state as {encoded state: (x, y, cost)}
+        """
+        index = self.encode_state(x, y, direction)
+        cached = self.macro_move_table.get(index)
+        if cached is not None:
+            return cached
+
+        if self.turn_table is None:
+            self.build_turn_table()
+
+        moves, cells = [], dict()
+        runs = [(x, y, 0)]
+        for dx, dy, md in MOVE_DIRECTION:
+            if md != direction:
+                continue
+            for step_x, step_y in ((dx, dy), (-dx, -dy)):
+                cost = 0
+                cell_x, cell_y = x + step_x, y + step_y
+                while self.grid.reachable(cell_x, cell_y):
+                    cost += 1 + self.get_safe_cost(cell_x, cell_y)
+                    cells[self.encode_state(cell_x, cell_y, direction)] = (cell_x, cell_y, cost)
+                    runs.append((cell_x, cell_y, cost))
+                    cell_x, cell_y = cell_x + step_x, cell_y + step_y
+
+        for cell_x, cell_y, cost in runs:
+            for new_direction in (Direction.NORTH, Direction.EAST, Direction.SOUTH, Direction.WEST):
+                if self.turn_table[cell_x, cell_y, direction // 2, new_direction // 2]:
+                    turn_x, turn_y = self.turn_landing[cell_x, cell_y, direction // 2, new_direction // 2]
+                    turn_x, turn_y = int(turn_x), int(turn_y)
+                    moves.append((turn_x, turn_y, new_direction,
+                                  cost + Direction.rotation_cost(new_direction, direction) * TURN_FACTOR + 1 +
+                                  self.get_safe_cost(turn_x, turn_y) + 10))
+
+        if self.stats is not None:
+            self.stats.add("turn_checks", len(runs) * 4)
+        self.macro_move_table[index] = (moves, cells)
+        return moves, cells
+
+    def get_run_origins(self, x: int, y: int, direction: Direction) -> list:
+        """Cells of the line of a state that a straight run of get_macro_moves reaches it from, as
+        (x, y, cost of the run), in the order of their distance to the state"""
+        origins = []
+        for dx, dy, md in MOVE_DIRECTION:
+            if md != direction:
+                continue
+            for step_x, step_y in ((dx, dy), (-dx, -dy)):
+                cost = 0
+                cell_x, cell_y = x, y
+                # Every cell entered by the run up to the state has to be reachable, the origin itself not
+                while self.grid.reachable(cell_x, cell_y):
+                    cost += 1 + self.get_safe_cost(cell_x, cell_y)
+                    cell_x, cell_y = cell_x - step_x, cell_y - step_y
+                    if self.is_in_lattice(cell_x, cell_y):
+                        origins.append((cell_x, cell_y, cost))
+        return origins
+
+    def get_moves(self, x: int, y: int, direction: Direction, goals=()) -> list:
+        """Moves out of a state as (x, y, direction, cost), for the searches of path_cost_generator.
+
+        Without macro moves these are the moves of get_neighbors. With them, a move is a straight run forward
+        or backward of any length followed by a turn, or a straight run ending at one of the goals. Every
+        shortest path is a sequence of such moves, since moving back and forth along a line only adds cost,
+        so the costs found are the same while the states in the middle of the runs are never queued.
+
+        Args:
+            goals: encoded states that straight runs have to stop at
+        """
+        if not self.macro_moves or not self.is_in_lattice(x, y):
+            return [(next_x, next_y, new_direction,
+                     Direction.rotation_cost(new_direction, direction) * TURN_FACTOR + 1 + safe_cost)
+                    for next_x, next_y, new_direction, safe_cost in self.get_neighbors(x, y, direction)]
+
+        if self.stats is not None:
+            self.stats.add("neighbor_expansions")
+        moves, cells = self.get_macro_moves(x, y, direction)
+        goal_moves = [(cells[goal][0], cells[goal][1], direction, cells[goal][2]) for goal in goals if goal in cells]
+        return moves + goal_moves if goal_moves else moves
+
+    def get_skipped_states(self, start: tuple, end: tuple) -> list:
+        """States passed through between two consecutive states of a path found with macro moves, in order
+
+        Args:
+            start: (x, y, direction) the move starts at
+            end: (x, y, direction) the move ends at
+        """
+        start_x, start_y, direction = start
+        end_x, end_y, new_direction = end
+        if new_direction != direction:
+            # The run ends at the cell the turn is taken from
+            offset = self.get_turn_offset(direction, new_direction)
+            end_x, end_y = end_x - offset[0], end_y - offset[1]
+
+        step_x, step_y = (end_x > start_x) - (end_x < start_x), (end_y > start_y) - (end_y < start_y)
+        length = abs(end_x - start_x) + abs(end_y - start_y)
+        # The cell of the turn is a state of the path as well, unless the turn starts the move
+        last = length + 1 if new_direction != direction and length > 0 else length
+        return [(start_x + k * step_x, start_y + k * step_y, direction) for k in range(1, last)]
+
+    def expand_path(self, path: list) -> list:
+        """Fills in the states skipped by the macro moves of a path, given in the direction it was searched"""
+        if len(path) < 2:
+            return path
+
+        expanded = [path[0]]
+        for state in path[1:]:
+            expanded.extend(self.get_skipped_states(expanded[-1], state))
+            expanded.append(state)
+        return expanded
+
+    def get_cluster_graph(self) -> ClusterGraph:
+        if self.cluster_graph is None:
+            self.cluster_graph = ClusterGraph(self, self.cluster_size)
+        return self.cluster_graph
+
+    def search_path(self, start: CellState, end: CellState) -> array:
+        """Packed states of the cheapest path from start to end, for the pairs whose search only found the cost"""
+        if self.search_mode == "hierarchical":
+            path, cost = self.get_cluster_graph().refine(start, end)
+            # The coarse cost is replaced by the cost of the refined path, which is never higher
             self.cost_table[(start, end)] = cost
             self.cost_table[(end, start)] = cost
+            return pack_path(path)
+        return pack_path(trace_path(self, cost_fields(self, [start])[0], start, end))
 
-            path = []
-            cursor = (end.x, end.y, end.direction)
+    def get_predecessors(self, x, y, direction):
+        """Inverse of get_neighbors, the states with a move into (x, y, direction), as (x, y, direction, safe_cost).
 
-            while cursor in parent:
-                path.append(cursor)
-                cursor = parent[cursor]
+        Moves are only checked at the state they end in, so the predecessors are not checked for being
+        reachable themselves. Only predecessors inside the lattice are returned.
+        """
+        predecessors = []
+        turn_checks = 0
+        for dx, dy, md in MOVE_DIRECTION:
+            if md == direction:
+                # Forward from (x - dx, y - dy) or backward from (x + dx, y + dy)
+                if self.grid.reachable(x, y):
+                    safe_cost = self.get_safe_cost(x, y)
+                    for px, py in ((x - dx, y - dy), (x + dx, y + dy)):
+                        if self.is_in_lattice(px, py):
+                            predecessors.append((px, py, md, safe_cost))
+                continue
+
+            offset = self.get_turn_offset(md, direction)
+            if offset is None:
+                continue
+
+            px, py = x - offset[0], y - offset[1]
+            if not self.is_in_lattice(px, py):
+                continue
+
+            if self.turn_table is None:
+                self.build_turn_table()
+
+            turn_checks += 1
+            if self.turn_table[px, py, md // 2, direction // 2]:
+                safe_cost = self.get_safe_cost(x, y)
+                predecessors.append((px, py, md, safe_cost + 10))
+
+        if self.stats is not None:
+            self.stats.add("neighbor_expansions")
+            self.stats.add("turn_checks", turn_checks)
+        return predecessors
+
+    def encode_state(self, x: int, y: int, direction: Direction) -> int:
+        """Encodes a (x, y, direction) state into its dense index in the state lattice.
+        Ordering by index is the same as ordering by (x, y, direction)."""
+        return (x * self.grid.size_y + y) * 4 + direction // 2
+
+    def decode_state(self, index: int) -> tuple:
+        """Decodes a dense state lattice index back into its (x, y, direction) state"""
+        xy, d = divmod(index, 4)
+        x, y = divmod(xy, self.grid.size_y)
+        return x, y, LATTICE_DIRECTIONS[d]
+
+    def is_in_lattice(self, x: int, y: int) -> bool:
+        """Checks whether the given x,y coordinate can be encoded in the state lattice"""
+        return 0 <= x < self.grid.size_x and 0 <= y < self.grid.size_y
+
+    def _allocate_search_buffers(self):
+        """Allocates the search buffers for the state lattice if not done yet"""
+        if self._g_distance is not None:
+            return
 
-            path.append(cursor)
+        n = self.grid.size_x * self.grid.size_y * 4
+        self._g_distance = array('d', [0.0]) * n
+        self._parent = array('l', [-1]) * n
+        self._g_stamp = array('L', [0]) * n
+        self._closed_stamp = array('L', [0]) * n
+        if self.search_mode == "bidirectional":
+            self._back_g_distance = array('d', [0.0]) * n
+            self._back_parent = array('l', [-1]) * n
+            self._back_g_stamp = array('L', [0]) * n
+            self._back_closed_stamp = array('L', [0]) * n
+
+    def path_cost_generator(self, states: List[CellState], n_sources: int = None):
+        """Searches the cost and path between every pair of states into cost_table and path_table
+
+        Args:
+            states (List[CellState]): states to connect
+            n_sources (int): only pairs with one of the first n_sources states are searched, all by default
+        """
+        stats = self.stats
+
+        def store_path(start, end, packed: array, cost: float):
+            self.cost_table[(start, end)] = cost
+            self.cost_table[(end, start)] = cost
+            self.path_table.put(start, end, packed)
+
+        def record_path(start, end, end_index: int, cost: float, parents=None):
+            # Only the states of the parent chain are kept, see PathTable
+            if parents is None:
+                parents = parent
+            chain = []
+            cursor = end_index
+
+            while cursor != -1:
+                chain.append(cursor)
+                cursor = parents[cursor]
 
-            self.path_table[(start, end)] = path[::-1]
-            self.path_table[(end, start)] = path
+            store_path(start, end, pack_path(self.decode_state(index) for index in reversed(chain)), cost)
 
         def astar_search(start: CellState, end: CellState):
             if (start, end) in self.path_table:
                 return
 
-            g_distance = {(start.x, start.y, start.direction): 0}
-            heap = [(self.compute_state_distance(start, end), start.x, start.y, start.direction)]
-            parent = dict()
-            visited = set()
+            if not self.is_in_lattice(start.x, start.y) or not self.is_in_lattice(end.x, end.y):
+                return
+
+            self.search_runs += 1
+            self._search_id += 1
+            search_id = self._search_id
+
+            start_index = self.encode_state(start.x, start.y, start.direction)
+            end_index = self.encode_state(end.x, end.y, end.direction)
+
+            if cost_to_go is not None:
+                # Cost-to-go of the end state, indexed by position relative to the end
+                end_table = cost_to_go[end.direction // 2]
+                offset_x, offset_y = extent - end.x, extent - end.y
+
+                def heuristic(x, y, direction):
+                    return int(end_table[direction // 2, x + offset_x, y + offset_y])
+            else:
+                def heuristic(x, y, direction):
+                    return self.compute_coord_distance(x, y, end.x, end.y)
+
+            g_distance[start_index] = 0
+            parent[start_index] = -1
+            g_stamp[start_index] = search_id
+            heap = [(heuristic(start.x, start.y, start.direction), start_index)]
+            expanded_nodes, stale_pops, found = self.expanded_nodes, 0, False
+
+            while heap:
+                _, cur_index = heapq.heappop(heap)
+
+                if closed_stamp[cur_index] == search_id:
+                    stale_pops += 1
+                    continue
+
+                if cur_index == end_index:
+                    record_path(start, end, end_index, g_distance[cur_index])
+                    found = True
+                    break
+
+                closed_stamp[cur_index] = search_id
+                self.expanded_nodes += 1
+                cur_distance = g_distance[cur_index]
+                cur_x, cur_y, cur_direction = self.decode_state(cur_index)
+
+                for next_x, next_y, new_direction, move_cost in self.get_moves(
+                        cur_x, cur_y, cur_direction, (end_index,)):
+                    next_index = self.encode_state(next_x, next_y, new_direction)
+                    if closed_stamp[next_index] == search_id:
+                        continue
+
+                    next_cost = cur_distance + move_cost + heuristic(next_x, next_y, new_direction)
+
+                    if g_stamp[next_index] != search_id or g_distance[next_index] > cur_distance + move_cost:
+                        g_distance[next_index] = cur_distance + move_cost
+                        parent[next_index] = cur_index
+                        g_stamp[next_index] = search_id
+
+                        heapq.heappush(heap, (next_cost, next_index))
+
+            if stats is not None:
+                # Every pop expanded a state, was stale or found the end
+                stats.add_search(self.expanded_nodes - expanded_nodes + stale_pops + found, stale_pops, len(heap))
+
+        def bidirectional_search(start: CellState, end: CellState):
+            # A* forward from the start over get_neighbors and backward from the end over get_predecessors,
+            # alternating on the smaller frontier. best is the cheapest path through a state reached from both
+            # sides so far, it is optimal once the smallest f-value of either frontier is no less than it.
+            if (start, end) in self.path_table:
+                return
+
+            if not self.is_in_lattice(start.x, start.y) or not self.is_in_lattice(end.x, end.y):
+                return
+
+            self.search_runs += 1
+            self._search_id += 1
+            search_id = self._search_id
+
+            start_index = self.encode_state(start.x, start.y, start.direction)
+            end_index = self.encode_state(end.x, end.y, end.direction)
+
+            if cost_to_go is not None:
+                end_table = cost_to_go[end.direction // 2]
+                start_direction = start.direction // 2
+
+                def forward_heuristic(x, y, direction):
+                    return int(end_table[direction // 2, x - end.x + extent, y - end.y + extent])
+
+                def backward_heuristic(x, y, direction):
+                    return int(cost_to_go[direction // 2, start_direction, start.x - x + extent, start.y - y + extent])
+            else:
+                def forward_heuristic(x, y, direction):
+                    return self.compute_coord_distance(x, y, end.x, end.y)
+
+                def backward_heuristic(x, y, direction):
+                    return self.compute_coord_distance(x, y, start.x, start.y)
+
+            g_distance[start_index] = 0
+            parent[start_index] = -1
+            g_stamp[start_index] = search_id
+            back_g_distance[end_index] = 0
+            back_parent[end_index] = -1
+            back_g_stamp[end_index] = search_id
+            forward_heap = [(forward_heuristic(start.x, start.y, start.direction), start_index)]
+            backward_heap = [(backward_heuristic(end.x, end.y, end.direction), end_index)]
+
+            best, meeting_index = math.inf, -1
+            expanded_nodes, stale_pops = self.expanded_nodes, 0
+            if start_index == end_index:
+                best, meeting_index = 0, start_index
+
+            while forward_heap and backward_heap:
+                if forward_heap[0][0] >= best or backward_heap[0][0] >= best:
+                    break
+
+                if len(forward_heap) <= len(backward_heap):
+                    _, cur_index = heapq.heappop(forward_heap)
+                    if closed_stamp[cur_index] == search_id:
+                        stale_pops += 1
+                        continue
+
+                    closed_stamp[cur_index] = search_id
+                    self.expanded_nodes += 1
+                    cur_distance = g_distance[cur_index]
+                    cur_x, cur_y, cur_direction = self.decode_state(cur_index)
+
+                    for next_x, next_y, new_direction, safe_cost in self.get_neighbors(cur_x, cur_y, cur_direction):
+                        next_index = self.encode_state(next_x, next_y, new_direction)
+                        if closed_stamp[next_index] == search_id:
+                            continue
+
+                        next_distance = cur_distance + \
+                            Direction.rotation_cost(new_direction, cur_direction) * TURN_FACTOR + 1 + safe_cost
+
+                        if g_stamp[next_index] != search_id or g_distance[next_index] > next_distance:
+                            g_distance[next_index] = next_distance
+                            parent[next_index] = cur_index
+                            g_stamp[next_index] = search_id
+                            heapq.heappush(forward_heap, (
+                                next_distance + forward_heuristic(next_x, next_y, new_direction), next_index))
+
+                            if back_g_stamp[next_index] == search_id and \
+                                    next_distance + back_g_distance[next_index] < best:
+                                best, meeting_index = next_distance + back_g_distance[next_index], next_index
+                else:
+                    _, cur_index = heapq.heappop(backward_heap)
+                    if back_closed_stamp[cur_index] == search_id:
+                        stale_pops += 1
+                        continue
+
+                    back_closed_stamp[cur_index] = search_id
+                    self.expanded_nodes += 1
+                    cur_distance = back_g_distance[cur_index]
+                    cur_x, cur_y, cur_direction = self.decode_state(cur_index)
+
+                    for prev_x, prev_y, prev_direction, safe_cost in self.get_predecessors(
+                            cur_x, cur_y, cur_direction):
+                        prev_index = self.encode_state(prev_x, prev_y, prev_direction)
+                        if back_closed_stamp[prev_index] == search_id:
+                            continue
+                        # The forward search only ever leaves the start or reachable cells
+                        if prev_index != start_index and not self.grid.reachable(prev_x, prev_y):
+                            continue
+
+                        prev_distance = cur_distance + \
+                            Direction.rotation_cost(cur_direction, prev_direction) * TURN_FACTOR + 1 + safe_cost
+
+                        if back_g_stamp[prev_index] != search_id or back_g_distance[prev_index] > prev_distance:
+                            back_g_distance[prev_index] = prev_distance
+                            back_parent[prev_index] = cur_index
+                            back_g_stamp[prev_index] = search_id
+                            heapq.heappush(backward_heap, (
+                                prev_distance + backward_heuristic(prev_x, prev_y, prev_direction), prev_index))
+
+                            if g_stamp[prev_index] == search_id and prev_distance + g_distance[prev_index] < best:
+                                best, meeting_index = prev_distance + g_distance[prev_index], prev_index
+
+            if stats is not None:
+                stats.add_search(self.expanded_nodes - expanded_nodes + stale_pops, stale_pops,
+                                 len(forward_heap) + len(backward_heap))
+
+            if meeting_index == -1:
+                return
+
+            # Splice the forward half up to the meeting state with the backward half after it
+            path = []
+            cursor = meeting_index
+            while cursor != -1:
+                path.append(self.decode_state(cursor))
+                cursor = parent[cursor]
+            path.reverse()
+
+            cursor = back_parent[meeting_index]
+            while cursor != -1:
+                path.append(self.decode_state(cursor))
+                cursor = back_parent[cursor]
+
+            store_path(start, end, pack_path(path), best)
+
+        def dijkstra_search(start: CellState, ends: List[CellState]):
+            # Single-source search that settles every target state in one sweep of the lattice
+            if not self.is_in_lattice(start.x, start.y):
+                return
+
+            pending = dict()
+            for end in ends:
+                if (start, end) in self.path_table or not self.is_in_lattice(end.x, end.y):
+                    continue
+                pending.setdefault(self.encode_state(end.x, end.y, end.direction), []).append(end)
+
+            if not pending:
+                return
+
+            self.search_runs += 1
+            self._search_id += 1
+            search_id = self._search_id
+
+            start_index = self.encode_state(start.x, start.y, start.direction)
+            g_distance[start_index] = 0
+            parent[start_index] = -1
+            g_stamp[start_index] = search_id
+            heap = [(0, start_index)]
+            expanded_nodes, stale_pops, done = self.expanded_nodes, 0, False
 
             while heap:
-                _, cur_x, cur_y, cur_direction = heapq.heappop(heap)
-                
-                if (cur_x, cur_y, cur_direction) in visited:
+                cur_distance, cur_index = heapq.heappop(heap)
+
+                if closed_stamp[cur_index] == search_id:
+                    stale_pops += 1
                     continue
 
-                if end.is_eq(cur_x, cur_y, cur_direction):
-                    record_path(start, end, parent, g_distance[(cur_x, cur_y, cur_direction)])
-                    return
+                if cur_index in pending:
+                    for end in pending.pop(cur_index):
+                        record_path(start, end, cur_index, g_distance[cur_index])
+                    if not pending:
+                        done = True
+                        break
+
+                closed_stamp[cur_index] = search_id
+                self.expanded_nodes += 1
+                cur_x, cur_y, cur_direction = self.decode_state(cur_index)
+
+                for next_x, next_y, new_direction, move_cost in self.get_moves(
+                        cur_x, cur_y, cur_direction, pending):
+                    next_index = self.encode_state(next_x, next_y, new_direction)
+                    if closed_stamp[next_index] == search_id:
+                        continue
+
+                    next_distance = cur_distance + move_cost
+
+                    if g_stamp[next_index] != search_id or g_distance[next_index] > next_distance:
+                        g_distance[next_index] = next_distance
+                        parent[next_index] = cur_index
+                        g_stamp[next_index] = search_id
+
+                        heapq.heappush(heap, (next_distance, next_index))
+
+            if stats is not None:
+                # Every pop expanded a state, was stale or settled the last end
+                stats.add_search(self.expanded_nodes - expanded_nodes + stale_pops + done, stale_pops, len(heap))
+
+        def session_search(start: CellState, ends: List[CellState]):
+            # Resumes the Dijkstra search tree of the start state kept in the session until every end is settled.
+            # A settled state is expanded before the search stops, so the tree can be picked up where it was left.
+            if not self.is_in_lattice(start.x, start.y):
+                return
+
+            tree = self.session.get_tree(self.encode_state(start.x, start.y, start.direction), len(g_distance))
+            tree_distance, tree_parent, closed, heap = tree.g_distance, tree.parent, tree.closed, tree.heap
 
-                visited.add((cur_x, cur_y, cur_direction))
-                cur_distance = g_distance[(cur_x, cur_y, cur_direction)]
+            # The heap of the tree already holds the states queued by earlier searches
+            expanded_nodes, stale_pops, queued = self.expanded_nodes, 0, len(heap)
 
-                for next_x, next_y, new_direction, safe_cost in self.get_neighbors(cur_x, cur_y, cur_direction):
-                    if (next_x, next_y, new_direction) in visited:
+            pending = dict()
+            for end in ends:
+                if (start, end) in self.path_table or not self.is_in_lattice(end.x, end.y):
+                    continue
+                end_index = self.encode_state(end.x, end.y, end.direction)
+                # With macro moves, a state in the middle of a straight run only gets the cost of the run if it
+                # is a goal when the run is expanded, and is settled with the cost of its other moves otherwise.
+                # The runs of the settled states of its line are added here. Paths through states not settled
+                # yet cost at least as much as the top of the heap, so the end still gets its cheapest cost.
+                for origin_x, origin_y, cost in self.get_run_origins(end.x, end.y, end.direction):
+                    origin_index = self.encode_state(origin_x, origin_y, end.direction)
+                    if closed[origin_index] and tree_distance[origin_index] + cost < tree_distance[end_index]:
+                        tree_distance[end_index] = tree_distance[origin_index] + cost
+                        tree_parent[end_index] = origin_index
+                        if not closed[end_index]:
+                            heapq.heappush(heap, (tree_distance[end_index], end_index))
+
+                if closed[end_index]:
+                    record_path(start, end, end_index, tree_distance[end_index], tree_parent)
+                else:
+                    pending.setdefault(end_index, []).append(end)
+
+            if pending:
+                self.search_runs += 1
+            while heap and pending:
+                cur_distance, cur_index = heapq.heappop(heap)
+
+                if closed[cur_index]:
+                    stale_pops += 1
+                    continue
+
+                closed[cur_index] = 1
+                self.expanded_nodes += 1
+                cur_x, cur_y, cur_direction = self.decode_state(cur_index)
+
+                for next_x, next_y, new_direction, move_cost in self.get_moves(
+                        cur_x, cur_y, cur_direction, pending):
+                    next_index = self.encode_state(next_x, next_y, new_direction)
+                    if closed[next_index]:
                         continue
 
-                    move_cost = Direction.rotation_cost(new_direction, cur_direction) * TURN_FACTOR + 1 + safe_cost
+                    next_distance = cur_distance + move_cost
+
+                    if tree_distance[next_index] > next_distance:
+                        tree_distance[next_index] = next_distance
+                        tree_parent[next_index] = cur_index
+                        heapq.heappush(heap, (next_distance, next_index))
+
+                if cur_index in pending:
+                    for end in pending.pop(cur_index):
+                        record_path(start, end, cur_index, tree_distance[cur_index], tree_parent)
+
+            if stats is not None:
+                stats.add_search(self.expanded_nodes - expanded_nodes + stale_pops, stale_pops, len(heap) - queued)
+
+        def field_search(batches: list):
+            sources = [start for start, _ends in batches]
+            self.search_runs += len(sources)
+            for (start, ends), field in zip(batches, cost_fields(self, sources)):
+                self.expanded_nodes += int(np.count_nonzero(np.isfinite(field)))
+                for end in ends:
+                    if self.is_in_lattice(end.x, end.y) and np.isfinite(field[end.direction // 2, end.x, end.y]):
+                        # Only the cost is kept, the path is traced by search_path if it is read
+                        store_path(start, end, None, float(field[end.direction // 2, end.x, end.y]))
+
+        n_sources = len(states) - 1 if n_sources is None else min(n_sources, len(states) - 1)
+
+        if self.search_mode == "hierarchical":
+            cluster_graph = self.get_cluster_graph()
+            for i in range(n_sources):
+                ends = [end for end in states[i + 1:] if self.is_in_lattice(end.x, end.y)]
+                if not ends or not self.is_in_lattice(states[i].x, states[i].y):
+                    continue
+                self.search_runs += 1
+                for end, cost in zip(ends, cluster_graph.costs_from(states[i], ends)):
+                    if cost is not None:
+                        # Only the coarse cost is kept, the path is refined by search_path if it is read
+                        store_path(states[i], end, None, cost)
+            return
+
+        if self.pool is not None and self.session is None:
+            batches = [(states[i], [end for end in states[i + 1:] if not self.load_cached_pair(states[i], end)])
+                       for i in range(n_sources)]
+            for (start, ends), results in zip(batches, self.pool.search(self, batches)):
+                for end, result in zip(ends, results):
+                    if result is not None and (start, end) not in self.path_table:
+                        store_path(start, end, result[1], result[0])
+                if self.cached_pairs is not None:
+                    for end in ends:
+                        self.store_cached_pair(start, end)
+            return
+
+        if self.search_mode == "field" and self.session is None:
+            batches = [(states[i], [end for end in states[i + 1:] if not self.load_cached_pair(states[i], end)])
+                       for i in range(n_sources)]
+            searched = [(start, ends) for start, ends in batches if ends and self.is_in_lattice(start.x, start.y)]
+            for k in range(0, len(searched), FIELD_BATCH):
+                field_search(searched[k:k + FIELD_BATCH])
+            if self.cached_pairs is not None:
+                for start, ends in batches:
+                    for end in ends:
+                        self.store_cached_pair(start, end)
+            return
+
+        self._allocate_search_buffers()
+        g_distance, parent = self._g_distance, self._parent
+        g_stamp, closed_stamp = self._g_stamp, self._closed_stamp
+        back_g_distance, back_parent = self._back_g_distance, self._back_parent
+        back_g_stamp, back_closed_stamp = self._back_g_stamp, self._back_closed_stamp
+
+        cost_to_go = None
+        extent = max(self.grid.size_x, self.grid.size_y) - 1
+        if self.heuristic == "table" and self.search_mode in ("astar", "bidirectional"):
+            cost_to_go = load_cost_to_go(extent)
+
+        session = self.session
+        if session is not None:
+            session.lock.acquire()
+            if self.turn_table is None and session.turn_table is not None:
+                self.turn_table, self.turn_landing = session.turn_table, session.turn_landing
+            # Filled in place by get_macro_moves, so later plans of the layout start with the moves found so far
+            self.macro_move_table = session.macro_move_table
+
+        try:
+            for i in range(n_sources):
+                ends = [end for end in states[i + 1:] if not self.load_cached_pair(states[i], end)]
+
+                if session is not None:
+                    session_search(states[i], ends)
+                elif self.search_mode == "dijkstra":
+                    dijkstra_search(states[i], ends)
+                elif self.search_mode == "bidirectional":
+                    for end in ends:
+                        bidirectional_search(states[i], end)
+                else:
+                    for end in ends:
+                        astar_search(states[i], end)
+
+                if self.cached_pairs is not None:
+                    for end in ends:
+                        self.store_cached_pair(states[i], end)
+        finally:
+            if session is not None:
+                if session.turn_table is None and self.turn_table is not None:
+                    session.turn_table, session.turn_landing = self.turn_table, self.turn_landing
+                session.lock.release()
 
-                    next_cost = cur_distance + move_cost + \
-                                self.compute_coord_distance(next_x, next_y, end.x, end.y)
+    @staticmethod
+    def pair_key(start: CellState, end: CellState) -> tuple:
+        return (start.x, start.y, int(start.direction)), (end.x, end.y, int(end.direction))
+
+    def load_cached_pair(self, start: CellState, end: CellState) -> bool:
+        """Fills the cost and path tables for the pair from the cached pairs of the layout
 
-                    if (next_x, next_y, new_direction) not in g_distance or \
-                            g_distance[(next_x, next_y, new_direction)] > cur_distance + move_cost:
-                        g_distance[(next_x, next_y, new_direction)] = cur_distance + move_cost
-                        parent[(next_x, next_y, new_direction)] = (cur_x, cur_y, cur_direction)
+        Returns
+        -------
+        bool: True if the pair was cached, whether or not the states are connected
+        """
+        if not self.cached_pairs or (start, end) in self.path_table:
+            return False
 
-                        heapq.heappush(heap, (next_cost, next_x, next_y, new_direction))
+        key = self.pair_key(start, end)
+        if key not in self.cached_pairs:
+            return False
 
-        for i in range(len(states) - 1):
-            for j in range(i + 1, len(states)):
-                astar_search(states[i], states[j])
+        value = self.cached_pairs[key]
+        if value is not None:
+            cost, packed = value
+            self.cost_table[(start, end)] = cost
+            self.cost_table[(end, start)] = cost
+            self.path_table.put(start, end, packed)
+        return True
+
+    def store_cached_pair(self, start: CellState, end: CellState):
+        """Records the result of the search between the pair in the cached pairs of the layout"""
+        key = self.pair_key(start, end)
+        if key in self.cached_pairs:
+            return
+
+        if (start, end) in self.path_table:
+            self.cached_pairs[key] = (self.cost_table[(start, end)], self.path_table.get_packed(start, end))
+        else:
+            self.cached_pairs[key] = None
+        self._new_pairs += 1
 
 if __name__ == "__main__":
     pass
@@ -0,0 +1,385 @@
+"""
+Benchmarks for the path planning algorithm.
+
+Run from the repository root, e.g.
+
+    python -m algo.benchmark search
+"""
+import argparse
+import random
+import time
+import numpy as np
+from algo.algo import MazeSolver
+from algo.hierarchical import CLUSTER_SIZE
+from algo.parallel import SearchPool
+from entities.Entity import CellState
+from algo.tsp import solve_tsp_held_karp
+from consts import Direction, WIDTH, HEIGHT
+
+
+def random_layout(n_obstacles: int, seed: int, size_x: int = WIDTH, size_y: int = HEIGHT):
+    """Generates a random obstacle layout that keeps the start zone in the bottom left corner free
+
+    Inputs
+    ------
+    n_obstacles: int - number of obstacles
+    seed: int - seed of the random generator
+    size_x, size_y: int - size of the arena
+
+    Returns
+    -------
+    list of obstacles, each obstacle is a dictionary with keys "x", "y", "d", and "id"
+    """
+    rnd = random.Random(seed)
+    obstacles = []
+    used = set()
+    while len(obstacles) < n_obstacles:
+        x, y = rnd.randint(0, size_x - 1), rnd.randint(0, size_y - 1)
+        if (x, y) in used or (x < 5 and y < 5):
+            continue
+        used.add((x, y))
+        obstacles.append({'x': x, 'y': y, 'd': rnd.choice([0, 2, 4, 6]), 'id': len(obstacles) + 1})
+    return obstacles
+
+
+def build_solver(obstacles, size_x: int = WIDTH, size_y: int = HEIGHT, **kwargs) -> MazeSolver:
+    """Creates a MazeSolver with the robot at (1, 1) facing north and the given obstacles"""
+    maze_solver = MazeSolver(size_x, size_y, 1, 1, Direction.NORTH, **kwargs)
+    for ob in obstacles:
+        maze_solver.add_obstacle(ob['x'], ob['y'], ob['d'], ob['id'])
+    return maze_solver
+
+
+def timed(fn, *args, **kwargs):
+    """Runs fn and returns (result, elapsed seconds)"""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def bench_search(args):
+    """Compares the pairwise A* against the single-source multi-target Dijkstra in path_cost_generator"""
+    print(f"{'obstacles':>9} {'states':>6} {'pairs':>6} {'astar (s)':>10} {'dijkstra (s)':>12} {'speedup':>8}")
+    for n in args.obstacles:
+        totals = {"astar": 0.0, "dijkstra": 0.0}
+        states = pairs = 0
+        for seed in range(args.seeds):
+            obstacles = random_layout(n, seed)
+            costs = dict()
+            for mode in totals:
+                maze_solver = build_solver(obstacles, search_mode=mode)
+                items = [maze_solver.robot.get_start_state()]
+                for view_states in maze_solver.grid.get_view_obstacle_positions(False):
+                    items += view_states
+                _, elapsed = timed(maze_solver.path_cost_generator, items)
+                totals[mode] += elapsed
+                costs[mode] = [maze_solver.cost_table.get((items[i], items[j]))
+                               for i in range(len(items)) for j in range(i + 1, len(items))]
+            assert costs["astar"] == costs["dijkstra"], "search modes disagree on path costs"
+            states += len(items)
+            pairs += len(items) * (len(items) - 1) // 2
+
+        print(f"{n:>9} {states / args.seeds:>6.1f} {pairs / args.seeds:>6.0f} {totals['astar'] / args.seeds:>10.3f} "
+              f"{totals['dijkstra'] / args.seeds:>12.3f} {totals['astar'] / totals['dijkstra']:>7.1f}x")
+
+
+def bench_heuristic(args):
+    """Compares the Manhattan A* heuristic against the obstacle-free cost-to-go table in expanded nodes"""
+    print(f"{'obstacles':>9} {'manhattan nodes':>15} {'table nodes':>11} {'ratio':>6} "
+          f"{'manhattan (s)':>13} {'table (s)':>9}")
+    for n in args.obstacles:
+        nodes = {"manhattan": 0, "table": 0}
+        totals = {"manhattan": 0.0, "table": 0.0}
+        for seed in range(args.seeds):
+            obstacles = random_layout(n, seed)
+            costs = dict()
+            for heuristic in nodes:
+                maze_solver = build_solver(obstacles, heuristic=heuristic)
+                items = [maze_solver.robot.get_start_state()]
+                for view_states in maze_solver.grid.get_view_obstacle_positions(False):
+                    items += view_states
+                _, elapsed = timed(maze_solver.path_cost_generator, items)
+                totals[heuristic] += elapsed
+                nodes[heuristic] += maze_solver.expanded_nodes
+                costs[heuristic] = [maze_solver.cost_table.get((items[i], items[j]))
+                                    for i in range(len(items)) for j in range(i + 1, len(items))]
+            assert costs["manhattan"] == costs["table"], "heuristics disagree on path costs"
+
+        print(f"{n:>9} {nodes['manhattan'] / args.seeds:>15.0f} {nodes['table'] / args.seeds:>11.0f} "
+              f"{nodes['manhattan'] / nodes['table']:>5.1f}x {totals['manhattan'] / args.seeds:>13.3f} "
+              f"{totals['table'] / args.seeds:>9.3f}")
+
+
+def bench_bidirectional(args):
+    """Compares unidirectional and bidirectional A* on long pairs between opposite corners of the arena"""
+    print(f"{'obstacles':>9} {'pairs':>5} {'astar nodes':>11} {'bidir nodes':>11} {'ratio':>6} "
+          f"{'astar (s)':>9} {'bidir (s)':>9}")
+    directions = [Direction.NORTH, Direction.EAST, Direction.SOUTH, Direction.WEST]
+    for n in args.obstacles:
+        nodes = {"astar": 0, "bidirectional": 0}
+        totals = {"astar": 0.0, "bidirectional": 0.0}
+        n_pairs = 0
+        for seed in range(args.seeds):
+            obstacles = random_layout(n, seed)
+            rnd = random.Random(seed)
+            probe = build_solver(obstacles)
+            pairs = []
+            while len(pairs) < args.pairs:
+                start = CellState(rnd.randint(1, 4), rnd.randint(1, 4), rnd.choice(directions))
+                end = CellState(WIDTH - 1 - rnd.randint(1, 4), HEIGHT - 1 - rnd.randint(1, 4), rnd.choice(directions))
+                if probe.grid.reachable(start.x, start.y) and probe.grid.reachable(end.x, end.y):
+                    pairs.append((start, end))
+
+            costs = dict()
+            for mode in nodes:
+                maze_solver = build_solver(obstacles, search_mode=mode)
+                for start, end in pairs:
+                    _, elapsed = timed(maze_solver.path_cost_generator, [start, end])
+                    totals[mode] += elapsed
+                nodes[mode] += maze_solver.expanded_nodes
+                costs[mode] = [maze_solver.cost_table.get(pair) for pair in pairs]
+            assert costs["astar"] == costs["bidirectional"], "search modes disagree on path costs"
+            n_pairs += len(pairs)
+
+        print(f"{n:>9} {n_pairs:>5} {nodes['astar'] / n_pairs:>11.0f} {nodes['bidirectional'] / n_pairs:>11.0f} "
+              f"{nodes['astar'] / nodes['bidirectional']:>5.1f}x {totals['astar']:>9.3f} "
+              f"{totals['bidirectional']:>9.3f}")
+
+
+def bench_macro(args):
+    """Compares per-cell straight moves against macro moves along whole straight runs in expanded nodes"""
+    print(f"{'mode':>8} {'obstacles':>9} {'cell nodes':>10} {'macro nodes':>11} {'ratio':>6} "
+          f"{'cell (s)':>8} {'macro (s)':>9}")
+    for mode in ("astar", "dijkstra"):
+        for n in args.obstacles:
+            nodes = {False: 0, True: 0}
+            totals = {False: 0.0, True: 0.0}
+            for seed in range(args.seeds):
+                obstacles = random_layout(n, seed)
+                costs = dict()
+                for macro_moves in nodes:
+                    maze_solver = build_solver(obstacles, search_mode=mode, macro_moves=macro_moves)
+                    items = [maze_solver.robot.get_start_state()]
+                    for view_states in maze_solver.grid.get_view_obstacle_positions(False):
+                        items += view_states
+                    _, elapsed = timed(maze_solver.path_cost_generator, items)
+                    totals[macro_moves] += elapsed
+                    nodes[macro_moves] += maze_solver.expanded_nodes
+                    costs[macro_moves] = [maze_solver.cost_table.get((items[i], items[j]))
+                                          for i in range(len(items)) for j in range(i + 1, len(items))]
+                assert costs[False] == costs[True], "macro moves change the path costs"
+
+            print(f"{mode:>8} {n:>9} {nodes[False] / args.seeds:>10.0f} {nodes[True] / args.seeds:>11.0f} "
+                  f"{nodes[False] / nodes[True]:>5.1f}x {totals[False] / args.seeds:>8.3f} "
+                  f"{totals[True] / args.seeds:>9.3f}")
+
+
+def bench_parallel(args):
+    """Compares the serial pairwise searches against the searches handed out to a pool of worker processes"""
+    pool = SearchPool(args.workers)
+    # Starts the workers and loads the cost-to-go table in them, which a persistent pool only pays once
+    warmup = build_solver(random_layout(1, 0), pool=pool)
+    warmup.path_cost_generator([warmup.robot.get_start_state()] +
+                               [view_state for view_states in warmup.grid.get_view_obstacle_positions(False)
+                                for view_state in view_states] * pool.max_workers)
+
+    print(f"workers: {pool.max_workers}")
+    print(f"{'mode':>13} {'obstacles':>9} {'pairs':>6} {'serial (s)':>10} {'pool (s)':>8} {'speedup':>8}")
+    for mode in ("astar", "dijkstra"):
+        for n in args.obstacles:
+            totals = {False: 0.0, True: 0.0}
+            pairs = 0
+            for seed in range(args.seeds):
+                obstacles = random_layout(n, seed)
+                costs = dict()
+                for parallel in totals:
+                    maze_solver = build_solver(obstacles, search_mode=mode, pool=pool if parallel else None)
+                    items = [maze_solver.robot.get_start_state()]
+                    for view_states in maze_solver.grid.get_view_obstacle_positions(True):
+                        items += view_states
+                    _, elapsed = timed(maze_solver.path_cost_generator, items)
+                    totals[parallel] += elapsed
+                    costs[parallel] = [maze_solver.cost_table.get((items[i], items[j]))
+                                       for i in range(len(items)) for j in range(i + 1, len(items))]
+                assert costs[False] == costs[True], "the pool disagrees with the serial searches"
+                pairs += len(items) * (len(items) - 1) // 2
+
+            print(f"{mode:>13} {n:>9} {pairs / args.seeds:>6.0f} {totals[False] / args.seeds:>10.3f} "
+                  f"{totals[True] / args.seeds:>8.3f} {totals[False] / totals[True]:>7.1f}x")
+    pool.shutdown()
+
+
+def bench_combinations(args):
+    """Compares the serial evaluation of view state combinations of the enumerate planner against the pool"""
+    pool = SearchPool(args.workers)
+    pool.get_executor().submit(int).result()
+
+    print(f"workers: {pool.max_workers}")
+    print(f"{'obstacles':>9} {'serial (s)':>10} {'pool (s)':>8} {'speedup':>8}")
+    for n in args.obstacles:
+        totals = {False: 0.0, True: 0.0}
+        for seed in range(args.seeds):
+            obstacles = random_layout(n, seed)
+            plans = dict()
+            for parallel in totals:
+                maze_solver = build_solver(obstacles, planner="enumerate", pool=pool if parallel else None)
+                # The searches are done up front, so that only the combinations are timed
+                items = [maze_solver.robot.get_start_state()]
+                for view_states in maze_solver.grid.get_view_obstacle_positions(False):
+                    items += view_states
+                maze_solver.path_cost_generator(items)
+                (path, distance), elapsed = timed(maze_solver.get_optimal_order_dp, False)
+                totals[parallel] += elapsed
+                plans[parallel] = (distance, path.states.tolist())
+            assert plans[False] == plans[True], "the pool disagrees with the serial planner"
+
+        print(f"{n:>9} {totals[False] / args.seeds:>10.3f} {totals[True] / args.seeds:>8.3f} "
+              f"{totals[False] / totals[True]:>7.1f}x")
+    pool.shutdown()
+
+
+def bench_scaling(args):
+    """Times planning a layout of the same number of obstacles on growing arenas, with the per-pair A* on the
+    smaller arenas and the cost fields of algo/field.py on all of them"""
+    print(f"{'size':>5} {'mode':>6} {'states':>6} {'pairs':>6} {'search (s)':>10} {'plan (s)':>8}")
+    for size in args.sizes:
+        modes = ("astar", "field") if size <= args.astar_max_size else ("field",)
+        costs = dict()
+        for mode in modes:
+            totals = [0.0, 0.0]
+            for seed in range(args.seeds):
+                obstacles = random_layout(args.obstacles, seed, size, size)
+                maze_solver = build_solver(obstacles, size, size, search_mode=mode)
+                items = [maze_solver.robot.get_start_state()]
+                for view_states in maze_solver.grid.get_view_obstacle_positions(False):
+                    items += view_states
+                _, elapsed = timed(maze_solver.path_cost_generator, items)
+                totals[0] += elapsed
+                costs[(mode, seed)] = [maze_solver.cost_table.get((items[i], items[j]))
+                                       for i in range(len(items)) for j in range(i + 1, len(items))]
+
+                # The tour is planned on a fresh solver, so that the search is timed as part of it
+                maze_solver = build_solver(obstacles, size, size, search_mode=mode)
+                _, elapsed = timed(maze_solver.get_optimal_order_dp, False)
+                totals[1] += elapsed
+                if mode != modes[0]:
+                    assert costs[(mode, seed)] == costs[(modes[0], seed)], "search modes disagree on path costs"
+
+            print(f"{size:>5} {mode:>6} {len(items):>6} {len(items) * (len(items) - 1) // 2:>6} "
+                  f"{totals[0] / args.seeds:>10.3f} {totals[1] / args.seeds:>8.3f}")
+
+
+def bench_hierarchical(args):
+    """Compares planning with the exact cost fields against the hierarchical planner of algo/hierarchical.py,
+    in time and in distance of the planned path"""
+    print(f"{'size':>5} {'field (s)':>9} {'hierarchical (s)':>16} {'field':>7} {'hierarchical':>12} {'longer':>7}")
+    for size in args.sizes:
+        totals = {"field": [0.0, 0.0], "hierarchical": [0.0, 0.0]}
+        for seed in range(args.seeds):
+            obstacles = random_layout(args.obstacles, seed, size, size)
+            for mode, total in totals.items():
+                maze_solver = build_solver(obstacles, size, size, search_mode=mode, cluster_size=args.cluster_size)
+                (_, distance), elapsed = timed(maze_solver.get_optimal_order_dp, False)
+                total[0] += elapsed
+                total[1] += distance
+
+        field, hierarchical = totals["field"], totals["hierarchical"]
+        print(f"{size:>5} {field[0] / args.seeds:>9.3f} {hierarchical[0] / args.seeds:>16.3f} "
+              f"{field[1] / args.seeds:>7.0f} {hierarchical[1] / args.seeds:>12.0f} "
+              f"{(hierarchical[1] / field[1] - 1) * 100:>6.1f}%")
+
+
+def bench_tsp(args):
+    """Compares the vectorized Held-Karp against python_tsp on random open-path TSP instances"""
+    try:
+        from python_tsp.exact import solve_tsp_dynamic_programming
+    except ImportError:
+        solve_tsp_dynamic_programming = None
+        print("python_tsp is not installed, only timing the in-tree Held-Karp")
+
+    print(f"{'nodes':>5} {'held-karp (ms)':>14} {'python_tsp (ms)':>15} {'speedup':>8}")
+    rnd = np.random.default_rng(0)
+    for n in args.nodes:
+        totals = [0.0, 0.0]
+        for _ in range(args.repeats):
+            # Same convention as get_optimal_order_dp: symmetric costs and a free return to the start
+            cost_np = rnd.integers(1, 100, (n, n)).astype(float)
+            cost_np = np.triu(cost_np, 1) + np.triu(cost_np, 1).T
+            cost_np[:, 0] = 0
+
+            (_, distance), elapsed = timed(solve_tsp_held_karp, cost_np)
+            totals[0] += elapsed
+            if solve_tsp_dynamic_programming is not None:
+                (_, expected), elapsed = timed(solve_tsp_dynamic_programming, cost_np)
+                totals[1] += elapsed
+                assert abs(distance - expected) < 1e-6, "Held-Karp disagrees with python_tsp"
+
+        held_karp_ms, python_tsp_ms = totals[0] * 1000 / args.repeats, totals[1] * 1000 / args.repeats
+        if solve_tsp_dynamic_programming is None:
+            print(f"{n:>5} {held_karp_ms:>14.2f} {'-':>15} {'-':>8}")
+        else:
+            print(f"{n:>5} {held_karp_ms:>14.2f} {python_tsp_ms:>15.2f} {python_tsp_ms / held_karp_ms:>7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    search = subparsers.add_parser("search", help=bench_search.__doc__)
+    search.add_argument("--obstacles", type=int, nargs="+", default=[4, 6, 8])
+    search.add_argument("--seeds", type=int, default=3)
+    search.set_defaults(run=bench_search)
+
+    heuristic = subparsers.add_parser("heuristic", help=bench_heuristic.__doc__)
+    heuristic.add_argument("--obstacles", type=int, nargs="+", default=[4, 6, 8])
+    heuristic.add_argument("--seeds", type=int, default=3)
+    heuristic.set_defaults(run=bench_heuristic)
+
+    bidirectional = subparsers.add_parser("bidirectional", help=bench_bidirectional.__doc__)
+    bidirectional.add_argument("--obstacles", type=int, nargs="+", default=[4, 6, 8])
+    bidirectional.add_argument("--seeds", type=int, default=3)
+    bidirectional.add_argument("--pairs", type=int, default=20)
+    bidirectional.set_defaults(run=bench_bidirectional)
+
+    macro = subparsers.add_parser("macro", help=bench_macro.__doc__)
+    macro.add_argument("--obstacles", type=int, nargs="+", default=[4, 6, 8])
+    macro.add_argument("--seeds", type=int, default=3)
+    macro.set_defaults(run=bench_macro)
+
+    parallel = subparsers.add_parser("parallel", help=bench_parallel.__doc__)
+    parallel.add_argument("--obstacles", type=int, nargs="+", default=[6, 8])
+    parallel.add_argument("--seeds", type=int, default=3)
+    parallel.add_argument("--workers", type=int, default=None)
+    parallel.set_defaults(run=bench_parallel)
+
+    combinations = subparsers.add_parser("combinations", help=bench_combinations.__doc__)
+    combinations.add_argument("--obstacles", type=int, nargs="+", default=[5, 6])
+    combinations.add_argument("--seeds", type=int, default=3)
+    combinations.add_argument("--workers", type=int, default=None)
+    combinations.set_defaults(run=bench_combinations)
+
+    scaling = subparsers.add_parser("scaling", help=bench_scaling.__doc__)
+    scaling.add_argument("--sizes", type=int, nargs="+", default=[20, 50, 100, 200])
+    scaling.add_argument("--obstacles", type=int, default=20)
+    scaling.add_argument("--seeds", type=int, default=1)
+    scaling.add_argument("--astar-max-size", type=int, default=20)
+    scaling.set_defaults(run=bench_scaling)
+
+    hierarchical = subparsers.add_parser("hierarchical", help=bench_hierarchical.__doc__)
+    hierarchical.add_argument("--sizes", type=int, nargs="+", default=[100, 200, 400])
+    hierarchical.add_argument("--obstacles", type=int, default=20)
+    hierarchical.add_argument("--seeds", type=int, default=1)
+    hierarchical.add_argument("--cluster-size", type=int, default=CLUSTER_SIZE)
+    hierarchical.set_defaults(run=bench_hierarchical)
+
+    tsp = subparsers.add_parser("tsp", help=bench_tsp.__doc__)
+    tsp.add_argument("--nodes", type=int, nargs="+", default=list(range(5, 15)))
+    tsp.add_argument("--repeats", type=int, default=3)
+    tsp.set_defaults(run=bench_tsp)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
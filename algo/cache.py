@@ -0,0 +1,133 @@
+import hashlib
+import json
+import threading
+from array import array
+from collections import OrderedDict
+from consts import Direction, TURN_FACTOR, TURN_RADIUS, EXPANDED_CELL, SAFE_COST, SCREENSHOT_COST
+
+# Rough size of a cached pair without its path: dict slot, key tuples and value tuple
+PAIR_OVERHEAD_BYTES = 300
+
+
+def layout_key(size_x: int, size_y: int, obstacles, start, retrying: bool) -> str:
+    """Canonical hash of everything the pairwise costs and paths of a layout depend on
+
+    Obstacle ids only label the screenshots and are left out, and the obstacles are sorted, so the same
+    layout sent in a different order or with different ids maps to the same key.
+
+    Inputs
+    ------
+    size_x, size_y: int - size of the arena
+    obstacles: list of Obstacle objects
+    start: CellState - start state of the robot
+    retrying: bool - whether the view states for a retry are used
+
+    Returns
+    -------
+    str: hex digest identifying the layout
+    """
+    layout = {
+        'size': [size_x, size_y],
+        'obstacles': sorted([ob.x, ob.y, int(ob.direction)] for ob in obstacles),
+        'start': [start.x, start.y, int(start.direction)],
+        'retrying': bool(retrying),
+        'constants': [TURN_FACTOR, TURN_RADIUS, EXPANDED_CELL, SAFE_COST, SCREENSHOT_COST],
+    }
+    return hashlib.sha256(json.dumps(layout, sort_keys=True).encode()).hexdigest()
+
+
+def obstacle_key(size_x: int, size_y: int, obstacles) -> str:
+    """Canonical hash of what the searches over the lattice depend on, the arena and its obstacles.
+    Unlike layout_key, it is the same for the first plan of a layout and its retries.
+    """
+    layout = {
+        'size': [size_x, size_y],
+        'obstacles': sorted([ob.x, ob.y, int(ob.direction)] for ob in obstacles),
+        'constants': [TURN_FACTOR, TURN_RADIUS, EXPANDED_CELL, SAFE_COST],
+    }
+    return hashlib.sha256(json.dumps(layout, sort_keys=True).encode()).hexdigest()
+
+
+def pack_path(path) -> array:
+    """Packs a path of (x, y, direction) tuples into a flat array of 16-bit integers"""
+    packed = array('h')
+    for x, y, direction in path:
+        packed.extend((x, y, int(direction)))
+    return packed
+
+
+def unpack_path(packed: array) -> list:
+    """Inverse of pack_path"""
+    return [(packed[i], packed[i + 1], Direction(packed[i + 2])) for i in range(0, len(packed), 3)]
+
+
+class PathCache:
+    """Least recently used cache of the pairwise costs and paths of whole layouts, shared across requests.
+
+    Every entry maps a layout key (see layout_key) to a dictionary keyed by the coordinates of both states,
+    ((x, y, direction), (x, y, direction)), whose value is (cost, packed path) or None if the states are not
+    connected. The packed paths are the ones kept by PathTable, from the first state to the second, and are
+    None for the pairs whose path is only searched when read. Entries are evicted least recently used first
+    once either the number of layouts or the estimated memory goes over its limit.
+    """
+
+    def __init__(self, max_layouts: int = 128, max_bytes: int = 64 * 1024 * 1024):
+        self.max_layouts = max_layouts
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.size_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def estimate_bytes(pairs: dict) -> int:
+        return sum(PAIR_OVERHEAD_BYTES + (value[1].itemsize * len(value[1]) if value and value[1] is not None else 0)
+                   for value in pairs.values())
+
+    def get(self, key: str):
+        """Returns the pairs cached for the layout, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, pairs: dict):
+        """Stores the pairs of a layout, replacing any previous entry, and evicts entries over the limits"""
+        size = self.estimate_bytes(pairs)
+        with self._lock:
+            if key in self._entries:
+                self.size_bytes -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (pairs, size)
+            self.size_bytes += size
+
+            while len(self._entries) > self.max_layouts or self.size_bytes > self.max_bytes:
+                _key, (_pairs, _size) = self._entries.popitem(last=False)
+                self.size_bytes -= _size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'layouts': len(self._entries),
+                'bytes': self.size_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+# Cache shared by every request handled by this process
+PATH_CACHE = PathCache()
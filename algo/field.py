@@ -0,0 +1,141 @@
+import numpy as np
+from consts import Direction, TURN_FACTOR
+from algo.heuristic import TURNS
+
+# Added per segment of a line by line_terms, larger than any cost of a path. Also stands for the cost of the
+# states not reached yet, which no move out of another segment or out of such a state can lower.
+SEGMENT_OFFSET = 1e12
+
+# Sources whose cost fields are computed together by cost_fields, bounding its memory to
+# FIELD_BATCH * 4 * size_x * size_y floats
+FIELD_BATCH = 16
+
+
+def line_terms(enter_cost: np.ndarray, axis: int) -> np.ndarray:
+    """Terms of line_sweep for the moves along an axis, in the direction of increasing index.
+
+    Moving from cell j to cell i > j costs the sum of enter_cost over j + 1 .. i, which must all be finite.
+    That is dist[j] - prefix[j] + prefix[i] within each run of finite cells, where prefix is the cumulative
+    sum of enter_cost. The runs are kept apart by adding SEGMENT_OFFSET times the number of blocked cells up to
+    each cell, so that a cell reached from an earlier run costs at least SEGMENT_OFFSET. A blocked cell starts
+    the run after it, as it may still be the start state of the search.
+
+    Args:
+        enter_cost (np.ndarray): (size_x, size_y) cost of a move into every cell, infinite if unreachable
+        axis (int): axis to move along
+
+    Returns:
+        np.ndarray: (size_x, size_y) prefix plus the segment offsets
+    """
+    blocked = np.isinf(enter_cost)
+    return np.cumsum(np.where(blocked, 0, enter_cost), axis=axis) + np.cumsum(blocked, axis=axis) * SEGMENT_OFFSET
+
+
+def line_sweep(dist: np.ndarray, terms: np.ndarray, axis: int):
+    """Relaxes every chain of straight moves along an axis of dist in place, in the direction of increasing
+    index, with a single min-accumulate pass over min over j of dist[j] - terms[j] + terms[i] (see line_terms)"""
+    np.minimum(dist, np.minimum.accumulate(dist - terms, axis=axis) + terms, out=dist)
+
+
+def cost_fields(solver, sources: list, bounds: tuple = None, region: np.ndarray = None) -> np.ndarray:
+    """Cost of the cheapest path from every source state to every state of the lattice.
+
+    This is the graph searched by path_cost_generator, relaxed for all sources at once over whole arrays
+    rather than one state at a time: straight moves are relaxed along full lines with line_sweep, then turns
+    by shifting the arrays by their offsets, until nothing changes. The number of rounds is about the number
+    of turns of the longest path, so large arenas cost a few dozen array passes instead of a heap operation
+    per state and per source.
+
+    Args:
+        solver (MazeSolver): solver whose grid, turn table and safe costs are used
+        sources (List[CellState]): start states, inside the lattice and the bounds
+        bounds (tuple): ((x0, x1), (y0, y1)) half-open ranges of the cells the paths stay in, the whole grid
+            by default
+        region (np.ndarray): (x1 - x0, y1 - y0) bool mask of the cells of the bounds the paths may enter, all
+            of them by default
+
+    Returns:
+        np.ndarray: (len(sources), 4, x1 - x0, y1 - y0) costs indexed by [source, direction // 2, x - x0, y - y0],
+        infinite for unreachable states
+    """
+    (x0, x1), (y0, y1) = bounds if bounds is not None else ((0, solver.grid.size_x), (0, solver.grid.size_y))
+    size_x, size_y = x1 - x0, y1 - y0
+    window = (slice(x0, x1), slice(y0, y1))
+    if solver.turn_table is None:
+        solver.build_turn_table()
+    if solver.safe_cost_table is None:
+        solver.build_safe_cost_table()
+
+    safe_cost = solver.safe_cost_table[window].astype(float)
+    allowed = solver.grid.reachable_mask()[window]
+    if region is not None:
+        allowed = allowed & region
+    enter_cost = np.where(allowed, 1 + safe_cost, np.inf)
+    if solver.stats is not None:
+        solver.stats.add("reachable_checks", allowed.size)
+    # North / south move along y and east / west along x, both ways. The moves towards decreasing index are
+    # swept over reversed views of the arrays.
+    lines = []
+    for axis in (1, 0):
+        reverse = tuple(slice(None, None, -1) if a == axis else slice(None) for a in range(2))
+        lines.append((axis, (slice(None), slice(None)), line_terms(enter_cost, axis)))
+        lines.append((axis, reverse, line_terms(enter_cost[reverse], axis)))
+
+    dist = np.full((len(sources), 4, size_x, size_y), SEGMENT_OFFSET)
+    for index, source in enumerate(sources):
+        dist[index, source.direction // 2, source.x - x0, source.y - y0] = 0
+
+    turns = []
+    for from_direction, to_direction, dx, dy in TURNS:
+        # Origins of the turns whose landing cell is inside the bounds, and those landing cells
+        origin = (slice(max(0, -dx), min(size_x, size_x - dx)), slice(max(0, -dy), min(size_y, size_y - dy)))
+        landing = (slice(max(0, dx), min(size_x, size_x + dx)), slice(max(0, dy), min(size_y, size_y + dy)))
+        cost = Direction.rotation_cost(to_direction, from_direction) * TURN_FACTOR + 1 + 10 + safe_cost[landing]
+        valid = solver.turn_table[window][origin + (from_direction // 2, to_direction // 2)] & allowed[landing]
+        cost = np.where(valid, cost, np.inf)
+        if solver.stats is not None:
+            solver.stats.add("turn_checks", valid.size)
+        turns.append((from_direction // 2, to_direction // 2, origin, landing, cost))
+
+    while True:
+        previous = dist.copy()
+        for d in range(4):
+            for axis, view, terms in lines[:2] if d % 2 == 0 else lines[2:]:
+                line_sweep(dist[(slice(None), d) + view], terms, axis + 1)
+        for from_index, to_index, origin, landing, cost in turns:
+            target = dist[(slice(None), to_index) + landing]
+            np.minimum(target, dist[(slice(None), from_index) + origin] + cost, out=target)
+        if np.array_equal(dist, previous):
+            dist[dist >= SEGMENT_OFFSET] = np.inf
+            return dist
+
+
+def trace_path(solver, field: np.ndarray, start, end, bounds: tuple = None) -> list:
+    """Walks back from end to start along the moves that make up the costs of a cost field.
+
+    Args:
+        solver (MazeSolver): solver the field was computed with
+        field (np.ndarray): cost field of start, see cost_fields
+        start (CellState): source state of the field
+        end (CellState): state to trace, reachable in the field
+        bounds (tuple): bounds the field was computed with, the whole grid by default
+
+    Returns:
+        List[tuple]: (x, y, direction) states of the path from start to end
+    """
+    (x0, x1), (y0, y1) = bounds if bounds is not None else ((0, solver.grid.size_x), (0, solver.grid.size_y))
+    path = [(end.x, end.y, end.direction)]
+    x, y, direction = path[0]
+    while (x, y, direction) != (start.x, start.y, start.direction):
+        cost = field[direction // 2, x - x0, y - y0]
+        for px, py, md, safe_cost in solver.get_predecessors(x, y, direction):
+            if not (x0 <= px < x1 and y0 <= py < y1):
+                continue
+            move_cost = Direction.rotation_cost(direction, md) * TURN_FACTOR + 1 + safe_cost
+            if field[md // 2, px - x0, py - y0] + move_cost == cost:
+                x, y, direction = px, py, md
+                break
+        else:
+            raise ValueError(f"No move of the cost field leads to {(x, y, direction)}")
+        path.append((x, y, direction))
+    return path[::-1]
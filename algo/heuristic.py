@@ -0,0 +1,103 @@
+import os
+import numpy as np
+from consts import Direction, TURN_FACTOR, TURN_RADIUS
+
+# Tables are computed once per set of constants and kept here, to be memory-mapped by later processes
+TABLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tables')
+
+# Stored in place of a cost for states that cannot reach the goal at all
+UNREACHABLE = np.iinfo(np.uint16).max
+
+# Offsets of the forward turns between the directions, as (from_direction, to_direction, dx, dy)
+TURNS = [
+    (Direction.NORTH, Direction.EAST, TURN_RADIUS, TURN_RADIUS),
+    (Direction.NORTH, Direction.WEST, -TURN_RADIUS, TURN_RADIUS),
+    (Direction.EAST, Direction.NORTH, TURN_RADIUS, TURN_RADIUS),
+    (Direction.EAST, Direction.SOUTH, TURN_RADIUS, -TURN_RADIUS),
+    (Direction.SOUTH, Direction.EAST, TURN_RADIUS, -TURN_RADIUS),
+    (Direction.SOUTH, Direction.WEST, -TURN_RADIUS, -TURN_RADIUS),
+    (Direction.WEST, Direction.NORTH, -TURN_RADIUS, TURN_RADIUS),
+    (Direction.WEST, Direction.SOUTH, -TURN_RADIUS, -TURN_RADIUS),
+]
+
+# Cost of a turn without obstacles around, as charged by path_cost_generator (the safe cost is at least 0)
+TURN_COST = Direction.rotation_cost(Direction.NORTH, Direction.EAST) * TURN_FACTOR + 1 + 10
+
+
+def line_distance_transform(dist: np.ndarray, axis: int) -> np.ndarray:
+    """Cost of reaching the goal after moving any number of cells along an axis first, at 1 per cell.
+    Computes min over j of dist[j] + |i - j| along the axis with two min-accumulate passes."""
+    index = np.arange(dist.shape[axis], dtype=float).reshape([-1 if a == axis else 1 for a in range(dist.ndim)])
+    forward = np.minimum.accumulate(dist - index, axis=axis) + index
+    backward = np.flip(np.minimum.accumulate(np.flip(dist + index, axis=axis), axis=axis), axis=axis) - index
+    return np.minimum(forward, backward)
+
+
+def shifted(array: np.ndarray, dx: int, dy: int) -> np.ndarray:
+    """result[x, y] = array[x + dx, y + dy], infinite where that is outside the array"""
+    result = np.full_like(array, np.inf)
+    size_x, size_y = array.shape
+    result[max(0, -dx):min(size_x, size_x - dx), max(0, -dy):min(size_y, size_y - dy)] = \
+        array[max(0, dx):min(size_x, size_x + dx), max(0, dy):min(size_y, size_y + dy)]
+    return result
+
+
+def compute_cost_to_go(extent: int) -> np.ndarray:
+    """Exact cost of the cheapest obstacle-free path between two states at most extent cells apart per axis.
+
+    The states are restricted to the window of relative positions within extent cells of the goal. Every
+    path on an arena of at most extent + 1 cells per side lies within that window and has no fewer moves nor
+    cheaper moves, so the table is an admissible and consistent A* heuristic for such arenas.
+
+    Args:
+        extent (int): largest difference of coordinates covered
+
+    Returns:
+        np.ndarray: (4, 4, 2 * extent + 1, 2 * extent + 1) table of uint16 costs indexed by
+        [end_direction // 2, start_direction // 2, start_x - end_x + extent, start_y - end_y + extent]
+    """
+    width = 2 * extent + 1
+    table = np.empty((4, 4, width, width), dtype=np.uint16)
+
+    for end_direction in range(4):
+        # dist[d] is the cost-to-go from every relative position with direction d
+        dist = np.full((4, width, width), np.inf)
+        dist[end_direction, extent, extent] = 0
+
+        while True:
+            previous = dist.copy()
+            # Straight moves keep the direction, north / south move along y and east / west along x
+            for d in range(4):
+                dist[d] = line_distance_transform(dist[d], axis=1 if d % 2 == 0 else 0)
+            for from_direction, to_direction, dx, dy in TURNS:
+                np.minimum(dist[from_direction // 2], shifted(dist[to_direction // 2], dx, dy) + TURN_COST,
+                           out=dist[from_direction // 2])
+            if np.array_equal(dist, previous):
+                break
+
+        table[end_direction] = np.where(np.isinf(dist), UNREACHABLE, dist)
+
+    return table
+
+
+_tables = dict()
+
+
+def load_cost_to_go(extent: int) -> np.ndarray:
+    """Returns the cost-to-go table for the current constants, memory-mapped from TABLE_DIR.
+    The table is computed and saved there the first time it is needed."""
+    name = f"cost_to_go_r{TURN_RADIUS}_f{TURN_FACTOR}_e{extent}.npy"
+    if name in _tables:
+        return _tables[name]
+
+    path = os.path.join(TABLE_DIR, name)
+    if not os.path.exists(path):
+        os.makedirs(TABLE_DIR, exist_ok=True)
+        # Written under a temporary name first so that a concurrent process never maps a partial file
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, 'wb') as f:
+            np.save(f, compute_cost_to_go(extent))
+        os.replace(temporary_path, path)
+
+    _tables[name] = np.load(path, mmap_mode='r')
+    return _tables[name]
@@ -0,0 +1,244 @@
+import heapq
+import math
+import numpy as np
+from entities.Entity import CellState
+from consts import Direction
+from algo.field import cost_fields, trace_path
+
+# Side of the square clusters of cells the grid is abstracted into
+CLUSTER_SIZE = 20
+
+# Runs of crossable boundary cells at least this long get an entrance at both ends instead of one in the middle
+ENTRANCE_SPLIT = 6
+
+# Cells around a cluster that the paths within the cluster may pass through as well, so that a turn can swing
+# out of it. The corridor of a refined path is made of the clusters of its coarse path with these margins.
+CLUSTER_MARGIN = 4
+
+
+class ClusterGraph:
+    """Abstract graph of the state lattice of a solver, in the style of HPA*.
+
+    The grid is cut into square clusters of cells. Every run of cells along the boundary of two clusters that
+    is reachable on both sides gets an entrance, in its middle, or at both ends for long runs. The states of
+    an entrance are the cells on both sides facing across the boundary either way, since the robot may also
+    cross it backwards. They are joined across the boundary by the straight move, and within a cluster by the
+    cheapest path that stays inside the cluster and its margin, found with cost_fields over those cells alone.
+
+    Costs on this graph are those of real paths, so they are never below the exact costs. refine searches the
+    path of a pair again on the lattice, only inside the clusters of its coarse path and their margins, which
+    is at most as expensive as the coarse path.
+    """
+
+    def __init__(self, solver, cluster_size: int = CLUSTER_SIZE):
+        """
+        Args:
+            solver (MazeSolver): solver whose grid and moves are abstracted, the graph is only valid for its
+                current obstacles
+            cluster_size (int): side of the clusters in cells
+        """
+        self.solver = solver
+        self.cluster_size = cluster_size
+        # States of the entrances as (x, y, direction), their index in nodes, and the moves out of each of them
+        # as (node, cost)
+        self.nodes = []
+        self.node_index = dict()
+        self.edges = []
+        # Nodes inside every cluster keyed by (x // cluster_size, y // cluster_size), and the cost fields of
+        # those nodes over the cluster, see cost_fields
+        self.cluster_nodes = dict()
+        self.cluster_fields = dict()
+
+        self._add_entrances()
+        self._add_cluster_edges()
+
+    def get_cluster(self, x: int, y: int) -> tuple:
+        return x // self.cluster_size, y // self.cluster_size
+
+    def get_bounds(self, cluster: tuple) -> tuple:
+        """Cells of a cluster and its margin, as the ((x0, x1), (y0, y1)) bounds taken by cost_fields"""
+        x0, y0 = cluster[0] * self.cluster_size, cluster[1] * self.cluster_size
+        return ((max(0, x0 - CLUSTER_MARGIN), min(x0 + self.cluster_size + CLUSTER_MARGIN, self.solver.grid.size_x)),
+                (max(0, y0 - CLUSTER_MARGIN), min(y0 + self.cluster_size + CLUSTER_MARGIN, self.solver.grid.size_y)))
+
+    @staticmethod
+    def in_bounds(bounds: tuple, state: CellState) -> bool:
+        (x0, x1), (y0, y1) = bounds
+        return x0 <= state.x < x1 and y0 <= state.y < y1
+
+    def _add_node(self, x: int, y: int, direction: Direction) -> int:
+        node = self.node_index.get((x, y, direction))
+        if node is None:
+            node = self.node_index[(x, y, direction)] = len(self.nodes)
+            self.nodes.append((x, y, direction))
+            self.edges.append([])
+            self.cluster_nodes.setdefault(self.get_cluster(x, y), []).append(node)
+        return node
+
+    def _add_entrances(self):
+        grid = self.solver.grid
+        reachable = grid.reachable_mask()
+
+        # Boundaries between columns of clusters, crossed along x, then between rows of clusters, crossed along y
+        for x in range(self.cluster_size, grid.size_x, self.cluster_size):
+            for y0 in range(0, grid.size_y, self.cluster_size):
+                crossable = reachable[x - 1, y0:y0 + self.cluster_size] & reachable[x, y0:y0 + self.cluster_size]
+                self._count_reachable(crossable)
+                for y in self._entrance_positions(crossable):
+                    self._add_entrance((x - 1, y0 + y), (x, y0 + y), (Direction.EAST, Direction.WEST))
+        for y in range(self.cluster_size, grid.size_y, self.cluster_size):
+            for x0 in range(0, grid.size_x, self.cluster_size):
+                crossable = reachable[x0:x0 + self.cluster_size, y - 1] & reachable[x0:x0 + self.cluster_size, y]
+                self._count_reachable(crossable)
+                for x in self._entrance_positions(crossable):
+                    self._add_entrance((x0 + x, y - 1), (x0 + x, y), (Direction.NORTH, Direction.SOUTH))
+
+    def _count_reachable(self, crossable: np.ndarray):
+        """Counts the cells of both sides of a boundary read from the occupancy bitmap, see SearchStats"""
+        if self.solver.stats is not None:
+            self.solver.stats.add("reachable_checks", crossable.size * 2)
+
+    @staticmethod
+    def _entrance_positions(crossable: np.ndarray) -> list:
+        """Positions of the entrances along a boundary, one or two per run of crossable cells"""
+        positions = []
+        start = None
+        for index, value in enumerate(list(crossable) + [False]):
+            if value and start is None:
+                start = index
+            elif not value and start is not None:
+                if index - start >= ENTRANCE_SPLIT:
+                    positions += [start, index - 1]
+                else:
+                    positions.append((start + index - 1) // 2)
+                start = None
+        return positions
+
+    def _add_entrance(self, inside: tuple, outside: tuple, directions: tuple):
+        inside_cost = 1 + self.solver.get_safe_cost(*inside)
+        outside_cost = 1 + self.solver.get_safe_cost(*outside)
+        for direction in directions:
+            u, v = self._add_node(*inside, direction), self._add_node(*outside, direction)
+            self.edges[u].append((v, outside_cost))
+            self.edges[v].append((u, inside_cost))
+
+    def _add_cluster_edges(self):
+        for cluster, nodes in self.cluster_nodes.items():
+            (x0, _x1), (y0, _y1) = bounds = self.get_bounds(cluster)
+            fields = cost_fields(self.solver, [CellState(*self.nodes[node]) for node in nodes], bounds)
+            self.cluster_fields[cluster] = fields
+
+            xs, ys, directions = (np.array(column, dtype=int) for column in zip(*(self.nodes[node] for node in nodes)))
+            costs = fields[:, directions // 2, xs - x0, ys - y0]
+            for row, u in enumerate(nodes):
+                self.edges[u].extend((v, float(cost)) for v, cost in zip(nodes, costs[row])
+                                     if v != u and not math.isinf(cost))
+
+    def _search(self, start: CellState) -> tuple:
+        """Dijkstra over the nodes from a state, entering the graph through the nodes of its cluster
+
+        Returns:
+            Tuple[list, list, np.ndarray]: cost and previous node (-1 for the first) of every node, and the cost
+            field of start over its cluster and margin
+        """
+        cluster = self.get_cluster(start.x, start.y)
+        (x0, _x1), (y0, _y1) = bounds = self.get_bounds(cluster)
+        field = cost_fields(self.solver, [start], bounds)[0]
+
+        distance = [math.inf] * len(self.nodes)
+        parent = [-1] * len(self.nodes)
+        heap = []
+        for node in self.cluster_nodes.get(cluster, []):
+            x, y, direction = self.nodes[node]
+            cost = float(field[direction // 2, x - x0, y - y0])
+            if not math.isinf(cost):
+                distance[node] = cost
+                heap.append((cost, node))
+        heapq.heapify(heap)
+
+        edges = self.edges
+        while heap:
+            cost, u = heapq.heappop(heap)
+            if cost > distance[u]:
+                continue
+            for v, move_cost in edges[u]:
+                next_cost = cost + move_cost
+                if next_cost < distance[v]:
+                    distance[v] = next_cost
+                    parent[v] = u
+                    heapq.heappush(heap, (next_cost, v))
+        return distance, parent, field
+
+    def _cost_to(self, start: CellState, end: CellState, search: tuple) -> tuple:
+        """Cheapest coarse cost from start to end given the search of start. The path ends within the cluster
+        of start or of one of the nodes of a cluster whose margin contains end.
+
+        Returns:
+            Tuple[float, int]: cost, infinite if not connected, and the last node of the path, -1 if it stays
+            within the cluster of start
+        """
+        distance, _parent, field = search
+        best, via = math.inf, -1
+
+        start_cluster = self.get_cluster(start.x, start.y)
+        (x0, _x1), (y0, _y1) = bounds = self.get_bounds(start_cluster)
+        if self.in_bounds(bounds, end):
+            best = float(field[end.direction // 2, end.x - x0, end.y - y0])
+
+        end_x, end_y = self.get_cluster(end.x, end.y)
+        for cluster in ((end_x + dx, end_y + dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)):
+            (x0, _x1), (y0, _y1) = bounds = self.get_bounds(cluster)
+            if cluster not in self.cluster_fields or not self.in_bounds(bounds, end):
+                continue
+            nodes = self.cluster_nodes[cluster]
+            costs = np.array([distance[node] for node in nodes]) + \
+                self.cluster_fields[cluster][:, end.direction // 2, end.x - x0, end.y - y0]
+            index = int(np.argmin(costs))
+            if costs[index] < best:
+                best, via = float(costs[index]), nodes[index]
+        return best, via
+
+    def costs_from(self, start: CellState, ends: list) -> list:
+        """Coarse costs from start to every state of ends, inside the lattice, None where not connected.
+
+        States the graph does not connect to start, typically behind a cluster boundary without entrances
+        near them, get their exact cost from a cost field of start over the whole grid instead.
+        """
+        search = self._search(start)
+        costs = [self._cost_to(start, end, search)[0] for end in ends]
+        if any(math.isinf(cost) for cost in costs):
+            field = cost_fields(self.solver, [start])[0]
+            costs = [float(field[end.direction // 2, end.x, end.y]) if math.isinf(cost) else cost
+                     for cost, end in zip(costs, ends)]
+        return [None if math.isinf(cost) else cost for cost in costs]
+
+    def refine(self, start: CellState, end: CellState) -> tuple:
+        """Searches the path from start to end on the lattice, inside the corridor of its coarse path
+
+        Returns:
+            Tuple[list, float]: (x, y, direction) states of the path, and its cost
+        """
+        search = self._search(start)
+        cost, node = self._cost_to(start, end, search)
+        if math.isinf(cost):
+            # Only connected outside the graph, see costs_from
+            field = cost_fields(self.solver, [start])[0]
+            return trace_path(self.solver, field, start, end), float(field[end.direction // 2, end.x, end.y])
+
+        clusters = {self.get_cluster(start.x, start.y)}
+        while node != -1:
+            clusters.add(self.get_cluster(*self.nodes[node][:2]))
+            node = search[1][node]
+
+        grid = self.solver.grid
+        region = np.zeros((grid.size_x, grid.size_y), dtype=bool)
+        for cluster in clusters:
+            (x0, x1), (y0, y1) = self.get_bounds(cluster)
+            region[x0:x1, y0:y1] = True
+
+        xs, ys = np.nonzero(region)
+        bounds = ((int(xs.min()), int(xs.max()) + 1), (int(ys.min()), int(ys.max()) + 1))
+        (x0, x1), (y0, y1) = bounds
+        field = cost_fields(self.solver, [start], bounds, region[x0:x1, y0:y1])[0]
+        cost = float(field[end.direction // 2, end.x - x0, end.y - y0])
+        return trace_path(self.solver, field, start, end, bounds), cost
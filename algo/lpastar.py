@@ -0,0 +1,221 @@
+import heapq
+import math
+from typing import List
+from algo.algo import MazeSolver
+from algo.cache import pack_path
+from consts import Direction, TURN_FACTOR, TURN_RADIUS
+
+INFINITY = math.inf
+
+# Cells up to this many units from an obstacle along either axis have their reachability or safe cost set by
+# it, see Grid._stamp_obstacle and MazeSolver.build_safe_cost_table
+OBSTACLE_REACH = 3
+
+
+class LPAStar:
+    """Lifelong Planning A* from a single source over the encoded state lattice, with a zero heuristic so
+    that one search serves any number of goals.
+
+    g holds the settled cost of every state and rhs its one-step lookahead from the predecessors. After the
+    cost of an edge changes, only the states whose costs depend on it are repaired instead of searching again.
+    """
+
+    def __init__(self, source: int, successors: List[list], predecessors: List[list]):
+        self.source = source
+        self.successors = successors
+        self.predecessors = predecessors
+        self.g = [INFINITY] * len(successors)
+        self.rhs = [INFINITY] * len(successors)
+        self.rhs[source] = 0
+        self.heap = [(0, source)]
+
+    def set_graph(self, successors: List[list], predecessors: List[list]):
+        self.successors = successors
+        self.predecessors = predecessors
+
+    def update_vertex(self, v: int):
+        g, rhs = self.g, self.rhs
+        if v != self.source:
+            rhs[v] = min((g[u] + cost for u, cost in self.predecessors[v]), default=INFINITY)
+        if g[v] != rhs[v]:
+            heapq.heappush(self.heap, (min(g[v], rhs[v]), v))
+
+    def compute(self, goals: List[int]):
+        """Processes inconsistent states until the costs of all goals are final"""
+        g, rhs, heap = self.g, self.rhs, self.heap
+        remaining = list(goals)
+
+        while remaining and heap:
+            key, u = heap[0]
+            if g[u] == rhs[u] or key != min(g[u], rhs[u]):
+                # Stale entry of a state that was updated after it was pushed
+                heapq.heappop(heap)
+                continue
+
+            # Keys leave the queue in increasing order, so a consistent goal with a smaller key is final
+            while remaining and g[remaining[-1]] == rhs[remaining[-1]] and g[remaining[-1]] <= key:
+                remaining.pop()
+            if not remaining:
+                break
+
+            heapq.heappop(heap)
+            if g[u] > rhs[u]:
+                g[u] = rhs[u]
+                for v, _cost in self.successors[u]:
+                    self.update_vertex(v)
+            else:
+                g[u] = INFINITY
+                self.update_vertex(u)
+                for v, _cost in self.successors[u]:
+                    self.update_vertex(v)
+
+    def extract_path(self, goal: int) -> List[int]:
+        """States from the source to the goal along the settled costs, empty if the goal is unreachable"""
+        if self.g[goal] == INFINITY:
+            return []
+
+        path = [goal]
+        cursor = goal
+        while cursor != self.source:
+            cursor = min(self.predecessors[cursor], key=lambda edge: self.g[edge[0]] + edge[1])[0]
+            path.append(cursor)
+        return path[::-1]
+
+
+class IncrementalPlanner:
+    """Planner for a layout that changes during a run, e.g. an obstacle turning out to be misplaced.
+
+    Keeps an LPAStar per source state (the robot start and every view state) over the move graph of
+    MazeSolver.get_neighbors. When an obstacle is added or removed, only the moves out of the states near it
+    are rebuilt, and the targets of the moves that changed are updated in every LPAStar, which then repairs
+    its costs on the next plan instead of searching from scratch.
+    """
+
+    def __init__(self, size_x: int, size_y: int, robot_x: int, robot_y: int, robot_direction: Direction,
+                 retrying: bool = False, **solver_kwargs):
+        self.solver = MazeSolver(size_x, size_y, robot_x, robot_y, robot_direction, **solver_kwargs)
+        self.retrying = retrying
+        self.successors = None
+        self.predecessors = None
+        # LPAStar of every source state, keyed by encoded state
+        self.engines = dict()
+
+    def build_edges(self, index: int) -> list:
+        """Successors of an encoded state as (encoded state, move cost), the cheapest move per target"""
+        solver = self.solver
+        x, y, direction = solver.decode_state(index)
+        edges = dict()
+        for next_x, next_y, new_direction, safe_cost in solver.get_neighbors(x, y, direction):
+            cost = Direction.rotation_cost(new_direction, direction) * TURN_FACTOR + 1 + safe_cost
+            next_index = solver.encode_state(next_x, next_y, new_direction)
+            if cost < edges.get(next_index, INFINITY):
+                edges[next_index] = cost
+        return list(edges.items())
+
+    def build_graph(self) -> List[list]:
+        """Successors of every encoded state, see build_edges"""
+        return [self.build_edges(index) for index in range(self.solver.grid.size_x * self.solver.grid.size_y * 4)]
+
+    def set_graph(self, successors: List[list]):
+        predecessors = [[] for _ in successors]
+        for u, edges in enumerate(successors):
+            for v, cost in edges:
+                predecessors[v].append((u, cost))
+
+        self.successors, self.predecessors = successors, predecessors
+        for engine in self.engines.values():
+            engine.set_graph(successors, predecessors)
+
+    def apply_graph_change(self, x: int, y: int):
+        """Rebuilds the moves out of the states near an obstacle that was added or removed at (x, y), and
+        updates the targets of the moves that changed.
+
+        A move depends on the cells it enters or lands on and on the cells swept by a turn. The obstacle only
+        changes the cells within OBSTACLE_REACH of it, and a turn lands TURN_RADIUS cells away along both axes,
+        so no move out of a state farther than their sum can change.
+        """
+        if self.successors is None:
+            # Nothing was planned yet, the graph is built by the first plan
+            return
+
+        solver = self.solver
+        successors, predecessors = self.successors, self.predecessors
+        radius = OBSTACLE_REACH + TURN_RADIUS
+        changed = set()
+        for cell_x in range(max(0, x - radius), min(solver.grid.size_x, x + radius + 1)):
+            for cell_y in range(max(0, y - radius), min(solver.grid.size_y, y + radius + 1)):
+                for direction in (Direction.NORTH, Direction.EAST, Direction.SOUTH, Direction.WEST):
+                    u = solver.encode_state(cell_x, cell_y, direction)
+                    old_edges, new_edges = dict(successors[u]), dict(self.build_edges(u))
+                    if old_edges == new_edges:
+                        continue
+
+                    # The lists are shared with every LPAStar, so they are updated in place
+                    for v in old_edges.keys() | new_edges.keys():
+                        if old_edges.get(v) != new_edges.get(v):
+                            changed.add(v)
+                            predecessors[v] = [(w, cost) for w, cost in predecessors[v] if w != u]
+                            if v in new_edges:
+                                predecessors[v].append((u, new_edges[v]))
+                    successors[u] = list(new_edges.items())
+
+        for engine in self.engines.values():
+            for v in changed:
+                engine.update_vertex(v)
+
+    def add_obstacle(self, x: int, y: int, direction: Direction, obstacle_id: int):
+        self.solver.add_obstacle(x, y, direction, obstacle_id)
+        self.apply_graph_change(x, y)
+
+    def remove_obstacle(self, x: int, y: int, direction: Direction) -> bool:
+        removed = self.solver.remove_obstacle(x, y, direction)
+        if removed:
+            self.apply_graph_change(x, y)
+        return removed
+
+    def plan(self, deadline=None):
+        """Repairs the costs between the current view states and plans the tour over them
+
+        Returns:
+            Tuple[Path, float]: path of the robot and its total cost, as get_optimal_order_dp
+        """
+        solver = self.solver
+        if self.successors is None:
+            self.set_graph(self.build_graph())
+
+        states = [solver.robot.get_start_state()]
+        for view_positions in solver.grid.get_view_obstacle_positions(self.retrying):
+            states.extend(view_positions)
+
+        # Costs of every pair in the order path_cost_generator searches them, handed to the solver as if cached
+        pairs = dict()
+        engines = dict()
+        for i in range(len(states) - 1):
+            start, ends = states[i], states[i + 1:]
+            if not solver.is_in_lattice(start.x, start.y):
+                for end in ends:
+                    pairs[solver.pair_key(start, end)] = None
+                continue
+
+            source = solver.encode_state(start.x, start.y, start.direction)
+            engine = engines[source] = self.engines.get(source) or \
+                LPAStar(source, self.successors, self.predecessors)
+            goals = [solver.encode_state(end.x, end.y, end.direction) for end in ends
+                     if solver.is_in_lattice(end.x, end.y)]
+            engine.compute(goals)
+
+            for end in ends:
+                path = engine.extract_path(solver.encode_state(end.x, end.y, end.direction)) \
+                    if solver.is_in_lattice(end.x, end.y) else []
+                if path:
+                    pairs[solver.pair_key(start, end)] = (
+                        engine.g[path[-1]], pack_path([solver.decode_state(index) for index in path]))
+                else:
+                    pairs[solver.pair_key(start, end)] = None
+
+        # Sources whose view states are gone are dropped
+        self.engines = engines
+        solver.cost_table = dict()
+        solver.path_table.clear()
+        solver.cached_pairs = pairs
+        return solver.get_optimal_order_dp(self.retrying, deadline)
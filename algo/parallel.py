@@ -0,0 +1,228 @@
+import math
+import multiprocessing
+import os
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
+from algo.cache import obstacle_key
+from consts import Direction
+
+# Solvers kept by every worker process, keyed by layout and search settings, see _search_batch
+_solvers = OrderedDict()
+MAX_WORKER_SOLVERS = 4
+
+# Below this many view state combinations, get_optimal_order_enumerate evaluates them in its own process
+PARALLEL_MIN_COMBINATIONS = 64
+
+
+def _search_batch(key: tuple, size: tuple, obstacles: tuple, settings: tuple, start: tuple, ends: list):
+    """Runs in a worker: searches from start to every state of ends with the solver of the layout.
+
+    The solver, with its occupancy masks, turn tables and macro moves, is built the first time the worker
+    sees the layout and kept for the following batches, only its cost and path tables are reset. Only then
+    does the worker attach to the shared memory holding the obstacles of the layout.
+
+    Args:
+        key (tuple): obstacle_key of the layout and the search settings
+        obstacles (tuple): name of the shared memory block with the (x, y, direction, id) int32 rows of the
+            obstacles, and their number
+
+    Returns:
+        Tuple[list, int, int]: (cost, packed path) or None per state of ends, and the number of expanded states
+        and of searches run
+    """
+    # Imported here so that the module stays cheap to import for the parent process
+    from algo.algo import MazeSolver
+    from entities.Entity import CellState
+
+    solver = _solvers.get(key)
+    if solver is None:
+        search_mode, heuristic, macro_moves = settings
+        solver = MazeSolver(*size, 1, 1, Direction.NORTH, search_mode=search_mode, heuristic=heuristic,
+                            macro_moves=macro_moves)
+        name, n_obstacles = obstacles
+        block = _attach(name)
+        try:
+            rows = np.ndarray((n_obstacles, 4), np.int32, buffer=block.buf)
+            for x, y, direction, obstacle_id in rows.tolist():
+                solver.add_obstacle(x, y, Direction(direction), obstacle_id)
+            del rows
+        finally:
+            block.close()
+        _solvers[key] = solver
+        while len(_solvers) > MAX_WORKER_SOLVERS:
+            _solvers.popitem(last=False)
+    _solvers.move_to_end(key)
+
+    solver.cost_table = dict()
+    solver.path_table.clear()
+    expanded_nodes, search_runs = solver.expanded_nodes, solver.search_runs
+
+    start = CellState(*start)
+    ends = [CellState(*end) for end in ends]
+    solver.path_cost_generator([start] + ends, n_sources=1)
+
+    results = [(solver.cost_table[(start, end)], solver.path_table.get_packed(start, end))
+               if (start, end) in solver.path_table else None for end in ends]
+    return results, solver.expanded_nodes - expanded_nodes, solver.search_runs - search_runs
+
+
+def _share(array: np.ndarray) -> SharedMemory:
+    """Copies an array into a new block of shared memory"""
+    shared = SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, array.dtype, buffer=shared.buf)[...] = array
+    return shared
+
+
+def _attach(name: str) -> SharedMemory:
+    """Opens a block of shared memory created by the parent, which stays responsible for unlinking it"""
+    if sys.version_info >= (3, 13):
+        return SharedMemory(name=name, track=False)
+    # Spawned workers share the resource tracker of the parent, where the block is already registered
+    return SharedMemory(name=name)
+
+
+def _evaluate_combinations(blocks: tuple, shapes: tuple, start: int, stop: int, bound: float, deadline: float):
+    """Runs in a worker: evaluate_combinations over a range of the combinations in shared memory"""
+    from algo.tsp import evaluate_combinations
+
+    shared = [_attach(name) for name in blocks]
+    try:
+        items_cost, candidates, fixed_costs = (np.ndarray(shape, dtype, buffer=block.buf)
+                                               for block, (shape, dtype) in zip(shared, shapes))
+        result = evaluate_combinations(items_cost, candidates, fixed_costs, start, stop, bound, deadline)
+        del items_cost, candidates, fixed_costs
+        return result
+    finally:
+        for block in shared:
+            block.close()
+
+
+class SearchPool:
+    """Persistent pool of worker processes for the pairwise searches of MazeSolver.path_cost_generator and
+    the view state combinations of MazeSolver.get_optimal_order_enumerate.
+
+    Searches from a source state are independent of each other, so path_cost_generator hands them out as
+    batches of (source, targets) and merges the results in the order of the batches. Every worker runs the
+    same searches as the serial solver, so the costs and paths are the same. Combinations are likewise
+    evaluated in ranges and reduced to the one the serial planner picks.
+
+    The workers are started on the first use and kept until shutdown.
+    """
+
+    def __init__(self, max_workers: int = None, batches_per_worker: int = 4):
+        """
+        Args:
+            max_workers: number of worker processes, the number of CPUs by default
+            batches_per_worker: batches aimed for per worker, the targets of A* sources are split to reach it
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.batches_per_worker = batches_per_worker
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # Workers are spawned rather than forked, since the server may be running other threads
+                self._executor = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._executor
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    def search(self, solver, batches: list) -> list:
+        """Searches the batches of a solver in the workers
+
+        Args:
+            solver (MazeSolver): solver whose layout and search settings are used
+            batches (List[Tuple[CellState, List[CellState]]]): source state and target states of every batch
+
+        Returns:
+            List[list]: (cost, packed path) or None for every target of every batch, in the order given
+        """
+        size = (solver.grid.size_x, solver.grid.size_y)
+        settings = (solver.search_mode, solver.heuristic, solver.macro_moves)
+        key = (obstacle_key(*size, solver.grid.obstacles), settings)
+
+        # A* searches every pair on its own, so the targets of a source can be split up to balance the workers.
+        # A Dijkstra sweep or cost field serves all targets of its source at once and is kept whole.
+        tasks = []
+        if solver.search_mode in ("dijkstra", "field"):
+            tasks = [(index, start, ends) for index, (start, ends) in enumerate(batches) if ends]
+        else:
+            n_pairs = sum(len(ends) for _start, ends in batches)
+            chunk = max(1, math.ceil(n_pairs / (self.max_workers * self.batches_per_worker)))
+            for index, (start, ends) in enumerate(batches):
+                tasks.extend((index, start, ends[k:k + chunk]) for k in range(0, len(ends), chunk))
+
+        # The obstacles are published once per call, the tasks only carry the name of the block. A worker that
+        # already has the solver of the layout does not read it.
+        rows = np.array([(ob.x, ob.y, int(ob.direction), ob.obstacle_id) for ob in solver.grid.obstacles],
+                        dtype=np.int32).reshape(-1, 4)
+        block = _share(rows)
+        try:
+            obstacles = (block.name, len(rows))
+            executor = self.get_executor()
+            futures = [executor.submit(_search_batch, key, size, obstacles, settings,
+                                       (start.x, start.y, int(start.direction)),
+                                       [(end.x, end.y, int(end.direction)) for end in ends])
+                       for _index, start, ends in tasks]
+
+            results = [[] for _ in batches]
+            for (index, _start, _ends), future in zip(tasks, futures):
+                batch_results, expanded_nodes, search_runs = future.result()
+                results[index].extend(batch_results)
+                solver.expanded_nodes += expanded_nodes
+                solver.search_runs += search_runs
+        finally:
+            block.close()
+            block.unlink()
+        return results
+
+    def evaluate_combinations(self, items_cost: np.ndarray, candidates: np.ndarray, fixed_costs: np.ndarray,
+                              bound: float, deadline: float = None) -> tuple:
+        """Splits the combinations of get_optimal_order_enumerate into ranges evaluated by the workers.
+
+        The arrays are placed in shared memory once and only read by the workers. Every range returns the
+        first of its best combinations, and the lowest (distance, index) of all ranges is the combination
+        the serial evaluation picks.
+
+        Returns:
+            tuple: as algo.tsp.evaluate_combinations over all combinations, with the pruned combinations and
+            solved TSPs summed
+        """
+        arrays = (items_cost, candidates, fixed_costs)
+        shared = [_share(array) for array in arrays]
+        try:
+            blocks = tuple(block.name for block in shared)
+            shapes = tuple((array.shape, array.dtype) for array in arrays)
+            n = len(candidates)
+            chunk = max(1, math.ceil(n / (self.max_workers * self.batches_per_worker)))
+
+            executor = self.get_executor()
+            futures = [executor.submit(_evaluate_combinations, blocks, shapes, start, min(start + chunk, n), bound,
+                                       deadline)
+                       for start in range(0, n, chunk)]
+            results = [future.result() for future in futures]
+        finally:
+            for block in shared:
+                block.close()
+                block.unlink()
+
+        distance, best_index, permutation = bound, -1, None
+        found = [result[:3] for result in results if result[1] != -1]
+        if found:
+            distance, best_index, permutation = min(found, key=lambda result: (result[0], result[1]))
+        return distance, best_index, permutation, sum(result[3] for result in results), \
+            sum(result[4] for result in results), any(result[5] for result in results)
+
+
+# Pool shared by every solver of this process that is given one
+SEARCH_POOL = SearchPool()
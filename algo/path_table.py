@@ -0,0 +1,79 @@
+from array import array
+from algo.cache import pack_path, unpack_path
+
+
+class PathTable:
+    """Paths between pairs of states, keyed by (start, end) like MazeSolver.cost_table.
+
+    The searches fill it for every pair, but only the pairs on the chosen tour are ever read. Each pair is
+    therefore kept once, as the states its moves end at packed with pack_path in the direction it was
+    searched, and its path is only built when it is read: the states skipped by macro moves are filled in
+    by expand, and the path is reversed for the opposite direction. Built paths are kept for later reads.
+
+    Searches that only find the costs put a pair without its packed states, and the path of such a pair is
+    searched by search when it is first read.
+    """
+
+    def __init__(self, expand, search=None):
+        """
+        Args:
+            expand: function turning the list of states of a searched path into the full path, see
+                MazeSolver.expand_path
+            search: function returning the packed states of the path between two states, for the pairs put
+                without them, see MazeSolver.search_path
+        """
+        self.expand = expand
+        self.search = search
+        self._moves = dict()
+        self._paths = dict()
+
+    def put(self, start, end, packed: array = None):
+        """Stores the packed states of the path from start to end, replacing any path of the pair.
+        Without packed states, the path is searched when it is first read."""
+        self._moves[(start, end)] = packed
+        self._paths.pop((start, end), None)
+        self._paths.pop((end, start), None)
+        self._moves.pop((end, start), None)
+
+    def get_packed(self, start, end) -> array:
+        """Packed states of the path from start to end, without building the full path if possible.
+        None if the pair was put without them and its path has not been read yet."""
+        if (start, end) in self._moves:
+            return self._moves[(start, end)]
+        if (end, start) in self._moves and self._moves[(end, start)] is None:
+            return None
+        # Only the reverse direction was searched, whose moves can only be expanded in that direction
+        return pack_path(self[(start, end)])
+
+    def clear(self):
+        self._moves.clear()
+        self._paths.clear()
+
+    def __contains__(self, key) -> bool:
+        return key in self._moves or (key[1], key[0]) in self._moves
+
+    def __len__(self) -> int:
+        return 2 * len(self._moves)
+
+    def __getitem__(self, key) -> list:
+        path = self._paths.get(key)
+        if path is not None:
+            return path
+
+        start, end = key
+        if key in self._moves:
+            path = self.expand(unpack_path(self._load(start, end)))
+        elif (end, start) in self._moves:
+            path = self.expand(unpack_path(self._load(end, start)))[::-1]
+        else:
+            raise KeyError(key)
+
+        self._paths[key] = path
+        return path
+
+    def _load(self, start, end) -> array:
+        """Packed states of a stored pair, searching them first if the pair was put without them"""
+        packed = self._moves[(start, end)]
+        if packed is None:
+            packed = self._moves[(start, end)] = self.search(start, end)
+        return packed
@@ -0,0 +1,69 @@
+import threading
+from array import array
+from collections import OrderedDict
+
+
+class SearchTree:
+    """State of a single-source Dijkstra search over the encoded lattice that can be resumed later.
+
+    g_distance and parent are indexed by encoded state, closed marks the settled states, and heap is the
+    open list left over when the search last stopped.
+    """
+    __slots__ = ("g_distance", "parent", "closed", "heap")
+
+    def __init__(self, start_index: int, n_states: int):
+        self.g_distance = array('d', [float('inf')]) * n_states
+        self.parent = array('l', [-1]) * n_states
+        self.closed = bytearray(n_states)
+        self.g_distance[start_index] = 0
+        self.heap = [(0, start_index)]
+
+
+class PlanningSession:
+    """Search state of an obstacle layout kept across the requests planning it, e.g. a plan and its retry.
+
+    The searches only depend on the arena and its obstacles, so the turn tables, the macro moves and the search
+    tree of every source state searched so far stay valid as long as the obstacles are unchanged. A retry then only
+    resumes the trees for its new view states and searches from the new sources.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        # Search trees keyed by encoded source state
+        self.trees = dict()
+        self.turn_table = None
+        self.turn_landing = None
+        # Macro moves out of the states expanded so far, see MazeSolver.get_macro_moves
+        self.macro_move_table = dict()
+        # Held while a solver searches with the session
+        self.lock = threading.Lock()
+
+    def get_tree(self, start_index: int, n_states: int) -> SearchTree:
+        tree = self.trees.get(start_index)
+        if tree is None:
+            tree = self.trees[start_index] = SearchTree(start_index, n_states)
+        return tree
+
+
+class SessionStore:
+    """Keeps the sessions of the most recently planned obstacle layouts"""
+
+    def __init__(self, max_sessions: int = 8):
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> PlanningSession:
+        """Returns the session of the layout, creating it (and evicting the oldest session) if needed"""
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = self._sessions[key] = PlanningSession(key)
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            self._sessions.move_to_end(key)
+            return session
+
+
+# Sessions shared by every request handled by this process
+SESSIONS = SessionStore()
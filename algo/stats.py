@@ -0,0 +1,52 @@
+from collections import OrderedDict
+from functools import wraps
+
+
+class SearchStats:
+    """Counters of the work done by the searches and planners of a solver, to tell apart slow plans caused by
+    large searches, by collision checks or by the TSP.
+
+    Solvers only keep counters when created with collect_stats, their stats is None otherwise. The counters are
+    added where the work is done: once per call by the move generators, and once per batch of cells by the array
+    code reading the occupancy bitmaps and turn tables. Calls to Grid.reachable are counted by wrapping the bound
+    method of one grid in instrument(), so grids of solvers without counters run the same code as before. The
+    searches of path_cost_generator add their heap operations once per search rather than once per operation.
+
+    Counters:
+        heap_pushes, stale_pops: entries pushed onto the heaps of the searches, and entries popped again after
+            their state was expanded
+        neighbor_expansions: states whose moves were generated by get_moves, get_neighbors or get_predecessors
+        turn_checks: turn validity lookups, in the turn table, with is_turn_valid off the lattice, or as cells of
+            the turn tables read by cost_fields
+        reachable_checks: cells checked for reachability, by Grid.reachable or as cells of the occupancy bitmaps
+            read by build_turn_table, cost_fields and the cluster entrances of ClusterGraph
+        tsp_solves: TSPs solved by the planners, one per heuristic or exact generalized TSP and one per view state
+            combination that was not pruned
+    """
+
+    def __init__(self):
+        self.counts = OrderedDict((name, 0) for name in (
+            "heap_pushes", "stale_pops", "neighbor_expansions", "turn_checks", "reachable_checks", "tsp_solves"))
+
+    def add(self, name: str, count: int = 1):
+        self.counts[name] += count
+
+    def add_search(self, pops: int, stale_pops: int, queued: int):
+        """Adds the heap operations of a search that popped pops states, stale_pops of them already expanded,
+        and left queued states on its heaps. Every state pushed was either popped or is still queued."""
+        self.counts["heap_pushes"] += pops + queued
+        self.counts["stale_pops"] += stale_pops
+
+    def instrument(self, solver):
+        """Counts the calls to reachable of the grid of solver"""
+        reachable = solver.grid.reachable
+
+        @wraps(reachable)
+        def counted(*args, **kwargs):
+            self.counts["reachable_checks"] += 1
+            return reachable(*args, **kwargs)
+
+        solver.grid.reachable = counted
+
+    def as_dict(self) -> dict:
+        return dict(self.counts)
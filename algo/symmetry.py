@@ -0,0 +1,153 @@
+from typing import List, NamedTuple
+import numpy as np
+from entities.Entity import Path
+from consts import Direction
+
+# Unit vector of every direction a robot or obstacle can face
+DIRECTION_VECTORS = {
+    Direction.NORTH: (0, 1),
+    Direction.EAST: (1, 0),
+    Direction.SOUTH: (0, -1),
+    Direction.WEST: (-1, 0),
+}
+VECTOR_DIRECTIONS = {vector: direction for direction, vector in DIRECTION_VECTORS.items()}
+
+
+class Transform(NamedTuple):
+    """Symmetry of the arena: transpose x and y if swap is set, then mirror x and / or y.
+
+    The eight combinations are the symmetries of a square, the four without swap are also the symmetries
+    of a rectangle.
+    """
+    swap: bool
+    flip_x: bool
+    flip_y: bool
+
+    def is_reflection(self) -> bool:
+        """Whether the transform mirrors the arena, which turns left turns into right turns"""
+        return (self.swap + self.flip_x + self.flip_y) % 2 == 1
+
+    def inverse(self) -> "Transform":
+        # The flips are applied after the transpose, so undoing them has to happen before it
+        if self.swap:
+            return Transform(True, self.flip_y, self.flip_x)
+        return self
+
+    def apply_point(self, x: int, y: int, size_x: int, size_y: int) -> tuple:
+        """Maps a cell of an arena of the given size, the size is the one before the transform"""
+        if self.swap:
+            x, y = y, x
+            size_x, size_y = size_y, size_x
+        if self.flip_x:
+            x = size_x - 1 - x
+        if self.flip_y:
+            y = size_y - 1 - y
+        return x, y
+
+    def apply_direction(self, direction: Direction) -> Direction:
+        if direction not in DIRECTION_VECTORS:
+            # SKIP and HIDDEN are not headings
+            return direction
+        dx, dy = DIRECTION_VECTORS[direction]
+        if self.swap:
+            dx, dy = dy, dx
+        if self.flip_x:
+            dx = -dx
+        if self.flip_y:
+            dy = -dy
+        return VECTOR_DIRECTIONS[(dx, dy)]
+
+    def apply_size(self, size_x: int, size_y: int) -> tuple:
+        return (size_y, size_x) if self.swap else (size_x, size_y)
+
+
+IDENTITY = Transform(False, False, False)
+TRANSFORMS = [Transform(swap, flip_x, flip_y) for swap in (False, True) for flip_x in (False, True)
+              for flip_y in (False, True)]
+
+
+def has_start_zone_bypass(obstacles) -> bool:
+    """Whether any obstacle triggers the start zone exception of Grid.reachable, which only holds for an
+    obstacle at x = 4 next to the bottom left corner and therefore breaks every symmetry of the arena"""
+    return any(ob['x'] == 4 and ob['y'] <= 4 for ob in obstacles)
+
+
+def transform_layout(transform: Transform, obstacles, robot: tuple, size_x: int, size_y: int):
+    """Applies the transform to a list of obstacle dictionaries and the robot pose (x, y, direction)"""
+    new_obstacles = []
+    for ob in obstacles:
+        x, y = transform.apply_point(ob['x'], ob['y'], size_x, size_y)
+        new_obstacles.append({**ob, 'x': x, 'y': y, 'd': int(transform.apply_direction(Direction(ob['d'])))})
+
+    robot_x, robot_y = transform.apply_point(robot[0], robot[1], size_x, size_y)
+    return new_obstacles, (robot_x, robot_y, transform.apply_direction(Direction(robot[2])))
+
+
+def allowed_transforms(obstacles, robot: tuple, size_x: int, size_y: int) -> List[Transform]:
+    """Symmetries under which the planner gives an equivalent plan for the layout.
+
+    The motion model, the clearance rules and the view states are invariant under all the symmetries of
+    the arena, except for the start zone exception in Grid.reachable. A transform is therefore only
+    allowed if that exception fires neither in the original nor in the transformed layout, and only
+    transforms mapping the arena onto itself are considered.
+    """
+    if has_start_zone_bypass(obstacles):
+        return [IDENTITY]
+
+    transforms = []
+    for transform in TRANSFORMS:
+        if transform.apply_size(size_x, size_y) != (size_x, size_y):
+            continue
+        new_obstacles, _robot = transform_layout(transform, obstacles, robot, size_x, size_y)
+        if not has_start_zone_bypass(new_obstacles):
+            transforms.append(transform)
+    return transforms
+
+
+def canonicalize(obstacles, robot: tuple, size_x: int, size_y: int):
+    """Maps a layout to its canonical orientation, the lexicographically smallest one among the allowed
+    transforms, so that all orientations of a layout are planned (and cached) as the same layout.
+
+    The obstacles keep their order, only their positions and directions are transformed.
+
+    Args:
+        obstacles (List[dict]): obstacles, each a dictionary with keys "x", "y", "d" and "id"
+        robot (tuple): robot pose (x, y, direction)
+        size_x (int): size of the arena in the x direction
+        size_y (int): size of the arena in the y direction
+
+    Returns:
+        Tuple[Transform, List[dict], tuple]: the transform to the canonical orientation, and the obstacles
+        and robot pose in it
+    """
+    best = None
+    for transform in allowed_transforms(obstacles, robot, size_x, size_y):
+        new_obstacles, new_robot = transform_layout(transform, obstacles, robot, size_x, size_y)
+        rank = (sorted((ob['x'], ob['y'], ob['d']) for ob in new_obstacles),
+                (new_robot[0], new_robot[1], int(new_robot[2])))
+        if best is None or rank < best[0]:
+            best = (rank, transform, new_obstacles, new_robot)
+
+    _rank, transform, new_obstacles, new_robot = best
+    return transform, new_obstacles, new_robot
+
+
+def restore_path(transform: Transform, path: Path, size_x: int, size_y: int) -> Path:
+    """Maps a path planned in the canonical orientation back to the original one
+
+    Args:
+        transform (Transform): transform returned by canonicalize
+        path (Path): path in the canonical orientation
+        size_x (int): size of the original arena in the x direction
+        size_y (int): size of the original arena in the y direction
+
+    Returns:
+        Path: the path in the original orientation
+    """
+    inverse = transform.inverse()
+    canonical_x, canonical_y = transform.apply_size(size_x, size_y)
+    x, y, direction, screenshot_id = path.columns()
+    # apply_point only uses arithmetic, so it maps whole columns at once
+    x, y = inverse.apply_point(x, y, canonical_x, canonical_y)
+    direction = [int(inverse.apply_direction(Direction(d))) for d in direction.tolist()]
+    return Path(np.column_stack((x, y, direction, screenshot_id)))
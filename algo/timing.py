@@ -0,0 +1,48 @@
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+class PhaseTimings:
+    """Wall time spent in the phases of a plan, such as the searches or the TSP.
+
+    Phases are timed with phase() around their code and kept in the order they were first entered. Time spent
+    again in a phase, e.g. the searches of every subset of the enumerate planner, is added to it. Phases must
+    not be nested, so that their times add up to the time of the plan.
+    """
+
+    def __init__(self):
+        self.seconds = OrderedDict()
+
+    def add(self, name: str, seconds: float):
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def as_milliseconds(self) -> dict:
+        """Time of every phase in milliseconds, rounded to microseconds"""
+        return {name: round(seconds * 1000, 3) for name, seconds in self.seconds.items()}
+
+    def server_timing(self, descriptions: dict = None) -> str:
+        """Value of a Server-Timing header with an entry per phase
+
+        Args:
+            descriptions (dict): optional description of some of the phases, keyed by name
+
+        Returns:
+            str: e.g. 'ingestion;dur=0.412, path_cost_generator;dur=35.1;desc="741 searches"'
+        """
+        descriptions = descriptions or dict()
+        entries = []
+        for name, milliseconds in self.as_milliseconds().items():
+            entry = f"{name};dur={milliseconds}"
+            if name in descriptions:
+                entry += f';desc="{descriptions[name]}"'
+            entries.append(entry)
+        return ", ".join(entries)
@@ -0,0 +1,364 @@
+import time
+from typing import List
+import numpy as np
+
+
+class DeadlineExceeded(Exception):
+    """Raised by the exact solvers when their deadline passes before the optimal tour is found"""
+
+
+def solve_generalized_tsp(cost_matrix: np.ndarray, clusters: List[List[int]], penalties: np.ndarray, start: int = 0,
+                          deadline: float = None):
+    """Solves the open generalized travelling salesman problem over view states.
+
+    The tour starts at the start node and must pick exactly one node out of every visited cluster (one
+    cluster per obstacle, one node per view state). The state of the dynamic program is
+    (subset of visited clusters, last chosen node), so the choice of view state and the visiting order are
+    optimised jointly, and the penalty of every chosen node is added to the tour cost.
+
+    If not every cluster can be visited, the tour visiting the largest number of clusters is returned,
+    breaking ties by cost.
+
+    Args:
+        cost_matrix (np.ndarray): (K, K) matrix of travel costs between nodes, np.inf if there is no path
+        clusters (List[List[int]]): node indices of each cluster, must not contain the start node
+        penalties (np.ndarray): (K,) penalty added when a node is chosen
+        start (int): index of the start node
+        deadline (float): time.monotonic() value after which DeadlineExceeded is raised, None for no limit
+
+    Returns:
+        Tuple[List[int], float]: visiting order of nodes beginning with the start node, and its total cost
+    """
+    n = len(clusters)
+    k = len(cost_matrix)
+    cost_matrix = np.asarray(cost_matrix, dtype=float)
+    penalties = np.asarray(penalties, dtype=float)
+
+    # dp[mask, v]: cheapest open path from start visiting the clusters in mask and ending at node v
+    dp = np.full((1 << n, k), np.inf)
+    parent = np.full((1 << n, k), -1, dtype=np.int32)
+    dp[0, start] = 0
+
+    members = [np.asarray(cluster, dtype=np.int64) for cluster in clusters]
+    cluster_of = np.full(k, -1, dtype=np.int64)
+    for c, nodes in enumerate(members):
+        cluster_of[nodes] = c
+
+    # Every transition adds a cluster, so masks can be relaxed in increasing numerical order
+    for mask in range(1 << n):
+        if deadline is not None and time.monotonic() >= deadline:
+            raise DeadlineExceeded()
+
+        row = dp[mask]
+        ends = np.flatnonzero(np.isfinite(row))
+        if len(ends) == 0:
+            continue
+
+        for c in range(n):
+            if mask & (1 << c) or len(members[c]) == 0:
+                continue
+
+            nodes = members[c]
+            # candidates[i, j]: reach node j of the cluster from the i-th reachable end of this mask
+            candidates = row[ends, None] + cost_matrix[np.ix_(ends, nodes)]
+            best = candidates.argmin(axis=0)
+            best_cost = candidates[best, np.arange(len(nodes))] + penalties[nodes]
+
+            next_mask = mask | (1 << c)
+            improved = best_cost < dp[next_mask, nodes]
+            dp[next_mask, nodes[improved]] = best_cost[improved]
+            parent[next_mask, nodes[improved]] = ends[best[improved]]
+
+    # Pick the feasible subset with the most clusters, then the cheapest one
+    best_mask, best_node, best_cost = 0, start, 0.0
+    for mask in range(1, 1 << n):
+        node = int(dp[mask].argmin())
+        cost = dp[mask, node]
+        if not np.isfinite(cost):
+            continue
+
+        visited, best_visited = bin(mask).count('1'), bin(best_mask).count('1')
+        if visited > best_visited or (visited == best_visited and cost < best_cost):
+            best_mask, best_node, best_cost = mask, node, float(cost)
+
+    # Walk the parent pointers back to the start node
+    order = []
+    mask, node = best_mask, best_node
+    while mask:
+        order.append(node)
+        previous = int(parent[mask, node])
+        mask &= ~(1 << int(cluster_of[node]))
+        node = previous
+    order.append(start)
+
+    return order[::-1], best_cost
+
+
+
+def solve_tsp_held_karp(distance_matrix: np.ndarray):
+    """Solves the travelling salesman problem exactly with the Held-Karp dynamic program.
+
+    The DP table holds one row per subset of the nodes other than node 0 and one column per last node, and
+    every layer of subsets of the same size is relaxed with vectorized min-reductions. The tour starts and
+    ends at node 0, so setting distance_matrix[:, 0] = 0 gives the open path convention.
+
+    Args:
+        distance_matrix (np.ndarray): (n, n) matrix of travel costs between nodes
+
+    Returns:
+        Tuple[List[int], float]: visiting order of nodes beginning with node 0, and its total cost
+    """
+    distance_matrix = np.asarray(distance_matrix, dtype=float)
+    n = len(distance_matrix)
+    if n == 1:
+        return [0], float(distance_matrix[0, 0])
+
+    # Nodes 1..n-1 are represented by bits 0..m-1
+    m = n - 1
+    inner = distance_matrix[1:, 1:]
+
+    dp = np.full((1 << m, m), np.inf)
+    parent = np.full((1 << m, m), -1, dtype=np.int8 if m < 128 else np.int32)
+    dp[1 << np.arange(m), np.arange(m)] = distance_matrix[0, 1:]
+
+    masks = np.arange(1 << m)
+    popcount = np.zeros(1 << m, dtype=np.int64)
+    for bit in range(m):
+        popcount += (masks >> bit) & 1
+
+    bits = 1 << np.arange(m)
+    for size in range(2, m + 1):
+        layer = masks[popcount == size]
+        contains = (layer[:, None] & bits[None, :]) != 0
+
+        # candidates[s, j, k]: reach last node j of subset s from last node k of subset s without j
+        candidates = dp[layer[:, None] ^ bits[None, :]] + inner.T[None, :, :]
+        best = candidates.argmin(axis=2)
+        best_cost = np.take_along_axis(candidates, best[:, :, None], axis=2)[:, :, 0]
+
+        dp[layer] = np.where(contains, best_cost, np.inf)
+        parent[layer] = np.where(contains, best, -1)
+
+    full = (1 << m) - 1
+    closing = dp[full] + distance_matrix[1:, 0]
+    last = int(closing.argmin())
+    distance = float(closing[last])
+
+    # Walk the parent pointers back to node 0
+    order = []
+    mask = full
+    while last != -1:
+        order.append(last + 1)
+        previous = int(parent[mask, last])
+        mask ^= 1 << last
+        last = previous
+    order.append(0)
+
+    return order[::-1], distance
+
+
+def open_path_lower_bound(cost_matrix: np.ndarray) -> float:
+    """Admissible lower bound on the cheapest open path that starts at node 0 and visits every node.
+
+    Two cheap bounds are combined. Every node other than node 0 is entered exactly once, so the sum of
+    the cheapest incoming edge of each of these nodes is a bound. The path is also a spanning tree, so the
+    minimum spanning tree is a bound as well.
+
+    Args:
+        cost_matrix (np.ndarray): (n, n) symmetric matrix of travel costs between nodes
+
+    Returns:
+        float: lower bound on the cost of the open path
+    """
+    n = len(cost_matrix)
+    if n <= 1:
+        return 0.0
+
+    off_diagonal = np.array(cost_matrix, dtype=float)
+    np.fill_diagonal(off_diagonal, np.inf)
+
+    incoming = off_diagonal[:, 1:].min(axis=0).sum()
+
+    # Prim's algorithm, starting from node 0
+    in_tree = np.zeros(n, dtype=bool)
+    in_tree[0] = True
+    connection = off_diagonal[0].copy()
+    tree = 0.0
+    for _ in range(n - 1):
+        connection[in_tree] = np.inf
+        node = int(connection.argmin())
+        tree += connection[node]
+        in_tree[node] = True
+        connection = np.minimum(connection, off_diagonal[node])
+
+    return float(max(incoming, tree))
+
+
+def evaluate_combinations(items_cost: np.ndarray, candidates: np.ndarray, fixed_costs: np.ndarray, start: int,
+                          stop: int, bound: float, deadline: float = None):
+    """Solves the open TSP of every combination of view states in candidates[start:stop], keeping the best.
+
+    A combination is only taken if it is strictly better than the best one so far, so of equally good
+    combinations the first one wins, whichever way the range is split up.
+
+    Args:
+        items_cost (np.ndarray): (n, n) costs between all items, the start state being item 0
+        candidates (np.ndarray): (combinations, k) items visited by every combination, starting with 0
+        fixed_costs (np.ndarray): penalties of the view states of every combination
+        start (int): first combination to evaluate
+        stop (int): combination to stop at
+        bound (float): distance a combination has to beat
+        deadline (float): time.monotonic() value at which to stop, None for no limit
+
+    Returns:
+        Tuple[float, int, list, int, int, bool]: best distance (bound if none beat it), index of the best
+        combination (-1 if none), its visiting order as indices into its candidates, number of combinations
+        pruned by the lower bound and of TSPs solved, and whether the deadline stopped the evaluation
+    """
+    distance, best_index, best_permutation = bound, -1, None
+    pruned = solved = 0
+
+    for index in range(start, stop):
+        if deadline is not None and time.monotonic() >= deadline:
+            return distance, best_index, best_permutation, pruned, solved, True
+
+        visited_candidates = candidates[index]
+        fixed_cost = fixed_costs[index]
+        cost_np = items_cost[np.ix_(visited_candidates, visited_candidates)]
+
+        # Skip the TSP if even the lower bound of this combination is no better than the incumbent
+        if open_path_lower_bound(cost_np) + fixed_cost >= distance:
+            pruned += 1
+            continue
+
+        cost_np[:, 0] = 0
+        permutation, tsp_distance = solve_tsp_held_karp(cost_np)
+        solved += 1
+        if tsp_distance + fixed_cost >= distance:
+            continue
+
+        distance, best_index, best_permutation = float(tsp_distance + fixed_cost), index, permutation
+
+    return distance, best_index, best_permutation, pruned, solved, False
+
+
+def solve_generalized_tsp_heuristic(cost_matrix: np.ndarray, clusters: List[List[int]], penalties: np.ndarray,
+                                    start: int = 0):
+    """Builds a good open generalized TSP tour without the exponential cost of solve_generalized_tsp.
+
+    The tour is constructed by cheapest insertion of one view state per cluster, then improved with 2-opt,
+    Or-opt and view state swap moves until no move lowers the cost. Costs are assumed to be symmetric.
+    Missing edges are given a prohibitive finite cost while the tour is built and improved, so the moves
+    can untangle them, and view states still joined by a missing edge at the end are left out.
+
+    Args:
+        cost_matrix (np.ndarray): (K, K) symmetric matrix of travel costs between nodes, np.inf if there is no path
+        clusters (List[List[int]]): node indices of each cluster, must not contain the start node
+        penalties (np.ndarray): (K,) penalty added when a node is chosen
+        start (int): index of the start node
+
+    Returns:
+        Tuple[List[int], float]: visiting order of nodes beginning with the start node, and its total cost
+    """
+    unreachable = 1e9
+    cost = np.minimum(np.asarray(cost_matrix, dtype=float), unreachable).tolist()
+    penalty = np.asarray(penalties, dtype=float).tolist()
+    cluster_of = dict()
+    for c, nodes in enumerate(clusters):
+        for node in nodes:
+            cluster_of[node] = c
+
+    def edge(u, v):
+        # Cost of the edge between u and v, None stands for the free end of the open path
+        return 0.0 if u is None or v is None else cost[u][v]
+
+    # Only nodes connected to the start node by a chain of existing edges can ever be part of the tour
+    connected = {start}
+    frontier = [start]
+    while frontier:
+        u = frontier.pop()
+        for v in range(len(cost)):
+            if v not in connected and cost[u][v] < unreachable:
+                connected.add(v)
+                frontier.append(v)
+
+    # Cheapest insertion: repeatedly insert the (cluster, node, position) that adds the least cost
+    tour = [start]
+    remaining = [c for c in range(len(clusters)) if any(node in connected for node in clusters[c])]
+    while remaining:
+        best = None
+        for c in remaining:
+            for node in clusters[c]:
+                if node not in connected:
+                    continue
+                for position in range(1, len(tour) + 1):
+                    before, after = tour[position - 1], tour[position] if position < len(tour) else None
+                    delta = edge(before, node) + edge(node, after) - edge(before, after) + penalty[node]
+                    if best is None or delta < best[0]:
+                        best = (delta, c, node, position)
+
+        _, c, node, position = best
+        tour.insert(position, node)
+        remaining.remove(c)
+
+    def neighbour(position):
+        return tour[position] if 0 <= position < len(tour) else None
+
+    improved = True
+    while improved:
+        improved = False
+
+        # 2-opt: reverse tour[i..j], the start node stays in front
+        for i in range(1, len(tour) - 1):
+            for j in range(i + 1, len(tour)):
+                before, after = tour[i - 1], neighbour(j + 1)
+                delta = edge(before, tour[j]) + edge(tour[i], after) - edge(before, tour[i]) - edge(tour[j], after)
+                if delta < -1e-9:
+                    tour[i:j + 1] = tour[i:j + 1][::-1]
+                    improved = True
+
+        # Or-opt: move a segment of up to 3 nodes, possibly reversed, to another position
+        for length in (1, 2, 3):
+            i = 1
+            while i + length <= len(tour):
+                segment = tour[i:i + length]
+                before, after = tour[i - 1], neighbour(i + length)
+                removal = edge(before, segment[0]) + edge(segment[-1], after) - edge(before, after)
+                rest = tour[:i] + tour[i + length:]
+
+                best = None
+                for position in range(1, len(rest) + 1):
+                    if position == i:
+                        continue
+                    prev, nxt = rest[position - 1], rest[position] if position < len(rest) else None
+                    for candidate in (segment, segment[::-1]):
+                        insertion = edge(prev, candidate[0]) + edge(candidate[-1], nxt) - edge(prev, nxt)
+                        if best is None or insertion < best[0]:
+                            best = (insertion, position, candidate)
+
+                if best is not None and best[0] - removal < -1e-9:
+                    _, position, candidate = best
+                    tour[:] = rest[:position] + candidate + rest[position:]
+                    improved = True
+                i += 1
+
+        # View state swap: replace a node with another view state of the same obstacle
+        for i in range(1, len(tour)):
+            before, node, after = tour[i - 1], tour[i], neighbour(i + 1)
+            current = edge(before, node) + edge(node, after) + penalty[node]
+            for other in clusters[cluster_of[node]]:
+                if other in connected and edge(before, other) + edge(other, after) + penalty[other] < current - 1e-9:
+                    tour[i] = other
+                    current = edge(before, other) + edge(other, after) + penalty[other]
+                    improved = True
+
+    # Drop view states that could still only be reached over a missing edge
+    position = 1
+    while position < len(tour):
+        if cost[tour[position - 1]][tour[position]] >= unreachable:
+            del tour[position]
+        else:
+            position += 1
+
+    distance = sum(cost[u][v] for u, v in zip(tour, tour[1:])) + sum(penalty[node] for node in tour[1:])
+    return tour, float(distance)
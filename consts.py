@@ -32,6 +32,7 @@ WIDTH = 20
 HEIGHT = 20
 
 ITERATIONS = 5000
+EXACT_PLANNER_MAX_OBSTACLES = 10 # above this many obstacles, the tour is planned heuristically
 TURN_RADIUS = 3
 
 SAFE_COST = 0 # the cost for the turn in case there is a chance that the robot is touch some obstacle
@@ -1,18 +1,47 @@
 from typing import List
-from consts import Direction, EXPANDED_CELL, SCREENSHOT_COST
+import numpy as np
+from consts import Direction, EXPANDED_CELL, SCREENSHOT_COST, WIDTH, HEIGHT
 from helper import is_valid
 
 
 class CellState:
-    """Base class for all objects on the arena, such as cells, obstacles, etc"""
+    """Base class for all objects on the arena, such as cells, obstacles, etc
+
+    Cell states are immutable and compare and hash by value, so equal states are interchangeable as keys of
+    the cost and path tables.
+    """
+    __slots__ = ("x", "y", "direction", "screenshot_id", "penalty", "_hash")
 
     def __init__(self, x, y, direction: Direction = Direction.NORTH, screenshot_id=-1, penalty=0):
-        self.x = x
-        self.y = y
-        self.direction = direction
+        set_field = super().__setattr__
+        set_field("x", x)
+        set_field("y", y)
+        set_field("direction", direction)
         # If screenshot_od != -1, the snapshot is taken at that position is for the obstacle with id = screenshot_id
-        self.screenshot_id = screenshot_id
-        self.penalty = penalty  # Penalty for the view point of taking picture
+        set_field("screenshot_id", screenshot_id)
+        set_field("penalty", penalty)  # Penalty for the view point of taking picture
+        set_field("_hash", hash(self._key()))
+
+    def _key(self) -> tuple:
+        """Values the state is compared and hashed by"""
+        return self.x, self.y, int(self.direction), self.screenshot_id, self.penalty
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __reduce__(self):
+        return type(self), (self.x, self.y, self.direction, self.screenshot_id, self.penalty)
+
+    def __eq__(self, other):
+        if not isinstance(other, CellState):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self):
+        return self._hash
 
     def cmp_position(self, x, y) -> bool:
         """Compare given (x,y) position with cell state's position
@@ -42,13 +71,13 @@ class CellState:
     def __repr__(self):
         return "x: {}, y: {}, d: {}, screenshot: {}".format(self.x, self.y, self.direction, self.screenshot_id)
 
-    def set_screenshot(self, screenshot_id):
-        """Set screenshot id for cell
+    def with_screenshot(self, screenshot_id) -> "CellState":
+        """Returns the same cell with the given screenshot id
 
         Args:
             screenshot_id (int): screenshot id of cell
         """
-        self.screenshot_id = screenshot_id
+        return CellState(self.x, self.y, self.direction, screenshot_id, self.penalty)
 
     def get_dict(self):
         """Returns a dictionary representation of the cell
@@ -59,12 +88,71 @@ class CellState:
         return {'x': self.x, 'y': self.y, 'd': self.direction, 's': self.screenshot_id}
 
 
+class Path:
+    """Path of the robot, packed into an (n, 4) array of 16-bit integers holding the x, y, direction and
+    screenshot id of every state.
+
+    Indexing and iterating give CellStates, while command_generator and get_dicts read the columns directly.
+    """
+    __slots__ = ("states",)
+
+    def __init__(self, states):
+        """
+        Args:
+            states: (n, 4) array-like of (x, y, direction, screenshot_id) rows
+        """
+        self.states = np.array(states, dtype=np.int16).reshape(-1, 4)
+        self.states.flags.writeable = False
+
+    @classmethod
+    def from_cell_states(cls, cells) -> "Path":
+        return cls([(cell.x, cell.y, int(cell.direction), cell.screenshot_id) for cell in cells])
+
+    def __len__(self):
+        return len(self.states)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return Path(self.states[index])
+        x, y, direction, screenshot_id = self.states[index].tolist()
+        return CellState(x, y, Direction(direction), screenshot_id)
+
+    def __iter__(self):
+        for x, y, direction, screenshot_id in self.states.tolist():
+            yield CellState(x, y, Direction(direction), screenshot_id)
+
+    def __repr__(self):
+        return "Path({} states)".format(len(self))
+
+    def columns(self) -> np.ndarray:
+        """Returns the x, y, direction and screenshot id columns, e.g. x, y, d, s = path.columns()"""
+        return self.states.T
+
+    def get_dicts(self, indices=None) -> List[dict]:
+        """Returns the dictionary representation (see CellState.get_dict) of the states at the given indices,
+        or of every state
+
+        Args:
+            indices (List[int]): indices of the states, None for all of them
+        """
+        rows = self.states if indices is None else self.states[indices]
+        return [{'x': x, 'y': y, 'd': d, 's': s} for x, y, d, s in rows.tolist()]
+
+
 class Obstacle(CellState):
     """Obstacle class, inherited from CellState"""
+    __slots__ = ("obstacle_id",)
 
     def __init__(self, x: int, y: int, direction: Direction, obstacle_id: int):
         super().__init__(x, y, direction)
-        self.obstacle_id = obstacle_id
+        object.__setattr__(self, "obstacle_id", obstacle_id)
+
+    def _key(self) -> tuple:
+        # Obstacles are the same if they are at the same place facing the same way, whatever their ids
+        return self.x, self.y, int(self.direction)
+
+    def __reduce__(self):
+        return type(self), (self.x, self.y, self.direction, self.obstacle_id)
 
     def __eq__(self, other):
         """Checks if this obstacle is the same as input in terms of x, y, and direction
@@ -77,9 +165,17 @@ class Obstacle(CellState):
         """
         return self.x == other.x and self.y == other.y and self.direction == other.direction
 
-    def get_view_state(self, retrying) -> List[CellState]:
+    def __hash__(self):
+        return self._hash
+
+    def get_view_state(self, retrying, size_x: int = WIDTH, size_y: int = HEIGHT) -> List[CellState]:
         """Constructs the list of CellStates from which the robot can view the symbol on the obstacle
 
+        Args:
+            retrying (bool): whether the view states for a retry should be used
+            size_x (int): size of the arena in the x direction
+            size_y (int): size of the arena in the y direction
+
         Returns:
             List[CellState]: Valid cell states where robot can be positioned to view the symbol on the obstacle
         """
@@ -89,45 +185,45 @@ class Obstacle(CellState):
         if self.direction == Direction.NORTH:
             if retrying == False:
                 # Or (x, y + 3)
-                if is_valid(self.x, self.y + 1 + EXPANDED_CELL * 2):
+                if is_valid(self.x, self.y + 1 + EXPANDED_CELL * 2, size_x, size_y):
                     cells.append(CellState(
                         self.x, self.y + 1 + EXPANDED_CELL * 2, Direction.SOUTH, self.obstacle_id, 5))
                 # Or (x, y + 4)
-                if is_valid(self.x, self.y + 2 + EXPANDED_CELL * 2):
+                if is_valid(self.x, self.y + 2 + EXPANDED_CELL * 2, size_x, size_y):
                     cells.append(CellState(
                         self.x, self.y + 2 + EXPANDED_CELL * 2, Direction.SOUTH, self.obstacle_id, 0))
 
                 # Or (x + 1, y + 3)
-                # if is_valid(self.x + 1, self.y + 1 + EXPANDED_CELL * 2):
+                # if is_valid(self.x + 1, self.y + 1 + EXPANDED_CELL * 2, size_x, size_y):
                 #     cells.append(CellState(self.x + 1, self.y + 1 + EXPANDED_CELL * 2, Direction.SOUTH, self.obstacle_id, SCREENSHOT_COST*10))
                 # # Or (x - 1, y + 3)
-                # if is_valid(self.x - 1, self.y + 1 + EXPANDED_CELL * 2):
+                # if is_valid(self.x - 1, self.y + 1 + EXPANDED_CELL * 2, size_x, size_y):
                 #     cells.append(CellState(self.x - 1, self.y + 1 + EXPANDED_CELL * 2, Direction.SOUTH, self.obstacle_id, SCREENSHOT_COST*10))
 
                 # Or (x + 1, y + 4)
-                if is_valid(self.x + 1, self.y + 2 + EXPANDED_CELL * 2):
+                if is_valid(self.x + 1, self.y + 2 + EXPANDED_CELL * 2, size_x, size_y):
                     cells.append(CellState(self.x + 1, self.y + 2 + EXPANDED_CELL *
                                  2, Direction.SOUTH, self.obstacle_id, SCREENSHOT_COST))
                 # Or (x - 1, y + 4)
-                if is_valid(self.x - 1, self.y + 2 + EXPANDED_CELL * 2):
+                if is_valid(self.x - 1, self.y + 2 + EXPANDED_CELL * 2, size_x, size_y):
                     cells.append(CellState(self.x - 1, self.y + 2 + EXPANDED_CELL *
                                  2, Direction.SOUTH, self.obstacle_id, SCREENSHOT_COST))
 
             elif retrying == True:
                 # Or (x, y + 4)
-                if is_valid(self.x, self.y + 2 + EXPANDED_CELL * 2):
+                if is_valid(self.x, self.y + 2 + EXPANDED_CELL * 2, size_x, size_y):
                     cells.append(CellState(
                         self.x, self.y + 2 + EXPANDED_CELL * 2, Direction.SOUTH, self.obstacle_id, 0))
                 # Or (x, y + 5)
-                if is_valid(self.x, self.y + 3 + EXPANDED_CELL * 2):
+                if is_valid(self.x, self.y + 3 + EXPANDED_CELL * 2, size_x, size_y):
                     cells.append(CellState(
                         self.x, self.y + 3 + EXPANDED_CELL * 2, Direction.SOUTH, self.obstacle_id, 0))
                 # Or (x + 1, y + 4)
-                if is_valid(self.x + 1, self.y + 2 + EXPANDED_CELL * 2):
+                if is_valid(self.x + 1, self.y + 2 + EXPANDED_CELL * 2, size_x, size_y):
                     cells.append(CellState(self.x + 1, self.y + 2 + EXPANDED_CELL *
                                  2, Direction.SOUTH, self.obstacle_id, SCREENSHOT_COST))
                 # Or (x - 1, y + 4)
-                if is_valid(self.x - 1, self.y + 2 + EXPANDED_CELL * 2):
+                if is_valid(self.x - 1, self.y + 2 + EXPANDED_CELL * 2, size_x, size_y):
                     cells.append(CellState(self.x - 1, self.y + 2 + EXPANDED_CELL *
                                  2, Direction.SOUTH, self.obstacle_id, SCREENSHOT_COST))
 
@@ -136,45 +232,45 @@ class Obstacle(CellState):
 
             if retrying == False:
                 # Or (x, y - 3)
-                if is_valid(self.x, self.y - 1 - EXPANDED_CELL * 2):
+                if is_valid(self.x, self.y - 1 - EXPANDED_CELL * 2, size_x, size_y):
                     cells.append(CellState(
                         self.x, self.y - 1 - EXPANDED_CELL * 2, Direction.NORTH, self.obstacle_id, 5))
                 # Or (x, y - 4)
-                if is_valid(self.x, self.y - 2 - EXPANDED_CELL * 2):
+                if is_valid(self.x, self.y - 2 - EXPANDED_CELL * 2, size_x, size_y):
                     cells.append(CellState(
                         self.x, self.y - 2 - EXPANDED_CELL * 2, Direction.NORTH, self.obstacle_id, 0))
 
                 # Or (x + 1, y - 3)
-                # if is_valid(self.x + 1, self.y - 1 - EXPANDED_CELL * 2):
+                # if is_valid(self.x + 1, self.y - 1 - EXPANDED_CELL * 2, size_x, size_y):
                 #     cells.append(CellState(self.x + 1, self.y - 1 - EXPANDED_CELL * 2, Direction.NORTH, self.obstacle_id, SCREENSHOT_COST*10))
                 # # Or (x - 1, y - 3)
-                # if is_valid(self.x - 1, self.y - 1 - EXPANDED_CELL * 2):
+                # if is_valid(self.x - 1, self.y - 1 - EXPANDED_CELL * 2, size_x, size_y):
                 #     cells.append(CellState(self.x - 1, self.y - 1 - EXPANDED_CELL * 2, Direction.NORTH, self.obstacle_id, SCREENSHOT_COST*10))
 
                 # Or (x + 1, y - 4)
-                if is_valid(self.x + 1, self.y - 2 - EXPANDED_CELL * 2):
+                if is_valid(self.x + 1, self.y - 2 - EXPANDED_CELL * 2, size_x, size_y):
                     cells.append(CellState(self.x + 1, self.y - 2 - EXPANDED_CELL *
                                  2, Direction.NORTH, self.obstacle_id, SCREENSHOT_COST))
                 # Or (x - 1, y - 4)
-                if is_valid(self.x - 1, self.y - 2 - EXPANDED_CELL * 2):
+                if is_valid(self.x - 1, self.y - 2 - EXPANDED_CELL * 2, size_x, size_y):
                     cells.append(CellState(self.x - 1, self.y - 2 - EXPANDED_CELL *
                                  2, Direction.NORTH, self.obstacle_id, SCREENSHOT_COST))
 
             elif retrying == True:
                 # Or (x, y - 4)
-                if is_valid(self.x, self.y - 2 - EXPANDED_CELL * 2):
+                if is_valid(self.x, self.y - 2 - EXPANDED_CELL * 2, size_x, size_y):
                     cells.append(CellState(
                         self.x, self.y - 2 - EXPANDED_CELL * 2, Direction.NORTH, self.obstacle_id, 0))
                 # Or (x, y - 5)
-                if is_valid(self.x, self.y - 3 - EXPANDED_CELL * 2):
+                if is_valid(self.x, self.y - 3 - EXPANDED_CELL * 2, size_x, size_y):
                     cells.append(CellState(
                         self.x, self.y - 3 - EXPANDED_CELL * 2, Direction.NORTH, self.obstacle_id, 0))
                 # Or (x + 1, y - 4)
-                if is_valid(self.x + 1, self.y - 2 - EXPANDED_CELL * 2):
+                if is_valid(self.x + 1, self.y - 2 - EXPANDED_CELL * 2, size_x, size_y):
                     cells.append(CellState(self.x + 1, self.y - 2 - EXPANDED_CELL *
                                  2, Direction.NORTH, self.obstacle_id, SCREENSHOT_COST))
                 # Or (x - 1, y - 4)
-                if is_valid(self.x - 1, self.y - 2 - EXPANDED_CELL * 2):
+                if is_valid(self.x - 1, self.y - 2 - EXPANDED_CELL * 2, size_x, size_y):
                     cells.append(CellState(self.x - 1, self.y - 2 - EXPANDED_CELL *
                                  2, Direction.NORTH, self.obstacle_id, SCREENSHOT_COST))
 
@@ -183,98 +279,98 @@ class Obstacle(CellState):
 
             if retrying == False:
                 # Or (x + 3,y)
-                if is_valid(self.x + 1 + EXPANDED_CELL * 2, self.y):
+                if is_valid(self.x + 1 + EXPANDED_CELL * 2, self.y, size_x, size_y):
                     cells.append(CellState(self.x + 1 + EXPANDED_CELL * 2,
                                  self.y, Direction.WEST, self.obstacle_id, 5))
                 # Or (x + 4,y)
-                if is_valid(self.x + 2 + EXPANDED_CELL * 2, self.y):
+                if is_valid(self.x + 2 + EXPANDED_CELL * 2, self.y, size_x, size_y):
                     # print(f"Obstacle facing east, Adding {self.x + 2 + EXPANDED_CELL * 2}, {self.y}")
                     cells.append(CellState(self.x + 2 + EXPANDED_CELL * 2,
                                  self.y, Direction.WEST, self.obstacle_id, 0))
 
                 # Or (x + 3,y + 1)
-                # if is_valid(self.x + 1 + EXPANDED_CELL * 2, self.y + 1):
+                # if is_valid(self.x + 1 + EXPANDED_CELL * 2, self.y + 1, size_x, size_y):
                 #     #print(f"Obstacle facing east, Adding {self.x + 2 + EXPANDED_CELL * 2}, {self.y + 1}")
                 #     cells.append(CellState(self.x + 1 + EXPANDED_CELL * 2, self.y + 1, Direction.WEST, self.obstacle_id, SCREENSHOT_COST*10))
                 # # Or (x + 3,y - 1)
-                # if is_valid(self.x + 1 + EXPANDED_CELL * 2, self.y - 1):
+                # if is_valid(self.x + 1 + EXPANDED_CELL * 2, self.y - 1, size_x, size_y):
                 #     #print(f"Obstacle facing east, Adding {self.x + 2 + EXPANDED_CELL * 2}, {self.y - 1}")
                 #     cells.append(CellState(self.x + 1 + EXPANDED_CELL * 2, self.y - 1, Direction.WEST, self.obstacle_id, SCREENSHOT_COST*10))
 
                 # Or (x + 4, y + 1)
-                if is_valid(self.x + 2 + EXPANDED_CELL * 2, self.y + 1):
+                if is_valid(self.x + 2 + EXPANDED_CELL * 2, self.y + 1, size_x, size_y):
                     cells.append(CellState(self.x + 2 + EXPANDED_CELL * 2, self.y +
                                  1, Direction.WEST, self.obstacle_id, SCREENSHOT_COST))
                 # Or (x + 4, y - 1)
-                if is_valid(self.x + 2 + EXPANDED_CELL * 2, self.y - 1):
+                if is_valid(self.x + 2 + EXPANDED_CELL * 2, self.y - 1, size_x, size_y):
                     cells.append(CellState(self.x + 2 + EXPANDED_CELL * 2, self.y -
                                  1, Direction.WEST, self.obstacle_id, SCREENSHOT_COST))
 
             elif retrying == True:
                 # Or (x + 4, y)
-                if is_valid(self.x + 2 + EXPANDED_CELL * 2, self.y):
+                if is_valid(self.x + 2 + EXPANDED_CELL * 2, self.y, size_x, size_y):
                     cells.append(CellState(self.x + 2 + EXPANDED_CELL * 2,
                                  self.y, Direction.WEST, self.obstacle_id, 0))
                 # Or (x + 5, y)
-                if is_valid(self.x + 3 + EXPANDED_CELL * 2, self.y):
+                if is_valid(self.x + 3 + EXPANDED_CELL * 2, self.y, size_x, size_y):
                     cells.append(CellState(self.x + 3 + EXPANDED_CELL * 2,
                                  self.y, Direction.WEST, self.obstacle_id, 0))
                 # Or (x + 4,y + 1)
-                if is_valid(self.x + 2 + EXPANDED_CELL * 2, self.y + 1):
+                if is_valid(self.x + 2 + EXPANDED_CELL * 2, self.y + 1, size_x, size_y):
                     cells.append(CellState(self.x + 2 + EXPANDED_CELL * 2, self.y +
                                  1, Direction.WEST, self.obstacle_id, SCREENSHOT_COST))
                 # Or (x + 4,y - 1)
-                if is_valid(self.x + 2 + EXPANDED_CELL * 2, self.y - 1):
+                if is_valid(self.x + 2 + EXPANDED_CELL * 2, self.y - 1, size_x, size_y):
                     cells.append(CellState(self.x + 2 + EXPANDED_CELL * 2, self.y -
                                  1, Direction.WEST, self.obstacle_id, SCREENSHOT_COST))
 
         # If obstacle is facing west, then robot's cell state must be facing east
         elif self.direction == Direction.WEST:
             # It can be (x - 2,y)
-            # if is_valid(self.x - EXPANDED_CELL * 2, self.y):
+            # if is_valid(self.x - EXPANDED_CELL * 2, self.y, size_x, size_y):
             #     cells.append(CellState(self.x - EXPANDED_CELL * 2, self.y, Direction.EAST, self.obstacle_id, 0))
 
             if retrying == False:
                 # Or (x - 3, y)
-                if is_valid(self.x - 1 - EXPANDED_CELL * 2, self.y):
+                if is_valid(self.x - 1 - EXPANDED_CELL * 2, self.y, size_x, size_y):
                     cells.append(CellState(self.x - 1 - EXPANDED_CELL * 2,
                                  self.y, Direction.EAST, self.obstacle_id, 5))
                 # Or (x - 4, y)
-                if is_valid(self.x - 2 - EXPANDED_CELL * 2, self.y):
+                if is_valid(self.x - 2 - EXPANDED_CELL * 2, self.y, size_x, size_y):
                     cells.append(CellState(self.x - 2 - EXPANDED_CELL * 2,
                                  self.y, Direction.EAST, self.obstacle_id, 0))
 
                 # Or (x - 3,y + 1)
-                # if is_valid(self.x - 1 - EXPANDED_CELL * 2, self.y + 1):
+                # if is_valid(self.x - 1 - EXPANDED_CELL * 2, self.y + 1, size_x, size_y):
                 #     cells.append(CellState(self.x - 1 - EXPANDED_CELL * 2, self.y + 1, Direction.EAST, self.obstacle_id, SCREENSHOT_COST*10))
                 # # Or (x - 3,y - 1)
-                # if is_valid(self.x - 1 - EXPANDED_CELL * 2, self.y - 1):
+                # if is_valid(self.x - 1 - EXPANDED_CELL * 2, self.y - 1, size_x, size_y):
                 #     cells.append(CellState(self.x - 1 - EXPANDED_CELL * 2, self.y - 1, Direction.EAST, self.obstacle_id, SCREENSHOT_COST*10))
 
                 # Or (x - 4, y + 1)
-                if is_valid(self.x - 2 - EXPANDED_CELL * 2, self.y + 1):
+                if is_valid(self.x - 2 - EXPANDED_CELL * 2, self.y + 1, size_x, size_y):
                     cells.append(CellState(self.x - 2 - EXPANDED_CELL * 2, self.y +
                                  1, Direction.EAST, self.obstacle_id, SCREENSHOT_COST))
                 # Or (x - 4, y - 1)
-                if is_valid(self.x - 2 - EXPANDED_CELL * 2, self.y - 1):
+                if is_valid(self.x - 2 - EXPANDED_CELL * 2, self.y - 1, size_x, size_y):
                     cells.append(CellState(self.x - 2 - EXPANDED_CELL * 2, self.y -
                                  1, Direction.EAST, self.obstacle_id, SCREENSHOT_COST))
 
             elif retrying == True:
                 # Or (x - 4, y)
-                if is_valid(self.x - 2 - EXPANDED_CELL * 2, self.y):
+                if is_valid(self.x - 2 - EXPANDED_CELL * 2, self.y, size_x, size_y):
                     cells.append(CellState(self.x - 2 - EXPANDED_CELL * 2,
                                  self.y, Direction.EAST, self.obstacle_id, 0))
                 # Or (x - 5, y)
-                if is_valid(self.x - 3 - EXPANDED_CELL * 2, self.y):
+                if is_valid(self.x - 3 - EXPANDED_CELL * 2, self.y, size_x, size_y):
                     cells.append(CellState(self.x - 3 - EXPANDED_CELL * 2,
                                  self.y, Direction.EAST, self.obstacle_id, 0))
                 # Or (x - 4, y + 1)
-                if is_valid(self.x - 2 - EXPANDED_CELL * 2, self.y + 1):
+                if is_valid(self.x - 2 - EXPANDED_CELL * 2, self.y + 1, size_x, size_y):
                     cells.append(CellState(self.x - 2 - EXPANDED_CELL * 2, self.y +
                                  1, Direction.EAST, self.obstacle_id, SCREENSHOT_COST))
                 # Or (x - 4, y - 1)
-                if is_valid(self.x - 2 - EXPANDED_CELL * 2, self.y - 1):
+                if is_valid(self.x - 2 - EXPANDED_CELL * 2, self.y - 1, size_x, size_y):
                     cells.append(CellState(self.x - 2 - EXPANDED_CELL * 2, self.y -
                                  1, Direction.EAST, self.obstacle_id, SCREENSHOT_COST))
 
@@ -295,6 +391,13 @@ class Grid:
         self.size_y = size_y
         self.obstacles: List[Obstacle] = []
 
+        # Occupancy bitmaps indexed by [x, y], True where the cell is reachable.
+        # The plain mask blocks cells within 1 unit of an obstacle, the turn mask (shared by turn=True and
+        # preTurn=True, which apply the same rule) blocks cells within EXPANDED_CELL * 2 units.
+        # Both are built lazily on the first query and then updated in place as obstacles are added.
+        self._reachable_mask = None
+        self._turn_mask = None
+
     def add_obstacle(self, obstacle: Obstacle):
         """Add a new obstacle to the Grid object, ignores if duplicate obstacle
 
@@ -310,12 +413,67 @@ class Grid:
 
         if to_add:
             self.obstacles.append(obstacle)
+            # Only the footprint of the new obstacle changes, so stamp it into the existing masks
+            if self._reachable_mask is not None:
+                self._stamp_obstacle(obstacle)
+
+    def remove_obstacle(self, obstacle: Obstacle) -> bool:
+        """Removes an obstacle with the same position and direction from the Grid object
+
+        Args:
+            obstacle (Obstacle): Obstacle to be removed
+
+        Returns:
+            bool: True if the obstacle was found and removed, False otherwise
+        """
+        for i, ob in enumerate(self.obstacles):
+            if ob == obstacle:
+                del self.obstacles[i]
+                # Footprints of obstacles overlap, so the masks are rebuilt from scratch on the next query
+                self._reachable_mask = None
+                self._turn_mask = None
+                return True
+        return False
 
     def reset_obstacles(self):
         """
         Resets the obstacles in the grid
         """
         self.obstacles = []
+        self._reachable_mask = None
+        self._turn_mask = None
+
+    def _build_masks(self):
+        """Builds the occupancy bitmaps used by reachable() from the current list of obstacles"""
+        self._reachable_mask = np.zeros((self.size_x, self.size_y), dtype=bool)
+        self._reachable_mask[1:self.size_x - 1, 1:self.size_y - 1] = True
+        self._turn_mask = self._reachable_mask.copy()
+
+        for ob in self.obstacles:
+            self._stamp_obstacle(ob)
+
+    def _stamp_obstacle(self, ob: Obstacle):
+        """Marks the cells made unreachable by a single obstacle in both occupancy bitmaps
+
+        Args:
+            ob (Obstacle): obstacle whose footprint is to be removed from the masks
+        """
+        # Must be at least 4 units away in total (x+y), so nothing beyond 3 units in either axis is affected
+        x0, x1 = max(ob.x - 3, 0), min(ob.x + 4, self.size_x)
+        y0, y1 = max(ob.y - 3, 0), min(ob.y + 4, self.size_y)
+        if x0 >= x1 or y0 >= y1:
+            return
+
+        dx = np.abs(np.arange(x0, x1) - ob.x)[:, None]
+        dy = np.abs(np.arange(y0, y1) - ob.y)[None, :]
+        near = dx + dy < 4
+        # An obstacle at x = 4 next to the start zone does not block the start zone itself
+        if ob.x == 4 and ob.y <= 4:
+            near &= ~((np.arange(x0, x1) < 4)[:, None] & (np.arange(y0, y1) < 4)[None, :])
+
+        # The greater distance (x or y) decides whether a nearby cell is blocked
+        for mask, limit in ((self._reachable_mask, 2), (self._turn_mask, EXPANDED_CELL * 2 + 1)):
+            mask[x0:x1, y0:y1] &= ~(near & (np.maximum(dx, dy) < limit))
 
     def get_obstacles(self):
         """
@@ -328,48 +486,39 @@ class Grid:
         - Must be at least 4 units away in total (x+y) from the obstacle
         - Greater distance (x or y distance) must be at least 3 units away from obstacle
 
+        The criterion is precomputed into occupancy bitmaps, so each call is a single array lookup.
+
         Args:
-            x (int): _description_
-            y (int): _description_
+            x (int): x-coordinate
+            y (int): y-coordinate
+            turn (bool): check with the clearance required at the end of a turn
+            preTurn (bool): check with the clearance required before a turn
 
         Returns:
-            bool: _description_
+            bool: True if reachable, False otherwise
         """
-        
         if not self.is_valid_coord(x, y):
             return False
 
-        for ob in self.obstacles:
-            # print(f"Looking at position x:{x} y:{y} against ob: {ob.x} {ob.y}")
-            if ob.x == 4 and ob.y <= 4 and x < 4 and y < 4:
-                # print(f"ob.x: {ob.x} ob.y: {ob.y} x: {x} y:{y} Triggered four bypass")
-                continue
+        if self._reachable_mask is None:
+            self._build_masks()
 
-            # if x <= 3 and y <= 4:
-            #     continue
+        if turn or preTurn:
+            return bool(self._turn_mask[x, y])
+        return bool(self._reachable_mask[x, y])
 
-            # Must be at least 4 units away in total (x+y)
-            if abs(ob.x - x) + abs(ob.y - y) >= 4:
-                # print(f"ob.x: {ob.x} ob.y: {ob.y} x: {x} y:{y} Triggered more than 3 units bypass")
-                continue
-            # If max(x,y) is less than 3 units away, consider not reachable
-            # if max(abs(ob.x - x), abs(ob.y - y)) < EXPANDED_CELL * 2 + 1:
-            if turn:
-                if max(abs(ob.x - x), abs(ob.y - y)) < EXPANDED_CELL * 2 + 1:
-                    # if ob.x == 0 and ob.y == 10 and x == 1 and y == 12:
-                    #     print(f"ob.x: {ob.x} ob.y: {ob.y} x: {x} y:{y} Triggered less than 3 max units trap")
-                    return False
-            if preTurn:
-                if max(abs(ob.x - x), abs(ob.y - y)) < EXPANDED_CELL * 2 + 1:
-                    # if ob.x == 0 and ob.y == 10 and x == 1 and y == 12:
-                    #     print(f"ob.x: {ob.x} ob.y: {ob.y} x: {x} y:{y} Triggered less than 3 max units trap")
-                    return False
-            else:
-                if max(abs(ob.x - x), abs(ob.y - y)) < 2:
-                    # print(f"ob.x: {ob.x} ob.y: {ob.y} x: {x} y:{y} Triggered less than 3 max units trap")
-                    return False
+    def reachable_mask(self, turn=False) -> np.ndarray:
+        """Occupancy bitmap of reachable() over the whole grid, indexed by [x, y]. Not to be modified.
 
-        return True
+        Args:
+            turn (bool): bitmap with the clearance required at the end of a turn
+
+        Returns:
+            np.ndarray: (size_x, size_y) bool array, True where the cell is reachable
+        """
+        if self._reachable_mask is None:
+            self._build_masks()
+        return self._turn_mask if turn else self._reachable_mask
 
     def is_valid_coord(self, x: int, y: int) -> bool:
         """Checks if given position is within bounds
@@ -410,7 +559,7 @@ class Grid:
                 continue
             else:
                 view_states = [view_state for view_state in obstacle.get_view_state(
-                    retrying) if self.reachable(view_state.x, view_state.y)]
+                    retrying, self.size_x, self.size_y) if self.reachable(view_state.x, view_state.y)]
             optimal_positions.append(view_states)
 
         return optimal_positions
\ No newline at end of file
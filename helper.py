@@ -1,19 +1,20 @@
 from consts import WIDTH, HEIGHT, Direction
 
 
-def is_valid(center_x: int, center_y: int):
+def is_valid(center_x: int, center_y: int, size_x: int = WIDTH, size_y: int = HEIGHT):
     """Checks if given position is within bounds
 
     Inputs
     ------
     center_x (int): x-coordinate
     center_y (int): y-coordinate
+    size_x, size_y (int): size of the arena, the competition arena by default
 
     Returns
     -------
     bool: True if valid, False otherwise
     """
-    return center_x > 0 and center_y > 0 and center_x < WIDTH - 1 and center_y < HEIGHT - 1
+    return center_x > 0 and center_y > 0 and center_x < size_x - 1 and center_y < size_y - 1
 
 
 def command_generator(states, obstacles):
@@ -22,7 +23,7 @@ def command_generator(states, obstacles):
     
     Inputs
     ------
-    states: list of State objects
+    states: Path of the robot (see entities.Entity.Path)
     obstacles: list of obstacles, each obstacle is a dictionary with keys "x", "y", "d", and "id"
 
     Returns
@@ -33,6 +34,9 @@ def command_generator(states, obstacles):
     # Convert the list of obstacles into a dictionary with key as the obstacle id and value as the obstacle
     obstacles_dict = {ob['id']: ob for ob in obstacles}
     
+    # Read the packed columns of the path instead of one CellState per step
+    xs, ys, directions, screenshot_ids = (column.tolist() for column in states.columns())
+
     # Initialize commands list
     commands = []
 
@@ -41,71 +45,70 @@ def command_generator(states, obstacles):
         steps = "00"
 
         # If previous state and current state are the same direction,
-        if states[i].direction == states[i - 1].direction:
+        if directions[i] == directions[i - 1]:
             # Forward - Must be (east facing AND x value increased) OR (north facing AND y value increased)
-            if (states[i].x > states[i - 1].x and states[i].direction == Direction.EAST) or (states[i].y > states[i - 1].y and states[i].direction == Direction.NORTH):
+            if (xs[i] > xs[i - 1] and directions[i] == Direction.EAST) or (ys[i] > ys[i - 1] and directions[i] == Direction.NORTH):
                 commands.append("FW10")
             # Forward - Must be (west facing AND x value decreased) OR (south facing AND y value decreased)
-            elif (states[i].x < states[i-1].x and states[i].direction == Direction.WEST) or (
-                    states[i].y < states[i-1].y and states[i].direction == Direction.SOUTH):
+            elif (xs[i] < xs[i - 1] and directions[i] == Direction.WEST) or (
+                    ys[i] < ys[i - 1] and directions[i] == Direction.SOUTH):
                 commands.append("FW10")
             # Backward - All other cases where the previous and current state is the same direction
             else:
                 commands.append("BW10")
 
             # If any of these states has a valid screenshot ID, then add a SNAP command as well to take a picture
-            if states[i].screenshot_id != -1:
+            if screenshot_ids[i] != -1:
                 # NORTH = 0
                 # EAST = 2
                 # SOUTH = 4
                 # WEST = 6
 
-                current_ob_dict = obstacles_dict[states[i].screenshot_id] # {'x': 9, 'y': 10, 'd': 6, 'id': 9}
-                current_robot_position = states[i] # {'x': 1, 'y': 8, 'd': <Direction.NORTH: 0>, 's': -1}
+                current_ob_dict = obstacles_dict[screenshot_ids[i]] # {'x': 9, 'y': 10, 'd': 6, 'id': 9}
 
                 # Obstacle facing WEST, robot facing EAST
-                if current_ob_dict['d'] == 6 and current_robot_position.direction == 2:
-                    if current_ob_dict['y'] > current_robot_position.y:
-                        commands.append(f"SNAP{states[i].screenshot_id}_L")
-                    elif current_ob_dict['y'] == current_robot_position.y:
-                        commands.append(f"SNAP{states[i].screenshot_id}_C")
-                    elif current_ob_dict['y'] < current_robot_position.y:
-                        commands.append(f"SNAP{states[i].screenshot_id}_R")
+                if current_ob_dict['d'] == 6 and directions[i] == 2:
+                    if current_ob_dict['y'] > ys[i]:
+                        commands.append(f"SNAP{screenshot_ids[i]}_L")
+                    elif current_ob_dict['y'] == ys[i]:
+                        commands.append(f"SNAP{screenshot_ids[i]}_C")
+                    elif current_ob_dict['y'] < ys[i]:
+                        commands.append(f"SNAP{screenshot_ids[i]}_R")
                     else:
-                        commands.append(f"SNAP{states[i].screenshot_id}")
+                        commands.append(f"SNAP{screenshot_ids[i]}")
                 
                 # Obstacle facing EAST, robot facing WEST
-                elif current_ob_dict['d'] == 2 and current_robot_position.direction == 6:
-                    if current_ob_dict['y'] > current_robot_position.y:
-                        commands.append(f"SNAP{states[i].screenshot_id}_R")
-                    elif current_ob_dict['y'] == current_robot_position.y:
-                        commands.append(f"SNAP{states[i].screenshot_id}_C")
-                    elif current_ob_dict['y'] < current_robot_position.y:
-                        commands.append(f"SNAP{states[i].screenshot_id}_L")
+                elif current_ob_dict['d'] == 2 and directions[i] == 6:
+                    if current_ob_dict['y'] > ys[i]:
+                        commands.append(f"SNAP{screenshot_ids[i]}_R")
+                    elif current_ob_dict['y'] == ys[i]:
+                        commands.append(f"SNAP{screenshot_ids[i]}_C")
+                    elif current_ob_dict['y'] < ys[i]:
+                        commands.append(f"SNAP{screenshot_ids[i]}_L")
                     else:
-                        commands.append(f"SNAP{states[i].screenshot_id}")
+                        commands.append(f"SNAP{screenshot_ids[i]}")
 
                 # Obstacle facing NORTH, robot facing SOUTH
-                elif current_ob_dict['d'] == 0 and current_robot_position.direction == 4:
-                    if current_ob_dict['x'] > current_robot_position.x:
-                        commands.append(f"SNAP{states[i].screenshot_id}_L")
-                    elif current_ob_dict['x'] == current_robot_position.x:
-                        commands.append(f"SNAP{states[i].screenshot_id}_C")
-                    elif current_ob_dict['x'] < current_robot_position.x:
-                        commands.append(f"SNAP{states[i].screenshot_id}_R")
+                elif current_ob_dict['d'] == 0 and directions[i] == 4:
+                    if current_ob_dict['x'] > xs[i]:
+                        commands.append(f"SNAP{screenshot_ids[i]}_L")
+                    elif current_ob_dict['x'] == xs[i]:
+                        commands.append(f"SNAP{screenshot_ids[i]}_C")
+                    elif current_ob_dict['x'] < xs[i]:
+                        commands.append(f"SNAP{screenshot_ids[i]}_R")
                     else:
-                        commands.append(f"SNAP{states[i].screenshot_id}")
+                        commands.append(f"SNAP{screenshot_ids[i]}")
 
                 # Obstacle facing SOUTH, robot facing NORTH
-                elif current_ob_dict['d'] == 4 and current_robot_position.direction == 0:
-                    if current_ob_dict['x'] > current_robot_position.x:
-                        commands.append(f"SNAP{states[i].screenshot_id}_R")
-                    elif current_ob_dict['x'] == current_robot_position.x:
-                        commands.append(f"SNAP{states[i].screenshot_id}_C")
-                    elif current_ob_dict['x'] < current_robot_position.x:
-                        commands.append(f"SNAP{states[i].screenshot_id}_L")
+                elif current_ob_dict['d'] == 4 and directions[i] == 0:
+                    if current_ob_dict['x'] > xs[i]:
+                        commands.append(f"SNAP{screenshot_ids[i]}_R")
+                    elif current_ob_dict['x'] == xs[i]:
+                        commands.append(f"SNAP{screenshot_ids[i]}_C")
+                    elif current_ob_dict['x'] < xs[i]:
+                        commands.append(f"SNAP{screenshot_ids[i]}_L")
                     else:
-                        commands.append(f"SNAP{states[i].screenshot_id}")
+                        commands.append(f"SNAP{screenshot_ids[i]}")
             continue
 
         # If previous state and current state are not the same direction, it means that there will be a turn command involved
@@ -116,19 +119,19 @@ def command_generator(states, obstacles):
         # BL00 | BL30: Backward Left;
 
         # Facing north previously
-        if states[i - 1].direction == Direction.NORTH:
+        if directions[i - 1] == Direction.NORTH:
             # Facing east afterwards
-            if states[i].direction == Direction.EAST:
+            if directions[i] == Direction.EAST:
                 # y value increased -> Forward Right
-                if states[i].y > states[i - 1].y:
+                if ys[i] > ys[i - 1]:
                     commands.append("FR{}".format(steps))
                 # y value decreased -> Backward Left
                 else:
                     commands.append("BL{}".format(steps))
             # Facing west afterwards
-            elif states[i].direction == Direction.WEST:
+            elif directions[i] == Direction.WEST:
                 # y value increased -> Forward Left
-                if states[i].y > states[i - 1].y:
+                if ys[i] > ys[i - 1]:
                     commands.append("FL{}".format(steps))
                 # y value decreased -> Backward Right
                 else:
@@ -136,43 +139,43 @@ def command_generator(states, obstacles):
             else:
                 raise Exception("Invalid turing direction")
 
-        elif states[i - 1].direction == Direction.EAST:
-            if states[i].direction == Direction.NORTH:
-                if states[i].y > states[i - 1].y:
+        elif directions[i - 1] == Direction.EAST:
+            if directions[i] == Direction.NORTH:
+                if ys[i] > ys[i - 1]:
                     commands.append("FL{}".format(steps))
                 else:
                     commands.append("BR{}".format(steps))
 
-            elif states[i].direction == Direction.SOUTH:
-                if states[i].y > states[i - 1].y:
+            elif directions[i] == Direction.SOUTH:
+                if ys[i] > ys[i - 1]:
                     commands.append("BL{}".format(steps))
                 else:
                     commands.append("FR{}".format(steps))
             else:
                 raise Exception("Invalid turing direction")
 
-        elif states[i - 1].direction == Direction.SOUTH:
-            if states[i].direction == Direction.EAST:
-                if states[i].y > states[i - 1].y:
+        elif directions[i - 1] == Direction.SOUTH:
+            if directions[i] == Direction.EAST:
+                if ys[i] > ys[i - 1]:
                     commands.append("BR{}".format(steps))
                 else:
                     commands.append("FL{}".format(steps))
-            elif states[i].direction == Direction.WEST:
-                if states[i].y > states[i - 1].y:
+            elif directions[i] == Direction.WEST:
+                if ys[i] > ys[i - 1]:
                     commands.append("BL{}".format(steps))
                 else:
                     commands.append("FR{}".format(steps))
             else:
                 raise Exception("Invalid turing direction")
 
-        elif states[i - 1].direction == Direction.WEST:
-            if states[i].direction == Direction.NORTH:
-                if states[i].y > states[i - 1].y:
+        elif directions[i - 1] == Direction.WEST:
+            if directions[i] == Direction.NORTH:
+                if ys[i] > ys[i - 1]:
                     commands.append("FR{}".format(steps))
                 else:
                     commands.append("BL{}".format(steps))
-            elif states[i].direction == Direction.SOUTH:
-                if states[i].y > states[i - 1].y:
+            elif directions[i] == Direction.SOUTH:
+                if ys[i] > ys[i - 1]:
                     commands.append("BR{}".format(steps))
                 else:
                     commands.append("FL{}".format(steps))
@@ -182,58 +185,57 @@ def command_generator(states, obstacles):
             raise Exception("Invalid position")
 
         # If any of these states has a valid screenshot ID, then add a SNAP command as well to take a picture
-        if states[i].screenshot_id != -1:  
+        if screenshot_ids[i] != -1:  
             # NORTH = 0
             # EAST = 2
             # SOUTH = 4
             # WEST = 6
 
-            current_ob_dict = obstacles_dict[states[i].screenshot_id] # {'x': 9, 'y': 10, 'd': 6, 'id': 9}
-            current_robot_position = states[i] # {'x': 1, 'y': 8, 'd': <Direction.NORTH: 0>, 's': -1}
+            current_ob_dict = obstacles_dict[screenshot_ids[i]] # {'x': 9, 'y': 10, 'd': 6, 'id': 9}
 
             # Obstacle facing WEST, robot facing EAST
-            if current_ob_dict['d'] == 6 and current_robot_position.direction == 2:
-                if current_ob_dict['y'] > current_robot_position.y:
-                    commands.append(f"SNAP{states[i].screenshot_id}_L")
-                elif current_ob_dict['y'] == current_robot_position.y:
-                    commands.append(f"SNAP{states[i].screenshot_id}_C")
-                elif current_ob_dict['y'] < current_robot_position.y:
-                    commands.append(f"SNAP{states[i].screenshot_id}_R")
+            if current_ob_dict['d'] == 6 and directions[i] == 2:
+                if current_ob_dict['y'] > ys[i]:
+                    commands.append(f"SNAP{screenshot_ids[i]}_L")
+                elif current_ob_dict['y'] == ys[i]:
+                    commands.append(f"SNAP{screenshot_ids[i]}_C")
+                elif current_ob_dict['y'] < ys[i]:
+                    commands.append(f"SNAP{screenshot_ids[i]}_R")
                 else:
-                    commands.append(f"SNAP{states[i].screenshot_id}")
+                    commands.append(f"SNAP{screenshot_ids[i]}")
             
             # Obstacle facing EAST, robot facing WEST
-            elif current_ob_dict['d'] == 2 and current_robot_position.direction == 6:
-                if current_ob_dict['y'] > current_robot_position.y:
-                    commands.append(f"SNAP{states[i].screenshot_id}_R")
-                elif current_ob_dict['y'] == current_robot_position.y:
-                    commands.append(f"SNAP{states[i].screenshot_id}_C")
-                elif current_ob_dict['y'] < current_robot_position.y:
-                    commands.append(f"SNAP{states[i].screenshot_id}_L")
+            elif current_ob_dict['d'] == 2 and directions[i] == 6:
+                if current_ob_dict['y'] > ys[i]:
+                    commands.append(f"SNAP{screenshot_ids[i]}_R")
+                elif current_ob_dict['y'] == ys[i]:
+                    commands.append(f"SNAP{screenshot_ids[i]}_C")
+                elif current_ob_dict['y'] < ys[i]:
+                    commands.append(f"SNAP{screenshot_ids[i]}_L")
                 else:
-                    commands.append(f"SNAP{states[i].screenshot_id}")
+                    commands.append(f"SNAP{screenshot_ids[i]}")
 
             # Obstacle facing NORTH, robot facing SOUTH
-            elif current_ob_dict['d'] == 0 and current_robot_position.direction == 4:
-                if current_ob_dict['x'] > current_robot_position.x:
-                    commands.append(f"SNAP{states[i].screenshot_id}_L")
-                elif current_ob_dict['x'] == current_robot_position.x:
-                    commands.append(f"SNAP{states[i].screenshot_id}_C")
-                elif current_ob_dict['x'] < current_robot_position.x:
-                    commands.append(f"SNAP{states[i].screenshot_id}_R")
+            elif current_ob_dict['d'] == 0 and directions[i] == 4:
+                if current_ob_dict['x'] > xs[i]:
+                    commands.append(f"SNAP{screenshot_ids[i]}_L")
+                elif current_ob_dict['x'] == xs[i]:
+                    commands.append(f"SNAP{screenshot_ids[i]}_C")
+                elif current_ob_dict['x'] < xs[i]:
+                    commands.append(f"SNAP{screenshot_ids[i]}_R")
                 else:
-                    commands.append(f"SNAP{states[i].screenshot_id}")
+                    commands.append(f"SNAP{screenshot_ids[i]}")
 
             # Obstacle facing SOUTH, robot facing NORTH
-            elif current_ob_dict['d'] == 4 and current_robot_position.direction == 0:
-                if current_ob_dict['x'] > current_robot_position.x:
-                    commands.append(f"SNAP{states[i].screenshot_id}_R")
-                elif current_ob_dict['x'] == current_robot_position.x:
-                    commands.append(f"SNAP{states[i].screenshot_id}_C")
-                elif current_ob_dict['x'] < current_robot_position.x:
-                    commands.append(f"SNAP{states[i].screenshot_id}_L")
+            elif current_ob_dict['d'] == 4 and directions[i] == 0:
+                if current_ob_dict['x'] > xs[i]:
+                    commands.append(f"SNAP{screenshot_ids[i]}_R")
+                elif current_ob_dict['x'] == xs[i]:
+                    commands.append(f"SNAP{screenshot_ids[i]}_C")
+                elif current_ob_dict['x'] < xs[i]:
+                    commands.append(f"SNAP{screenshot_ids[i]}_L")
                 else:
-                    commands.append(f"SNAP{states[i].screenshot_id}")
+                    commands.append(f"SNAP{screenshot_ids[i]}")
 
     # Final command is the stop command (FIN)
     commands.append("FIN")  
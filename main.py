@@ -1,14 +1,25 @@
 import time
+import uuid
+from collections import OrderedDict
 from algo.algo import MazeSolver 
+from algo.cache import PATH_CACHE, obstacle_key
+from algo.lpastar import IncrementalPlanner
+from algo.session import SESSIONS
+from algo.symmetry import canonicalize, restore_path
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from model import *
 from helper import command_generator
+from consts import WIDTH, HEIGHT
 
 app = Flask(__name__)
 CORS(app)
 #model = load_model()
 model = None
+
+# Incremental planners of the runs in progress, keyed by session id, the oldest is dropped beyond the limit
+MAX_RUN_SESSIONS = 16
+run_sessions = OrderedDict()
 @app.route('/status', methods=['GET'])
 def status():
     """
@@ -33,26 +44,87 @@ def path_finding():
     retrying = content['retrying']
     robot_x, robot_y = content['robot_x'], content['robot_y']
     robot_direction = int(content['robot_dir'])
+    # Optional time budget in milliseconds for choosing the tour, the best tour found by then is returned
+    deadline_ms = content.get('deadline_ms')
+    deadline = time.monotonic() + deadline_ms / 1000 if deadline_ms is not None else None
+    # Optional size of the arena in cells, the competition arena by default
+    size_x, size_y = content.get('size_x', WIDTH), content.get('size_y', HEIGHT)
+    # Optionally count the work done by the searches and the planner, returned under "stats"
+    collect_stats = bool(content.get('stats', False))
+
+    request_start = time.perf_counter()
+    # Plan in the canonical orientation of the layout, so that rotated and mirrored copies of a layout share
+    # the entries of the process-wide cache
+    transform, canonical_obstacles, canonical_robot = canonicalize(
+        obstacles, (robot_x, robot_y, robot_direction), size_x, size_y)
 
-    # Initialize MazeSolver object with robot size of 20x20, bottom left corner of robot at (1,1), facing north, and whether to use a big turn or not.
-    maze_solver = MazeSolver(20, 20, robot_x, robot_y, robot_direction, big_turn=None)
+    # Arenas larger than the competition arena are searched with cost fields over whole arrays (see algo/field.py),
+    # which scale to hundreds of cells per side unlike the per-pair searches and their session trees.
+    # Smaller arenas are searched with the resumable Dijkstra trees of a session (with macro moves), one per source
+    # state. These are faster than one A* per pair even for the first plan of a layout, and a retry resumes them.
+    large_arena = size_x * size_y > WIDTH * HEIGHT
+    search_mode = "field" if large_arena else "dijkstra"
+
+    # Initialize MazeSolver object with the size of the arena, bottom left corner of robot at (1,1), facing north, and whether to use a big turn or not.
+    # Costs and paths of layouts planned before are reused from the process-wide cache
+    maze_solver = MazeSolver(size_x, size_y, *canonical_robot, big_turn=None, cache=PATH_CACHE,
+                             search_mode=search_mode, collect_stats=collect_stats)
 
     # Add each obstacle into the MazeSolver. Each obstacle is defined by its x,y positions, its direction, and its id
-    for ob in obstacles:
+    for ob in canonical_obstacles:
         maze_solver.add_obstacle(ob['x'], ob['y'], ob['d'], ob['id'])
+    # Search trees of earlier requests with the same obstacles, a retry only searches for its new view states
+    if not large_arena:
+        maze_solver.session = SESSIONS.get(obstacle_key(size_x, size_y, maze_solver.grid.obstacles))
+    maze_solver.timings.add("ingestion", time.perf_counter() - request_start)
 
     start = time.time()
     # Get shortest path
-    optimal_path, distance = maze_solver.get_optimal_order_dp(retrying=retrying)
-    print(f"Time taken to find shortest path using A* search: {time.time() - start}s")
-    print(f"Distance to travel: {distance} units")
+    optimal_path, distance = maze_solver.get_optimal_order_dp(retrying=retrying, deadline=deadline)
+    print(f"Time taken to find shortest path using {'session' if maze_solver.session else search_mode} search: "
+          f"{time.time() - start}s")
+    print(f"Distance to travel: {distance} units ({maze_solver.plan_status})")
+    if maze_solver.planner == "enumerate":
+        print(f"View state combinations pruned by lower bound: {maze_solver.pruned_combinations}")
+    print(f"Path cache: {PATH_CACHE.stats()}")
     
-    # Based on the shortest path, generate commands for the robot
-    commands = command_generator(optimal_path, obstacles)
+    with maze_solver.timings.phase("command_generation"):
+        # Back to the orientation of the request, the commands are generated from the restored path
+        optimal_path = restore_path(transform, optimal_path, size_x, size_y)
+        # Based on the shortest path, generate commands for the robot
+        commands = command_generator(optimal_path, obstacles)
+        path_results = get_path_results(optimal_path, commands)
 
-    # Get the starting location and add it to path_results
-    path_results = [optimal_path[0].get_dict()]
-    # Process each command individually and append the location the robot should be after executing that command to path_results
+    timings = maze_solver.timings
+    print(f"Phase timings (ms): {timings.as_milliseconds()}, searches run: {maze_solver.search_runs}")
+    data = {
+        'distance': distance,
+        'path': path_results,
+        'commands': commands,
+        'status': maze_solver.plan_status,
+        'timing': {
+            'phases_ms': timings.as_milliseconds(),
+            'search_runs': maze_solver.search_runs,
+            'total_ms': round((time.perf_counter() - request_start) * 1000, 3)
+        }
+    }
+    if maze_solver.stats is not None:
+        data['stats'] = dict(expanded_nodes=maze_solver.expanded_nodes, **maze_solver.stats.as_dict())
+        print(f"Search stats: {data['stats']}")
+    response = jsonify({"data": data, "error": None})
+    response.headers['Server-Timing'] = timings.server_timing(
+        {"path_cost_generator": f"{maze_solver.search_runs} searches"})
+    return response
+
+
+def get_path_results(optimal_path, commands):
+    """
+    Picks the location the robot should be at after executing each command out of the full path
+    :return: a list of location dictionaries, beginning with the starting location
+    """
+    # Indices of the states to return, beginning with the starting location
+    indices = [0]
+    # Process each command individually and append the index of the location the robot should be at after executing that command
     i = 0
     for command in commands:
         if command.startswith("SNAP"):
@@ -65,17 +137,81 @@ def path_finding():
             i += int(command[2:]) // 10
         else:
             i += 1
-        path_results.append(optimal_path[i].get_dict())
+        indices.append(i)
+    return optimal_path.get_dicts(indices)
+
+
+def run_session_plan(session_id, planner):
+    """
+    Plans the current layout of a run session and builds the response in the same format as /path
+    """
+    start = time.time()
+    optimal_path, distance = planner.plan()
+    print(f"Time taken to replan session {session_id}: {time.time() - start}s")
+
+    obstacles = [{'x': ob.x, 'y': ob.y, 'd': int(ob.direction), 'id': ob.obstacle_id}
+                 for ob in planner.solver.grid.obstacles]
+    commands = command_generator(optimal_path, obstacles)
     return jsonify({
         "data": {
+            'session_id': session_id,
             'distance': distance,
-            'path': path_results,
-            'commands': commands
+            'path': get_path_results(optimal_path, commands),
+            'commands': commands,
+            'status': planner.solver.plan_status
         },
         "error": None
     })
 
 
+@app.route('/session', methods=['POST'])
+def create_session():
+    """
+    Starts a run session with the same request body as /path. Obstacles can then be added to or removed from
+    the session, and only the affected costs are repaired instead of planning from scratch
+    :return: the plan as returned by /path, with an additional "session_id" key in "data"
+    """
+    content = request.json
+    planner = IncrementalPlanner(content.get('size_x', WIDTH), content.get('size_y', HEIGHT), content['robot_x'],
+                                 content['robot_y'], int(content['robot_dir']), retrying=content['retrying'])
+    for ob in content['obstacles']:
+        planner.add_obstacle(ob['x'], ob['y'], ob['d'], ob['id'])
+
+    session_id = uuid.uuid4().hex
+    run_sessions[session_id] = planner
+    while len(run_sessions) > MAX_RUN_SESSIONS:
+        run_sessions.popitem(last=False)
+    return run_session_plan(session_id, planner)
+
+
+@app.route('/session/<session_id>/obstacles', methods=['POST', 'DELETE'])
+def update_session_obstacles(session_id):
+    """
+    Adds (POST) or removes (DELETE) one obstacle, given as {"x", "y", "d", "id"} ("id" is only needed to add),
+    and replans the run session
+    :return: the new plan as returned by /session
+    """
+    planner = run_sessions.get(session_id)
+    if planner is None:
+        return jsonify({"data": None, "error": f"Unknown session {session_id}"}), 404
+
+    ob = request.json
+    if request.method == 'POST':
+        planner.add_obstacle(ob['x'], ob['y'], ob['d'], ob['id'])
+    elif not planner.remove_obstacle(ob['x'], ob['y'], ob['d']):
+        return jsonify({"data": None, "error": "Obstacle not found"}), 404
+    return run_session_plan(session_id, planner)
+
+
+@app.route('/session/<session_id>', methods=['DELETE'])
+def close_session(session_id):
+    """
+    Ends a run session
+    """
+    run_sessions.pop(session_id, None)
+    return jsonify({"result": "ok"})
+
+
 @app.route('/image', methods=['POST'])
 def image_predict():
     """